@@ -0,0 +1,12 @@
+"""
+Benchmarks for the query, decode and submit hot paths of `torusdk`.
+
+The cases run the real `TorusClient` against an in-process fake node
+(`benchmarks.fake_node`), so the numbers only depend on client-side work and
+are comparable between runs on the same machine. Results are compared with
+`baseline.json` and regressions beyond the threshold make the run fail.
+
+Run with `make bench`, or `make bench_baseline` to record a new baseline.
+`python -m benchmarks.capture` records workloads against a real node and
+replays them offline, for profiling production-shaped traffic.
+"""
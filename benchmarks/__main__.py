@@ -0,0 +1,122 @@
+"""
+Runs the benchmark suite against the fake node.
+
+    python -m benchmarks                  # run and compare with the baseline
+    python -m benchmarks -k query         # only cases whose name matches
+    python -m benchmarks --save-baseline  # run and store as the new baseline
+"""
+
+import json
+from pathlib import Path
+from typing import Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from benchmarks import cases as _  # noqa: F401 (registers the cases)
+from benchmarks.harness import (
+    CASES,
+    DEFAULT_BASELINE,
+    Result,
+    load_baseline,
+    relative_change,
+    results_to_json,
+    run_case,
+    save_baseline,
+)
+
+app = typer.Typer(add_completion=False)
+
+
+def render(
+    results: list[Result],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+    console: Console,
+) -> list[str]:
+    """
+    Prints the results table.
+
+    Returns:
+        The `case.metric` names that regressed beyond the threshold.
+    """
+    table = Table(show_header=True, header_style="bold magenta")
+    for column in ["Case", "Metric", "Median", "Unit", "Spread", "Baseline"]:
+        justify = "left" if column in ("Case", "Metric", "Unit") else "right"
+        table.add_column(column, justify=justify)
+    table.add_column("Change", justify="right")
+
+    regressions: list[str] = []
+    for result in results:
+        for name, metric in result.metrics.items():
+            base = baseline.get(result.case, {}).get(name)
+            change = "-"
+            if base is not None:
+                delta = relative_change(metric, base)
+                style = "green" if delta >= 0 else "yellow"
+                if delta < -threshold:
+                    style = "bold red"
+                    regressions.append(f"{result.case}.{name}")
+                change = f"[{style}]{delta:+.1%}[/{style}]"
+            table.add_row(
+                result.case,
+                name,
+                f"{metric.value:,.2f}",
+                metric.unit,
+                f"{result.spread[name]:.1%}",
+                "-" if base is None else f"{base:,.2f}",
+                change,
+            )
+    console.print(table)
+    return regressions
+
+
+@app.command()
+def main(
+    select: Optional[str] = typer.Option(
+        None, "-k", help="Only run cases whose name contains this string."
+    ),
+    repeat: int = typer.Option(5, help="Measured runs per case."),
+    threshold: float = typer.Option(
+        0.25, help="Relative slowdown flagged as a regression."
+    ),
+    baseline: Path = typer.Option(DEFAULT_BASELINE, help="Baseline file."),
+    save_baseline_: bool = typer.Option(
+        False, "--save-baseline", help="Store the results as the baseline."
+    ),
+    output: Optional[Path] = typer.Option(
+        None, help="Also write the raw results as JSON."
+    ),
+):
+    console = Console()
+    selected = [
+        case for name, case in CASES.items() if select is None or select in name
+    ]
+    if not selected:
+        console.print(f"No benchmark matches {select!r}", style="bold red")
+        raise typer.Exit(2)
+
+    results: list[Result] = []
+    for case in selected:
+        with console.status(f"Running {case.name}..."):
+            results.append(run_case(case, repeat))
+
+    regressions = render(results, load_baseline(baseline), threshold, console)
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(results_to_json(results), f, indent=2)
+    if save_baseline_:
+        save_baseline(baseline, results)
+        console.print(f"Baseline saved to {baseline}")
+    elif regressions:
+        console.print(
+            f"Regressions beyond {threshold:.0%}: {', '.join(regressions)}",
+            style="bold red",
+        )
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    app()
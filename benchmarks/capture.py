@@ -0,0 +1,108 @@
+"""
+Records client workloads against a real node and replays them offline.
+
+    python -m benchmarks.capture record get_map_modules modules.jsonl.gz
+    python -m benchmarks.capture replay get_map_modules modules.jsonl.gz
+    python -m benchmarks.capture replay get_map_modules modules.jsonl.gz \\
+        --speed 1 --profile modules.prof
+
+Replays are deterministic for a single connection, which is the default.
+"""
+
+import cProfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import typer
+from rich.console import Console
+
+from torusdk._common import get_node_url
+from torusdk.client import TorusClient
+from torusdk.misc import get_global_params, get_map_modules
+from torusdk.transport import TrafficRecorder, TrafficReplayer
+
+# placeholder URL for replays, nothing is dialed
+REPLAY_URL = "ws://replay"
+
+WORKLOADS: dict[str, Callable[[TorusClient], Any]] = {
+    "get_map_modules": lambda client: get_map_modules(
+        client, include_balances=True
+    ),
+    "proposals": lambda client: client.query_map_proposals(),
+    "global_params": get_global_params,
+}
+
+app = typer.Typer(add_completion=False, no_args_is_help=True)
+
+
+def _workload(name: str) -> Callable[[TorusClient], Any]:
+    if name not in WORKLOADS:
+        raise typer.BadParameter(
+            f"Unknown workload {name!r}, choose from {', '.join(WORKLOADS)}"
+        )
+    return WORKLOADS[name]
+
+
+@app.command()
+def record(
+    workload: str,
+    output: Path,
+    url: Optional[str] = typer.Option(None, help="Node to record from."),
+    testnet: bool = typer.Option(False, help="Use a testnet node."),
+    connections: int = typer.Option(1, help="Websocket connections."),
+):
+    """
+    Runs a workload against a node, recording the websocket traffic.
+    """
+    console = Console()
+    run = _workload(workload)
+    node_url = url or get_node_url(use_testnet=testnet)
+    with TrafficRecorder(output) as recorder:
+        start = time.perf_counter()
+        client = TorusClient(node_url, connections, ws_factory=recorder.factory)
+        run(client)
+        elapsed = time.perf_counter() - start
+    console.print(
+        f"Recorded {workload} from {node_url} in {elapsed:.2f}s "
+        f"({output.stat().st_size / 1024:.1f} KiB)"
+    )
+
+
+@app.command()
+def replay(
+    workload: str,
+    recording: Path,
+    speed: Optional[float] = typer.Option(
+        None, help="Replay speed, 1 for the recorded timing. Max if omitted."
+    ),
+    connections: int = typer.Option(1, help="Websocket connections."),
+    profile: Optional[Path] = typer.Option(
+        None, help="Write cProfile stats of the replay to this file."
+    ),
+):
+    """
+    Runs a workload against a recording instead of a node.
+    """
+    console = Console()
+    run = _workload(workload)
+    replayer = TrafficReplayer(recording, speed=speed)
+    profiler = cProfile.Profile() if profile else None
+
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    client = TorusClient(REPLAY_URL, connections, ws_factory=replayer.factory)
+    run(client)
+    if profiler:
+        profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    console.print(f"Replayed {workload} in {elapsed:.3f}s")
+    if profiler and profile:
+        profiler.dump_stats(profile)
+        console.print(f"Profile written to {profile}")
+
+
+if __name__ == "__main__":
+    app()
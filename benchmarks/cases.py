@@ -0,0 +1,306 @@
+"""
+Benchmark cases for the query, decode, submit and batch hot paths.
+"""
+
+import hashlib
+import statistics
+import time
+from typing import Any
+
+from torustrateinterface import Keypair
+
+from benchmarks.fake_node import (
+    FakeChain,
+    encode_compact,
+    make_client,
+    map_key,
+)
+from benchmarks.harness import Metric, Runner, benchmark, peak_rss_mb
+from torusdk.client import TorusClient
+from torusdk.faucet.powv2 import _solve_for_nonce_block  # type: ignore
+from torusdk.util.memo import TTLDict
+
+N_AGENTS = 1_000
+STAKERS_PER_AGENT = 10
+DECODE_ITEMS = 5_000
+CHUNK_KEYS = 80_000
+SUBMIT_CALLS = 40
+BATCH_CALLS = 2_000
+POW_NONCES = 50_000
+TTL_OPS = 100_000
+
+AGENT_MAPS: dict[str, list[tuple[str, list[Any]]]] = {
+    "Torus0": [
+        ("Agents", []),
+        ("RegistrationBlock", []),
+        ("StakedBy", []),
+    ]
+}
+
+
+def account(seed: int) -> bytes:
+    return hashlib.blake2b(seed.to_bytes(8, "little"), digest_size=32).digest()
+
+
+def _bytes(value: str) -> bytes:
+    data = value.encode()
+    return encode_compact(len(data)) + data
+
+
+def encode_agent(key: bytes, idx: int) -> bytes:
+    return (
+        key
+        + _bytes(f"agent-{idx}")
+        + _bytes(f"https://agent-{idx}.torus.network")
+        + _bytes("ipfs://bafkreibenchmarkbenchmarkbenchmarkbenchmark")
+        + bytes([0])
+        + (1_000 + idx).to_bytes(8, "little")
+        + bytes([5, 5])
+    )
+
+
+def seed_agents(chain: FakeChain, n_agents: int, stakers_per_agent: int):
+    """
+    Fills Torus0 `Agents`, `RegistrationBlock` and `StakedBy` the way
+    `get_map_modules` reads them.
+    """
+    for i in range(n_agents):
+        agent = account(i)
+        chain.put(
+            map_key("Torus0", "Agents", agent, hasher="Identity"),
+            encode_agent(agent, i),
+        )
+        chain.put(
+            map_key("Torus0", "RegistrationBlock", agent, hasher="Identity"),
+            (1_000 + i).to_bytes(8, "little"),
+        )
+        for j in range(stakers_per_agent):
+            staker = account(1_000_000 + i * stakers_per_agent + j)
+            chain.put(
+                map_key(
+                    "Torus0",
+                    "StakedBy",
+                    agent,
+                    staker,
+                    hasher="Blake2_128Concat",
+                ),
+                (10**18 * (j + 1)).to_bytes(16, "little"),
+            )
+
+
+def _warm_client(client: TorusClient):
+    with client.get_conn(init=True):
+        pass
+
+
+@benchmark("query_batch_map", isolated=True)
+def query_batch_map() -> Runner:
+    chain = FakeChain()
+    seed_agents(chain, N_AGENTS, STAKERS_PER_AGENT)
+    client, sockets = make_client(chain)
+    _warm_client(client)
+
+    def run():
+        received = sum(ws.bytes_received for ws in sockets)
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        result = client.query_batch_map(AGENT_MAPS)
+        elapsed = time.perf_counter() - start
+        received = sum(ws.bytes_received for ws in sockets) - received
+        n_keys = sum(len(values) for values in result.values())
+        assert n_keys == N_AGENTS * (2 + STAKERS_PER_AGENT)
+        return [
+            Metric("keys_per_s", n_keys / elapsed, "keys/s"),
+            Metric("bytes_per_s", received / elapsed, "B/s"),
+            Metric("peak_rss", peak_rss_mb(), "MiB", False),
+            Metric("rss_growth", peak_rss_mb() - rss_before, "MiB", False),
+        ]
+
+    return run
+
+
+@benchmark("decode_response")
+def decode_response() -> Runner:
+    chain = FakeChain()
+    seed_agents(chain, DECODE_ITEMS // 2, 1)
+    client, _ = make_client(chain)
+    _warm_client(client)
+
+    queries: list[tuple[str, list[Any]]] = [("Agents", []), ("StakedBy", [])]
+    _, prefix_list = client._get_storage_keys(  # type: ignore
+        "Torus0", queries, chain.head
+    )
+    with client.get_conn(init=True) as substrate:
+        fun_params = client._get_lists("Torus0", queries, substrate)  # type: ignore
+    response: list[Any] = [
+        chain.query_storage_at(chain.keys_with_prefix(prefix))
+        for prefix in prefix_list
+    ]
+
+    def run():
+        start = time.perf_counter()
+        decoded = client._decode_response(  # type: ignore
+            response, fun_params, prefix_list, chain.head
+        )
+        elapsed = time.perf_counter() - start
+        n_items = sum(len(values) for values in decoded.values())
+        assert n_items == DECODE_ITEMS
+        return [Metric("items_per_s", n_items / elapsed, "items/s")]
+
+    return run
+
+
+@benchmark("make_request_smaller")
+def make_request_smaller() -> Runner:
+    chain = FakeChain()
+    client, _ = make_client(chain)
+    storage_keys = [
+        map_key("Torus0", "Agents", account(i), hasher="Identity")
+        for i in range(CHUNK_KEYS)
+    ]
+    # many medium requests, like a paged `state_queryStorageAt` payload
+    n_requests = 200
+    per_request = CHUNK_KEYS // n_requests
+    requests: list[tuple[str, list[Any]]] = [
+        (
+            "state_queryStorageAt",
+            [storage_keys[i : i + per_request], chain.head],
+        )
+        for i in range(0, CHUNK_KEYS, per_request)
+    ]
+    prefix_list: list[list[str]] = [["0x"] for _ in requests]
+    fun_params: list[tuple[Any, Any, Any, Any, str]] = [
+        ("u64", ["AccountId"], ["Identity"], [], "Agents") for _ in requests
+    ]
+
+    def run():
+        start = time.perf_counter()
+        _, chunks = client._make_request_smaller(  # type: ignore
+            requests, prefix_list, fun_params
+        )
+        elapsed = time.perf_counter() - start
+        assert chunks
+        return [Metric("keys_per_s", CHUNK_KEYS / elapsed, "keys/s")]
+
+    return run
+
+
+@benchmark("chunk_splitting")
+def chunk_splitting() -> Runner:
+    chain = FakeChain()
+    client, _ = make_client(chain)
+    _warm_client(client)
+    storage_keys = [
+        map_key("Torus0", "Agents", account(i), hasher="Identity")
+        for i in range(CHUNK_KEYS)
+    ]
+    # a single request above the per-request key limit has to be split
+    request: tuple[str, list[Any]] = (
+        "state_queryStorageAt",
+        [storage_keys, chain.head],
+    )
+    _, chunks = client._make_request_smaller(  # type: ignore
+        [request], [["0x"]], [("u64", [], [], [], "Agents")]
+    )
+
+    def run():
+        start = time.perf_counter()
+        results, _ = client._rpc_request_batch_chunked(chunks)  # type: ignore
+        elapsed = time.perf_counter() - start
+        assert len(results) > 1
+        return [Metric("keys_per_s", CHUNK_KEYS / elapsed, "keys/s")]
+
+    return run
+
+
+@benchmark("ttl_dict")
+def ttl_dict() -> Runner:
+    keys = [f"key-{i}" for i in range(1_000)]
+
+    def run():
+        memo: TTLDict[str, int] = TTLDict(60)
+        start = time.perf_counter()
+        for i in range(TTL_OPS):
+            key = keys[i % len(keys)]
+            memo[key] = i
+            _ = memo[key]
+            _ = memo.get_or_insert_lazy(key, lambda: i)
+        elapsed = time.perf_counter() - start
+        _ = len(memo)
+        # each iteration is a set, a get and a lazy get
+        return [Metric("ops_per_s", 3 * TTL_OPS / elapsed, "ops/s")]
+
+    return run
+
+
+@benchmark("pow_hashrate")
+def pow_hashrate() -> Runner:
+    block_and_key_hash = hashlib.sha256(b"benchmark block").digest() * 2
+    state = {"start": 0}
+
+    def run():
+        nonce_start = state["start"]
+        state["start"] += POW_NONCES
+        start = time.perf_counter()
+        solution = _solve_for_nonce_block(
+            nonce_start,
+            nonce_start + POW_NONCES,
+            block_and_key_hash,
+            1,
+            "0x00",
+        )
+        elapsed = time.perf_counter() - start
+        hashes = (
+            POW_NONCES if solution is None else solution.nonce - nonce_start + 1
+        )
+        return [Metric("hashrate", hashes / elapsed, "H/s")]
+
+    return run
+
+
+@benchmark("compose_call")
+def compose_call() -> Runner:
+    chain = FakeChain()
+    client, _ = make_client(chain)
+    _warm_client(client)
+    key = Keypair.create_from_uri("//Benchmark")
+    dest = Keypair.create_from_uri("//Dest").ss58_address
+
+    def run():
+        latencies: list[float] = []
+        for _ in range(SUBMIT_CALLS):
+            start = time.perf_counter()
+            client.transfer(key, 10**18, dest)  # type: ignore
+            latencies.append(time.perf_counter() - start)
+        quantiles = statistics.quantiles(latencies, n=20)
+        return [
+            Metric("p50", statistics.median(latencies) * 1000, "ms", False),
+            Metric("p95", quantiles[18] * 1000, "ms", False),
+            Metric("calls_per_s", SUBMIT_CALLS / sum(latencies), "calls/s"),
+        ]
+
+    return run
+
+
+@benchmark("call_batch")
+def call_batch() -> Runner:
+    chain = FakeChain()
+    client, _ = make_client(chain)
+    _warm_client(client)
+    key = Keypair.create_from_uri("//Benchmark")
+    dest = Keypair.create_from_uri("//Dest").ss58_address
+
+    def run():
+        start = time.perf_counter()
+        with client.batch(key) as batch:
+            for _ in range(BATCH_CALLS):
+                batch.transfer(10**18, dest)  # type: ignore
+        elapsed = time.perf_counter() - start
+        # the proof size of the calls exceeds the weight of one extrinsic
+        assert len(batch.receipts) > 1
+        return [
+            Metric("calls_per_s", BATCH_CALLS / elapsed, "calls/s"),
+            Metric("extrinsics", len(batch.receipts), "", False),
+        ]
+
+    return run
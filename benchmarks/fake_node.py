@@ -0,0 +1,673 @@
+"""
+In-process fake Torus node.
+
+`FakeChain` holds the state of a tiny instant-seal chain (storage, blocks,
+account nonces) and answers the JSON-RPC methods `TorusClient` and
+`torustrateinterface` use. `FakeWebSocket` is a duck-typed stand-in for
+`websocket.WebSocket` that routes every frame to a `FakeChain`, so the whole
+client stack, including SCALE encoding and decoding, runs without network.
+"""
+
+import hashlib
+import json
+import queue
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, cast
+
+import websocket
+from torustrateinterface.utils.hasher import (  # type: ignore
+    blake2_128_concat,  # type: ignore
+    xxh128,  # type: ignore
+)
+from torustrateinterface.utils.ss58 import ss58_decode  # type: ignore
+
+from benchmarks.metadata import (
+    SPEC_VERSION,
+    TRANSACTION_VERSION,
+    encode_compact,
+    encoded_metadata,
+)
+from torusdk.client import TorusClient
+from torusdk.instrumentation import Instrumentation
+
+ZERO_HASH = "0x" + "00" * 32
+
+RPC_METHODS = [
+    "author_pendingExtrinsics",
+    "author_submitAndWatchExtrinsic",
+    "author_submitExtrinsic",
+    "author_unwatchExtrinsic",
+    "chain_getBlock",
+    "chain_getBlockHash",
+    "chain_getFinalizedHead",
+    "chain_getHead",
+    "chain_getHeader",
+    "chain_subscribeFinalizedHeads",
+    "chain_subscribeNewHeads",
+    "chain_unsubscribeFinalizedHeads",
+    "chain_unsubscribeNewHeads",
+    "payment_queryInfo",
+    "rpc_methods",
+    "state_getKeys",
+    "state_getMetadata",
+    "state_getRuntimeVersion",
+    "state_getStorage",
+    "state_queryStorageAt",
+    "system_accountNextIndex",
+    "system_chain",
+    "system_dryRun",
+    "system_name",
+    "system_properties",
+    "system_version",
+]
+
+# weight reported for every dispatched call
+CALL_REF_TIME = 150_000_000
+CALL_PROOF_SIZE = 3_500
+PARTIAL_FEE = 125_000_000_000_000
+UTILITY_PALLET = 3
+# `batch`, `batch_all` and `force_batch`
+UTILITY_BATCH_CALLS = (0, 2, 4)
+
+
+def _blake2_256(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=32).digest()
+
+
+def decode_compact(data: bytes, offset: int = 0) -> tuple[int, int]:
+    """
+    Decodes a SCALE compact integer.
+
+    Returns:
+        The decoded value and the offset right after it.
+    """
+    mode = data[offset] & 0b11
+    if mode == 0b00:
+        return data[offset] >> 2, offset + 1
+    if mode == 0b01:
+        raw = int.from_bytes(data[offset : offset + 2], "little")
+        return raw >> 2, offset + 2
+    if mode == 0b10:
+        raw = int.from_bytes(data[offset : offset + 4], "little")
+        return raw >> 2, offset + 4
+    length = (data[offset] >> 2) + 4
+    start = offset + 1
+    return (
+        int.from_bytes(data[start : start + length], "little"),
+        start + length,
+    )
+
+
+def storage_prefix(pallet: str, storage: str) -> bytes:
+    return bytes(xxh128(pallet.encode()) + xxh128(storage.encode()))  # type: ignore
+
+
+def map_key(pallet: str, storage: str, *keys: bytes, hasher: str) -> str:
+    """
+    Builds the hex storage key of a map entry.
+
+    Args:
+        keys: The SCALE encoded map keys.
+        hasher: Either `Identity` or `Blake2_128Concat`, used for every key.
+    """
+    key = storage_prefix(pallet, storage)
+    for part in keys:
+        if hasher == "Identity":
+            key += part
+        elif hasher == "Blake2_128Concat":
+            key += bytes(blake2_128_concat(part))  # type: ignore
+        else:
+            raise ValueError(f"Unsupported hasher {hasher}")
+    return "0x" + key.hex()
+
+
+def _events_success(extrinsic_idx: int) -> bytes:
+    """SCALE encoded `Vec<EventRecord>` with a single ExtrinsicSuccess."""
+    phase = b"\x00" + extrinsic_idx.to_bytes(4, "little")
+    dispatch_info = (
+        encode_compact(CALL_REF_TIME)
+        + encode_compact(CALL_PROOF_SIZE)
+        + b"\x00"  # DispatchClass::Normal
+        + b"\x00"  # Pays::Yes
+    )
+    # RuntimeEvent::System(frame_system::Event::ExtrinsicSuccess)
+    event = b"\x00\x00" + dispatch_info
+    return encode_compact(1) + phase + event + encode_compact(0)
+
+
+def _events_failed(extrinsic_idx: int, module_index: int, error: int) -> bytes:
+    """SCALE encoded `Vec<EventRecord>` with a single ExtrinsicFailed."""
+    phase = b"\x00" + extrinsic_idx.to_bytes(4, "little")
+    dispatch_error = b"\x03" + bytes([module_index]) + bytes([error, 0, 0, 0])
+    dispatch_info = (
+        encode_compact(CALL_REF_TIME)
+        + encode_compact(CALL_PROOF_SIZE)
+        + b"\x00\x00"
+    )
+    event = b"\x00\x01" + dispatch_error + dispatch_info
+    return encode_compact(1) + phase + event + encode_compact(0)
+
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data: str | None = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_json(self) -> dict[str, Any]:
+        error: dict[str, Any] = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+class _SignedExtrinsic:
+    """The parts of a signed extrinsic the fake node cares about."""
+
+    def __init__(self, data: bytes):
+        _, offset = decode_compact(data)
+        version = data[offset]
+        if version & 0x80 == 0:
+            raise RpcError(1010, "Invalid Transaction", "Unsigned extrinsic")
+        address_kind = data[offset + 1]
+        if address_kind != 0:
+            raise RpcError(1010, "Invalid Transaction", "Unsupported address")
+        self.signer = data[offset + 2 : offset + 34]
+        offset += 34
+        signature_kind = data[offset]
+        offset += 1 + (65 if signature_kind == 2 else 64)
+        offset += 1 if data[offset] == 0 else 2  # era
+        self.nonce, offset = decode_compact(data, offset)
+        _, offset = decode_compact(data, offset)  # tip
+        self.call_index = (data[offset], data[offset + 1])
+        # calls wrapped in a `Utility` batch, each weighing the same
+        self.calls = 1
+        if self.call_index[0] == UTILITY_PALLET and self.call_index[1] in (
+            UTILITY_BATCH_CALLS
+        ):
+            self.calls, _ = decode_compact(data, offset + 2)
+        self.hash = "0x" + _blake2_256(data).hex()
+
+
+class FakeChain:
+    """
+    State of an instant-seal chain: every extrinsic that becomes ready is
+    put into its own block right away.
+
+    Attributes:
+        storage: Hex storage key to hex SCALE value, at the chain head.
+        latency: Seconds slept before answering each websocket frame, to
+            emulate a network round trip.
+        fail_call: Optional predicate on `(pallet_index, call_index)`; calls
+            for which it returns True are included with an ExtrinsicFailed
+            event.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.storage: dict[str, str] = {}
+        self.fail_call: Callable[[tuple[int, int]], bool] | None = None
+        self._sorted_keys: list[str] | None = None
+        self._lock = threading.RLock()
+        self._nonces: dict[bytes, int] = {}
+        self._future: dict[tuple[bytes, int], tuple[str, Any]] = {}
+        self._headers: dict[str, dict[str, Any]] = {}
+        self._bodies: dict[str, list[str]] = {}
+        self._events: dict[str, str] = {}
+        self._hashes: list[str] = []
+        # subscription id -> (connection, notification method)
+        self._head_subscribers: dict[str, tuple["FakeWebSocket", str]] = {}
+        self._events_key = "0x" + storage_prefix("System", "Events").hex()
+        self._seal([])
+        self.submitted = 0
+
+    # ==== State ====
+
+    def put(self, key: str, value: bytes | str):
+        with self._lock:
+            if key not in self.storage:
+                self._sorted_keys = None
+            self.storage[key] = (
+                value if isinstance(value, str) else "0x" + value.hex()
+            )
+
+    def keys_with_prefix(self, prefix: str) -> list[str]:
+        with self._lock:
+            if self._sorted_keys is None:
+                self._sorted_keys = sorted(self.storage)
+            keys = self._sorted_keys
+        start = bisect_left(keys, prefix)
+        end = start
+        while end < len(keys) and keys[end].startswith(prefix):
+            end += 1
+        return keys[start:end]
+
+    def set_nonce(self, account: bytes, nonce: int):
+        with self._lock:
+            self._nonces[account] = nonce
+
+    def nonce_of(self, account: bytes) -> int:
+        with self._lock:
+            return self._nonces.get(account, 0)
+
+    @property
+    def head(self) -> str:
+        return self._hashes[-1]
+
+    @property
+    def block_number(self) -> int:
+        return len(self._hashes) - 1
+
+    def _seal(self, extrinsics: list[str]) -> str:
+        number = len(self._hashes)
+        parent = self._hashes[-1] if self._hashes else ZERO_HASH
+        block_hash = (
+            "0x"
+            + _blake2_256(parent.encode() + number.to_bytes(8, "little")).hex()
+        )
+        self._headers[block_hash] = {
+            "parentHash": parent,
+            "number": hex(number),
+            "stateRoot": ZERO_HASH,
+            "extrinsicsRoot": ZERO_HASH,
+            "digest": {"logs": []},
+        }
+        self._bodies[block_hash] = extrinsics
+        self._hashes.append(block_hash)
+        # every block is final right away
+        for subscription, (conn, method) in list(
+            self._head_subscribers.items()
+        ):
+            conn.push(
+                {
+                    "jsonrpc": "2.0",
+                    "method": method,
+                    "params": {
+                        "subscription": subscription,
+                        "result": self._headers[block_hash],
+                    },
+                }
+            )
+        return block_hash
+
+    # ==== Transaction pool ====
+
+    def submit(
+        self, data_hex: str, notify: Callable[[str], None] | None
+    ) -> str:
+        data = bytes.fromhex(data_hex.removeprefix("0x"))
+        extrinsic = _SignedExtrinsic(data)
+        with self._lock:
+            expected = self._nonces.get(extrinsic.signer, 0)
+            if extrinsic.nonce < expected:
+                raise RpcError(
+                    1010, "Invalid Transaction", "Transaction is outdated"
+                )
+            slot = (extrinsic.signer, extrinsic.nonce)
+            if slot in self._future:
+                raise RpcError(1014, "Priority is too low")
+            self.submitted += 1
+            self._future[slot] = (data_hex, (extrinsic, notify))
+            self._drain(extrinsic.signer)
+        return extrinsic.hash
+
+    def _drain(self, signer: bytes):
+        while True:
+            nonce = self._nonces.get(signer, 0)
+            entry = self._future.pop((signer, nonce), None)
+            if entry is None:
+                return
+            data_hex, (extrinsic, notify) = entry
+            self._nonces[signer] = nonce + 1
+            block_hash = self._seal([data_hex])
+            failed = self.fail_call is not None and self.fail_call(
+                extrinsic.call_index
+            )
+            events = (
+                _events_failed(0, extrinsic.call_index[0], 0)
+                if failed
+                else _events_success(0)
+            )
+            self._events[block_hash] = "0x" + events.hex()
+            if notify is not None:
+                notify(block_hash)
+
+    def query_storage_at(
+        self, keys: list[str], block_hash: str | None = None
+    ) -> list[dict[str, Any]]:
+        storage = self.storage
+        return [
+            {
+                "block": block_hash or self.head,
+                "changes": [[key, storage.get(key)] for key in keys],
+            }
+        ]
+
+    def pending_extrinsics(self) -> list[str]:
+        with self._lock:
+            return [data for data, _ in self._future.values()]
+
+    # ==== RPC ====
+
+    def handle(self, method: str, params: list[Any], conn: "FakeWebSocket"):
+        handler = getattr(self, f"_rpc_{method}", None)
+        if handler is None:
+            raise RpcError(-32601, "Method not found")
+        return handler(conn, *params)
+
+    def _rpc_rpc_methods(self, conn: "FakeWebSocket"):
+        return {"methods": RPC_METHODS}
+
+    def _rpc_system_chain(self, conn: "FakeWebSocket"):
+        return "Torus Fake"
+
+    def _rpc_system_name(self, conn: "FakeWebSocket"):
+        return "torus-fake-node"
+
+    def _rpc_system_version(self, conn: "FakeWebSocket"):
+        return "0.0.0"
+
+    def _rpc_system_properties(self, conn: "FakeWebSocket"):
+        return {"ss58Format": 42, "tokenDecimals": 18, "tokenSymbol": "TORUS"}
+
+    def _rpc_chain_getHead(self, conn: "FakeWebSocket"):
+        return self.head
+
+    def _rpc_chain_getFinalizedHead(self, conn: "FakeWebSocket"):
+        return self.head
+
+    def _rpc_chain_getBlockHash(
+        self, conn: "FakeWebSocket", number: int | None = None
+    ):
+        if number is None:
+            return self.head
+        if number >= len(self._hashes):
+            return None
+        return self._hashes[number]
+
+    def _rpc_chain_getHeader(
+        self, conn: "FakeWebSocket", block_hash: str | None = None
+    ):
+        return self._headers.get(block_hash or self.head)
+
+    def _subscribe_heads(self, conn: "FakeWebSocket", method: str):
+        subscription = conn.new_subscription_id()
+        with self._lock:
+            self._head_subscribers[subscription] = (conn, method)
+            conn.push(
+                {
+                    "jsonrpc": "2.0",
+                    "method": method,
+                    "params": {
+                        "subscription": subscription,
+                        "result": self._headers[self.head],
+                    },
+                }
+            )
+        return subscription
+
+    def _unsubscribe_heads(self, subscription: str):
+        with self._lock:
+            return self._head_subscribers.pop(subscription, None) is not None
+
+    def _rpc_chain_subscribeNewHeads(self, conn: "FakeWebSocket"):
+        return self._subscribe_heads(conn, "chain_newHead")
+
+    def _rpc_chain_subscribeFinalizedHeads(self, conn: "FakeWebSocket"):
+        return self._subscribe_heads(conn, "chain_finalizedHead")
+
+    def _rpc_chain_unsubscribeNewHeads(
+        self, conn: "FakeWebSocket", subscription: str
+    ):
+        return self._unsubscribe_heads(subscription)
+
+    def _rpc_chain_unsubscribeFinalizedHeads(
+        self, conn: "FakeWebSocket", subscription: str
+    ):
+        return self._unsubscribe_heads(subscription)
+
+    def _rpc_chain_getBlock(
+        self, conn: "FakeWebSocket", block_hash: str | None = None
+    ):
+        block_hash = block_hash or self.head
+        if block_hash not in self._headers:
+            return None
+        return {
+            "block": {
+                "header": self._headers[block_hash],
+                "extrinsics": self._bodies[block_hash],
+            },
+            "justifications": None,
+        }
+
+    def _rpc_state_getRuntimeVersion(
+        self, conn: "FakeWebSocket", block_hash: str | None = None
+    ) -> dict[str, Any]:
+        return {
+            "specName": "torus-runtime",
+            "implName": "torus-runtime",
+            "authoringVersion": 1,
+            "specVersion": SPEC_VERSION,
+            "implVersion": 1,
+            "apis": [],
+            "transactionVersion": TRANSACTION_VERSION,
+            "stateVersion": 1,
+        }
+
+    def _rpc_state_getMetadata(
+        self, conn: "FakeWebSocket", block_hash: str | None = None
+    ):
+        return encoded_metadata()
+
+    def _rpc_state_getKeys(
+        self,
+        conn: "FakeWebSocket",
+        prefix: str,
+        block_hash: str | None = None,
+    ):
+        return self.keys_with_prefix(prefix)
+
+    def _rpc_state_getStorage(
+        self, conn: "FakeWebSocket", key: str, block_hash: str | None = None
+    ):
+        if key == self._events_key:
+            return self._events.get(block_hash or self.head)
+        return self.storage.get(key)
+
+    def _rpc_state_queryStorageAt(
+        self,
+        conn: "FakeWebSocket",
+        keys: list[str],
+        block_hash: str | None = None,
+    ):
+        return self.query_storage_at(keys, block_hash)
+
+    def _rpc_system_accountNextIndex(self, conn: "FakeWebSocket", ss58: str):
+        return self.nonce_of(bytes.fromhex(ss58_decode(ss58)))  # type: ignore
+
+    def _rpc_author_submitExtrinsic(self, conn: "FakeWebSocket", data: str):
+        return self.submit(data, None)
+
+    def _rpc_author_submitAndWatchExtrinsic(
+        self, conn: "FakeWebSocket", data: str
+    ):
+        subscription = conn.new_subscription_id()
+
+        def notify(block_hash: str):
+            for status in ("inBlock", "finalized"):
+                conn.push(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "author_extrinsicUpdate",
+                        "params": {
+                            "subscription": subscription,
+                            "result": {status: block_hash},
+                        },
+                    }
+                )
+
+        self.submit(data, notify)
+        return subscription
+
+    def _rpc_author_unwatchExtrinsic(
+        self, conn: "FakeWebSocket", subscription: str
+    ):
+        return True
+
+    def _rpc_author_pendingExtrinsics(self, conn: "FakeWebSocket"):
+        return self.pending_extrinsics()
+
+    def _rpc_system_dryRun(
+        self, conn: "FakeWebSocket", data: str, block_hash: str | None = None
+    ):
+        extrinsic = _SignedExtrinsic(bytes.fromhex(data.removeprefix("0x")))
+        with self._lock:
+            expected = self._nonces.get(extrinsic.signer, 0)
+        if extrinsic.nonce != expected:
+            # Err(Invalid(Stale | Future))
+            stale = extrinsic.nonce < expected
+            return "0x0100" + ("03" if stale else "02")
+        if self.fail_call is not None and self.fail_call(extrinsic.call_index):
+            # Ok(Err(Module { index, error: [0; 4] }))
+            return (
+                "0x000103" + bytes([extrinsic.call_index[0]]).hex() + "00" * 4
+            )
+        return "0x0000"
+
+    def _rpc_payment_queryInfo(
+        self, conn: "FakeWebSocket", data: str, block_hash: str | None = None
+    ):
+        calls = _SignedExtrinsic(bytes.fromhex(data.removeprefix("0x"))).calls
+        return {
+            "weight": {
+                "ref_time": CALL_REF_TIME * calls,
+                "proof_size": CALL_PROOF_SIZE * calls,
+            },
+            "class": "normal",
+            "partialFee": str(PARTIAL_FEE * calls),
+        }
+
+
+class FakeWebSocket:
+    """
+    Stand-in for `websocket.WebSocket` backed by a `FakeChain`.
+
+    Requests are answered synchronously on `send`; the answers (and any
+    subscription updates) are queued for `recv`.
+    """
+
+    def __init__(self, chain: FakeChain, timeout: float | None = None):
+        self.chain = chain
+        self.connected = False
+        self.timeout = timeout
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._inbox: queue.Queue[str | None] = queue.Queue()
+        self._held: list[str] | None = None
+        self._push_lock = threading.Lock()
+        self._subscriptions = 0
+
+    def connect(self, url: str, **options: Any):
+        self.connected = True
+
+    def close(self, *args: Any, **kwargs: Any):
+        self.connected = False
+        # wakes up a blocked `recv`
+        self._inbox.put(None)
+
+    def pong(self, payload: bytes | str = b""):
+        pass
+
+    def ping(self, payload: bytes | str = b""):
+        pass
+
+    def new_subscription_id(self) -> str:
+        self._subscriptions += 1
+        return f"sub-{id(self):x}-{self._subscriptions}"
+
+    def push(self, message: dict[str, Any]):
+        frame = json.dumps(message)
+        # updates may be raised by other connections' requests
+        with self._push_lock:
+            if self._held is not None:
+                self._held.append(frame)
+            else:
+                self._inbox.put(frame)
+
+    def _answer(self, request: dict[str, Any]) -> dict[str, Any]:
+        response: dict[str, Any] = {"jsonrpc": "2.0", "id": request.get("id")}
+        try:
+            response["result"] = self.chain.handle(
+                request["method"], request.get("params") or [], self
+            )
+        except RpcError as e:
+            response["error"] = e.to_json()
+        return response
+
+    def send(self, payload: str | bytes, opcode: int = 1) -> int:
+        if not self.connected:
+            raise websocket.WebSocketConnectionClosedException(
+                "socket is already closed."
+            )
+        self.bytes_sent += len(payload)
+        request = json.loads(payload)
+        if self.chain.latency:
+            threading.Event().wait(self.chain.latency)
+        # subscription updates raised while answering must reach the client
+        # after the answer carrying the subscription id
+        with self._push_lock:
+            self._held = []
+        try:
+            if isinstance(request, list):
+                batch = cast(list[dict[str, Any]], request)
+                answer: Any = [self._answer(r) for r in batch]
+            else:
+                answer = self._answer(request)
+            self._inbox.put(json.dumps(answer))
+        finally:
+            with self._push_lock:
+                held, self._held = self._held, None
+                for frame in held or []:
+                    self._inbox.put(frame)
+        return len(payload)
+
+    def recv(self) -> str:
+        try:
+            message = self._inbox.get(timeout=self.timeout or 30)
+        except queue.Empty:
+            raise websocket.WebSocketTimeoutException("Connection timed out")
+        if message is None:
+            raise websocket.WebSocketConnectionClosedException(
+                "socket is already closed."
+            )
+        self.bytes_received += len(message)
+        return message
+
+
+def make_client(
+    chain: FakeChain,
+    num_connections: int = 1,
+    instrumentation: Instrumentation | None = None,
+) -> tuple[TorusClient, list[FakeWebSocket]]:
+    """
+    Creates a `TorusClient` connected to `chain`.
+
+    Returns:
+        The client and the list of sockets it opened, for traffic accounting.
+    """
+    sockets: list[FakeWebSocket] = []
+
+    def factory() -> FakeWebSocket:
+        ws = FakeWebSocket(chain)
+        sockets.append(ws)
+        return ws
+
+    client = TorusClient(
+        "ws://fake-node",
+        num_connections,
+        ws_factory=factory,
+        instrumentation=instrumentation,
+    )
+    return client, sockets
@@ -0,0 +1,143 @@
+"""
+Minimal benchmark harness: case registry, repeated runs and baseline
+comparison.
+"""
+
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+@dataclass
+class Metric:
+    name: str
+    value: float
+    unit: str
+    higher_is_better: bool = True
+
+
+@dataclass
+class Result:
+    """Median of every metric of a case over all its runs."""
+
+    case: str
+    metrics: dict[str, Metric]
+    spread: dict[str, float]
+
+
+Runner = Callable[[], list[Metric]]
+
+
+@dataclass
+class Case:
+    """
+    A benchmark case.
+
+    Attributes:
+        setup: Prepares the untimed state and returns the function to be
+            measured, which reports its own metrics.
+        isolated: Runs every repetition in a fresh process, for cases that
+            measure memory.
+    """
+
+    name: str
+    setup: Callable[[], Runner]
+    isolated: bool = False
+
+
+CASES: dict[str, Case] = {}
+
+
+def benchmark(name: str, isolated: bool = False):
+    def decorator(setup: Callable[[], Runner]) -> Callable[[], Runner]:
+        CASES[name] = Case(name, setup, isolated)
+        return setup
+
+    return decorator
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_isolated(name: str) -> list[Metric]:
+    from benchmarks import cases as _  # noqa: F401 (registers the cases)
+
+    return CASES[name].setup()()
+
+
+def run_case(case: Case, repeat: int, warmup: int = 1) -> Result:
+    runs: list[list[Metric]] = []
+    if case.isolated:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(1, maxtasksperchild=1) as pool:
+            for _ in range(repeat):
+                runs.append(pool.apply(_run_isolated, (case.name,)))
+    else:
+        run = case.setup()
+        for _ in range(warmup):
+            run()
+        for _ in range(repeat):
+            runs.append(run())
+
+    metrics: dict[str, Metric] = {}
+    spread: dict[str, float] = {}
+    for metric in runs[0]:
+        values = [m.value for r in runs for m in r if m.name == metric.name]
+        median = statistics.median(values)
+        metrics[metric.name] = Metric(
+            metric.name, median, metric.unit, metric.higher_is_better
+        )
+        spread[metric.name] = (
+            (max(values) - min(values)) / median if median else 0.0
+        )
+    return Result(case.name, metrics, spread)
+
+
+def load_baseline(path: Path) -> dict[str, dict[str, float]]:
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)["cases"]
+
+
+def save_baseline(path: Path, results: list[Result]):
+    previous = load_baseline(path)
+    for result in results:
+        previous[result.case] = {
+            name: round(metric.value, 2)
+            for name, metric in result.metrics.items()
+        }
+    data: dict[str, Any] = {
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.machine(),
+        },
+        "cases": dict(sorted(previous.items())),
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def relative_change(metric: Metric, baseline: float) -> float:
+    """
+    Change against the baseline, signed so that negative is always worse.
+    """
+    if baseline == 0:
+        return 0.0
+    change = (metric.value - baseline) / baseline
+    return change if metric.higher_is_better else -change
+
+
+def results_to_json(results: list[Result]) -> list[dict[str, Any]]:
+    return [asdict(result) for result in results]
@@ -0,0 +1,702 @@
+"""
+Synthetic V14 runtime metadata for the fake node.
+
+The metadata only describes the pallets, storages and calls that the
+benchmarks touch, but it is encoded with the same SCALE types a real
+Torus node serves, so `torustrateinterface` loads it through the regular
+`init_runtime` path.
+"""
+
+from functools import cache
+from typing import Any
+
+from scalecodec.base import RuntimeConfigurationObject
+from scalecodec.type_registry import (  # type: ignore
+    load_type_registry_preset,  # type: ignore
+)
+
+SS58_PREFIX = 42
+EXISTENTIAL_DEPOSIT = 10**15
+SPEC_VERSION = 1
+TRANSACTION_VERSION = 1
+# block weight limits of a Torus node: 2s of compute, 5 MiB of proof, 75%
+# of which for normal extrinsics
+MAX_BLOCK_REF_TIME = 2_000_000_000_000
+MAX_BLOCK_PROOF_SIZE = 5 * 1024 * 1024
+NORMAL_DISPATCH_RATIO = 0.75
+
+Fields = list[tuple[str | None, int]]
+
+
+class _PortableRegistryBuilder:
+    """
+    Builds a `PortableRegistry` type list, deduplicating identical types.
+    """
+
+    def __init__(self):
+        self.types: list[dict[str, Any]] = []
+        self._seen: dict[str, int] = {}
+        self._names: dict[int, str] = {}
+
+    def _add(
+        self,
+        definition: dict[str, Any],
+        path: list[str] | None = None,
+        params: list[tuple[str, int]] | None = None,
+    ) -> int:
+        type_info = {
+            "path": path or [],
+            "params": [{"name": n, "type": t} for n, t in params or []],
+            "def": definition,
+            "docs": [],
+        }
+        identity = repr(type_info)
+        if identity in self._seen:
+            return self._seen[identity]
+        type_id = len(self.types)
+        self.types.append({"id": type_id, "type": type_info})
+        self._seen[identity] = type_id
+        if path:
+            self._names[type_id] = path[-1]
+        elif "primitive" in definition:
+            self._names[type_id] = definition["primitive"]
+        return type_id
+
+    def reserve(self) -> int:
+        """Reserves an id for a type that is defined later (recursion)."""
+        type_id = len(self.types)
+        self.types.append({})
+        return type_id
+
+    def fill(
+        self,
+        type_id: int,
+        variants: list[tuple[str, Fields, int]],
+        path: list[str],
+    ):
+        self.types[type_id] = {
+            "id": type_id,
+            "type": {
+                "path": path,
+                "params": [],
+                "def": {"variant": {"variants": self._variants(variants)}},
+                "docs": [],
+            },
+        }
+        self._names[type_id] = path[-1]
+
+    def primitive(self, name: str) -> int:
+        return self._add({"primitive": name})
+
+    def sequence(self, type_id: int) -> int:
+        return self._add({"sequence": {"type": type_id}})
+
+    def array(self, length: int, type_id: int) -> int:
+        return self._add({"array": {"len": length, "type": type_id}})
+
+    def tuple_of(self, *type_ids: int) -> int:
+        return self._add({"tuple": list(type_ids)})
+
+    def compact(self, type_id: int) -> int:
+        return self._add({"compact": {"type": type_id}})
+
+    def composite(
+        self,
+        fields: Fields,
+        path: list[str],
+        params: list[tuple[str, int]] | None = None,
+    ) -> int:
+        return self._add(
+            {"composite": {"fields": self._fields(fields)}}, path, params
+        )
+
+    def variant(
+        self,
+        variants: list[tuple[str, Fields, int]],
+        path: list[str],
+        params: list[tuple[str, int]] | None = None,
+    ) -> int:
+        return self._add(
+            {"variant": {"variants": self._variants(variants)}}, path, params
+        )
+
+    def _fields(self, fields: Fields) -> list[dict[str, Any]]:
+        # call arguments are described by their type name
+        return [
+            {
+                "name": name,
+                "type": type_id,
+                "typeName": self._names.get(type_id, f"T{type_id}"),
+                "docs": [],
+            }
+            for name, type_id in fields
+        ]
+
+    def _variants(
+        self, variants: list[tuple[str, Fields, int]]
+    ) -> list[dict[str, Any]]:
+        return [
+            {
+                "name": name,
+                "fields": self._fields(fields),
+                "index": index,
+                "docs": [],
+            }
+            for name, fields, index in variants
+        ]
+
+
+def _storage_entry(
+    name: str,
+    type_: dict[str, Any],
+    default: bytes,
+    modifier: str = "Default",
+) -> dict[str, Any]:
+    return {
+        "name": name,
+        "modifier": modifier,
+        "type": type_,
+        "default": "0x" + default.hex(),
+        "documentation": [],
+    }
+
+
+def _map(hashers: list[str], key: int, value: int) -> dict[str, Any]:
+    return {"Map": {"hashers": hashers, "key": key, "value": value}}
+
+
+def _constant(name: str, type_id: int, value: bytes) -> dict[str, Any]:
+    return {
+        "name": name,
+        "type": type_id,
+        "value": "0x" + value.hex(),
+        "documentation": [],
+    }
+
+
+def encode_compact(value: int) -> bytes:
+    if value < 1 << 6:
+        return bytes([value << 2])
+    if value < 1 << 14:
+        return ((value << 2) | 0b01).to_bytes(2, "little")
+    if value < 1 << 30:
+        return ((value << 2) | 0b10).to_bytes(4, "little")
+    length = (value.bit_length() + 7) // 8
+    return bytes([((length - 4) << 2) | 0b11]) + value.to_bytes(
+        length, "little"
+    )
+
+
+def _block_weights() -> bytes:
+    """The SCALE encoded `System.BlockWeights` constant."""
+
+    def weight(ref_time: int, proof_size: int) -> bytes:
+        return encode_compact(ref_time) + encode_compact(proof_size)
+
+    def some(value: bytes) -> bytes:
+        return b"\x01" + value
+
+    max_block = weight(MAX_BLOCK_REF_TIME, MAX_BLOCK_PROOF_SIZE)
+    normal = weight(
+        int(MAX_BLOCK_REF_TIME * NORMAL_DISPATCH_RATIO),
+        int(MAX_BLOCK_PROOF_SIZE * NORMAL_DISPATCH_RATIO),
+    )
+    base_extrinsic = weight(125_000_000, 0)
+    per_class = (
+        # normal: max_extrinsic, max_total, no reserved weight
+        base_extrinsic + some(normal) + some(normal) + b"\x00"
+        # operational and mandatory
+        + base_extrinsic + some(max_block) + some(max_block) + b"\x00"
+        + base_extrinsic + b"\x00" + b"\x00" + b"\x00"
+    )  # fmt: skip
+    return weight(390_000_000, 0) + max_block + per_class
+
+
+def _pallet(
+    name: str,
+    index: int,
+    storage: list[dict[str, Any]] | None = None,
+    calls: int | None = None,
+    event: int | None = None,
+    constants: list[dict[str, Any]] | None = None,
+    error: int | None = None,
+) -> dict[str, Any]:
+    return {
+        "name": name,
+        "storage": {"prefix": name, "entries": storage} if storage else None,
+        "calls": {"ty": calls} if calls is not None else None,
+        "event": {"ty": event} if event is not None else None,
+        "constants": constants or [],
+        "error": {"ty": error} if error is not None else None,
+        "index": index,
+    }
+
+
+def build_metadata_dict() -> dict[str, Any]:
+    """
+    Builds the `MetadataV14` value of the synthetic runtime.
+    """
+    r = _PortableRegistryBuilder()
+
+    u8 = r.primitive("u8")
+    u16 = r.primitive("u16")
+    u32 = r.primitive("u32")
+    u64 = r.primitive("u64")
+    u128 = r.primitive("u128")
+    bool_ = r.primitive("bool")
+    unit = r.tuple_of()
+    bytes_ = r.sequence(u8)
+    bytes32 = r.array(32, u8)
+
+    account_id = r.composite(
+        [(None, bytes32)], ["sp_core", "crypto", "AccountId32"]
+    )
+    h256 = r.composite([(None, bytes32)], ["primitive_types", "H256"])
+    multi_address = r.variant(
+        [
+            ("Id", [(None, account_id)], 0),
+            ("Index", [(None, r.compact(unit))], 1),
+            ("Raw", [(None, bytes_)], 2),
+            ("Address32", [(None, bytes32)], 3),
+            ("Address20", [(None, r.array(20, u8))], 4),
+        ],
+        ["sp_runtime", "multiaddress", "MultiAddress"],
+        [("AccountId", account_id), ("AccountIndex", unit)],
+    )
+
+    # ==== System / Balances types ====
+
+    account_data = r.composite(
+        [("free", u128), ("reserved", u128), ("frozen", u128), ("flags", u128)],
+        ["pallet_balances", "types", "AccountData"],
+    )
+    account_info = r.composite(
+        [
+            ("nonce", u32),
+            ("consumers", u32),
+            ("providers", u32),
+            ("sufficients", u32),
+            ("data", account_data),
+        ],
+        ["frame_system", "AccountInfo"],
+    )
+    weight = r.composite(
+        [("ref_time", r.compact(u64)), ("proof_size", r.compact(u64))],
+        ["sp_weights", "weight_v2", "Weight"],
+    )
+    maybe_weight = r.variant(
+        [("None", [], 0), ("Some", [(None, weight)], 1)],
+        ["Option"],
+        [("T", weight)],
+    )
+    weights_per_class = r.composite(
+        [
+            ("base_extrinsic", weight),
+            ("max_extrinsic", maybe_weight),
+            ("max_total", maybe_weight),
+            ("reserved", maybe_weight),
+        ],
+        ["frame_system", "limits", "WeightsPerClass"],
+    )
+    block_weights = r.composite(
+        [
+            ("base_block", weight),
+            ("max_block", weight),
+            (
+                "per_class",
+                r.composite(
+                    [
+                        ("normal", weights_per_class),
+                        ("operational", weights_per_class),
+                        ("mandatory", weights_per_class),
+                    ],
+                    ["frame_support", "dispatch", "PerDispatchClass"],
+                    [("T", weights_per_class)],
+                ),
+            ),
+        ],
+        ["frame_system", "limits", "BlockWeights"],
+    )
+    dispatch_info = r.composite(
+        [
+            ("weight", weight),
+            (
+                "class",
+                r.variant(
+                    [
+                        ("Normal", [], 0),
+                        ("Operational", [], 1),
+                        ("Mandatory", [], 2),
+                    ],
+                    ["frame_support", "dispatch", "DispatchClass"],
+                ),
+            ),
+            (
+                "pays_fee",
+                r.variant(
+                    [("Yes", [], 0), ("No", [], 1)],
+                    ["frame_support", "dispatch", "Pays"],
+                ),
+            ),
+        ],
+        ["frame_support", "dispatch", "DispatchInfo"],
+    )
+    module_error = r.composite(
+        [("index", u8), ("error", r.array(4, u8))],
+        ["sp_runtime", "ModuleError"],
+    )
+    dispatch_error = r.variant(
+        [
+            ("Other", [], 0),
+            ("CannotLookup", [], 1),
+            ("BadOrigin", [], 2),
+            ("Module", [(None, module_error)], 3),
+        ],
+        ["sp_runtime", "DispatchError"],
+    )
+
+    # ==== Torus0 types ====
+
+    fee = r.composite(
+        [("staking_fee", u8), ("weight_control_fee", u8)],
+        ["pallet_torus0", "fee", "ValidatorFee"],
+    )
+    agent = r.composite(
+        [
+            ("key", account_id),
+            ("name", bytes_),
+            ("url", bytes_),
+            ("metadata", bytes_),
+            ("weight_penalty_factor", u8),
+            ("registration_block", u64),
+            ("fees", fee),
+        ],
+        ["pallet_torus0", "agent", "Agent"],
+    )
+
+    # ==== Calls ====
+
+    runtime_call = r.reserve()
+    compact_balance = r.compact(u128)
+    system_call = r.variant(
+        [("remark", [("remark", bytes_)], 0)],
+        ["frame_system", "pallet", "Call"],
+    )
+    balances_call = r.variant(
+        [
+            (
+                "transfer_allow_death",
+                [("dest", multi_address), ("value", compact_balance)],
+                0,
+            ),
+            (
+                "transfer_keep_alive",
+                [("dest", multi_address), ("value", compact_balance)],
+                3,
+            ),
+        ],
+        ["pallet_balances", "pallet", "Call"],
+    )
+    calls_vec = r.sequence(runtime_call)
+    utility_call = r.variant(
+        [
+            ("batch", [("calls", calls_vec)], 0),
+            ("batch_all", [("calls", calls_vec)], 2),
+            ("force_batch", [("calls", calls_vec)], 4),
+        ],
+        ["pallet_utility", "pallet", "Call"],
+    )
+    timepoint = r.composite(
+        [("height", u64), ("index", u32)],
+        ["pallet_multisig", "Timepoint"],
+        [("BlockNumber", u64)],
+    )
+    maybe_timepoint = r.variant(
+        [("None", [], 0), ("Some", [(None, timepoint)], 1)],
+        ["Option"],
+        [("T", timepoint)],
+    )
+    signatories = r.sequence(account_id)
+    multisig_call = r.variant(
+        [
+            (
+                "as_multi",
+                [
+                    ("threshold", u16),
+                    ("other_signatories", signatories),
+                    ("maybe_timepoint", maybe_timepoint),
+                    ("call", runtime_call),
+                    ("max_weight", weight),
+                ],
+                1,
+            ),
+            (
+                "approve_as_multi",
+                [
+                    ("threshold", u16),
+                    ("other_signatories", signatories),
+                    ("maybe_timepoint", maybe_timepoint),
+                    ("call_hash", bytes32),
+                    ("max_weight", weight),
+                ],
+                2,
+            ),
+        ],
+        ["pallet_multisig", "pallet", "Call"],
+    )
+    multisig = r.composite(
+        [
+            ("when", timepoint),
+            ("deposit", u128),
+            ("depositor", account_id),
+            ("approvals", signatories),
+        ],
+        ["pallet_multisig", "Multisig"],
+    )
+    torus0_call = r.variant(
+        [
+            ("add_stake", [("agent_key", account_id), ("amount", u128)], 0),
+            ("remove_stake", [("agent_key", account_id), ("amount", u128)], 1),
+            (
+                "transfer_stake",
+                [
+                    ("agent_key", account_id),
+                    ("new_agent_key", account_id),
+                    ("amount", u128),
+                ],
+                2,
+            ),
+        ],
+        ["pallet_torus0", "pallet", "Call"],
+    )
+    governance_call = r.variant(
+        [
+            ("add_to_whitelist", [("key", account_id)], 2),
+            ("remove_from_whitelist", [("key", account_id)], 3),
+            ("vote_proposal", [("proposal_id", u64), ("agree", bool_)], 9),
+            ("remove_vote_proposal", [("proposal_id", u64)], 10),
+            ("enable_vote_delegation", [], 11),
+            ("disable_vote_delegation", [], 12),
+        ],
+        ["pallet_governance", "pallet", "Call"],
+    )
+    r.fill(
+        runtime_call,
+        [
+            ("System", [(None, system_call)], 0),
+            ("Balances", [(None, balances_call)], 2),
+            ("Utility", [(None, utility_call)], 3),
+            ("Multisig", [(None, multisig_call)], 4),
+            ("Torus0", [(None, torus0_call)], 10),
+            ("Governance", [(None, governance_call)], 12),
+        ],
+        ["torus_runtime", "RuntimeCall"],
+    )
+
+    # ==== Events ====
+
+    system_event = r.variant(
+        [
+            ("ExtrinsicSuccess", [("dispatch_info", dispatch_info)], 0),
+            (
+                "ExtrinsicFailed",
+                [
+                    ("dispatch_error", dispatch_error),
+                    ("dispatch_info", dispatch_info),
+                ],
+                1,
+            ),
+        ],
+        ["frame_system", "pallet", "Event"],
+    )
+    runtime_event = r.variant(
+        [("System", [(None, system_event)], 0)],
+        ["torus_runtime", "RuntimeEvent"],
+    )
+    phase = r.variant(
+        [
+            ("ApplyExtrinsic", [(None, u32)], 0),
+            ("Finalization", [], 1),
+            ("Initialization", [], 2),
+        ],
+        ["frame_system", "Phase"],
+    )
+    event_record = r.composite(
+        [
+            ("phase", phase),
+            ("event", runtime_event),
+            ("topics", r.sequence(h256)),
+        ],
+        ["frame_system", "EventRecord"],
+        [("E", runtime_event), ("T", h256)],
+    )
+    torus0_error = r.variant(
+        [("AgentDoesNotExist", [], 0), ("NotEnoughBalanceToStake", [], 1)],
+        ["pallet_torus0", "pallet", "Error"],
+    )
+
+    # ==== Extrinsic format ====
+
+    signature = r.variant(
+        [
+            ("Ed25519", [(None, r.array(64, u8))], 0),
+            ("Sr25519", [(None, r.array(64, u8))], 1),
+            ("Ecdsa", [(None, r.array(65, u8))], 2),
+        ],
+        ["sp_runtime", "MultiSignature"],
+    )
+    era = r.variant(
+        [("Immortal", [], 0)], ["sp_runtime", "generic", "era", "Era"]
+    )
+    unchecked_extrinsic = r.composite(
+        [(None, bytes_)],
+        ["sp_runtime", "generic", "unchecked_extrinsic", "UncheckedExtrinsic"],
+        [
+            ("Address", multi_address),
+            ("Call", runtime_call),
+            ("Signature", signature),
+            ("Extra", unit),
+        ],
+    )
+    signed_extensions = [
+        ("CheckNonZeroSender", unit, unit),
+        ("CheckSpecVersion", unit, u32),
+        ("CheckTxVersion", unit, u32),
+        ("CheckGenesis", unit, h256),
+        ("CheckMortality", era, h256),
+        ("CheckNonce", r.compact(u32), unit),
+        ("CheckWeight", unit, unit),
+        ("ChargeTransactionPayment", compact_balance, unit),
+    ]
+
+    pallets = [
+        _pallet(
+            "System",
+            0,
+            storage=[
+                _storage_entry(
+                    "Account",
+                    _map(["Blake2_128Concat"], account_id, account_info),
+                    bytes(80),
+                ),
+                _storage_entry("Number", {"Plain": u64}, bytes(8)),
+                _storage_entry(
+                    "Events", {"Plain": r.sequence(event_record)}, bytes(1)
+                ),
+            ],
+            calls=system_call,
+            event=system_event,
+            constants=[
+                _constant("BlockWeights", block_weights, _block_weights()),
+                _constant("SS58Prefix", u16, SS58_PREFIX.to_bytes(2, "little")),
+            ],
+        ),
+        _pallet(
+            "Balances",
+            2,
+            calls=balances_call,
+            constants=[
+                _constant(
+                    "ExistentialDeposit",
+                    u128,
+                    EXISTENTIAL_DEPOSIT.to_bytes(16, "little"),
+                )
+            ],
+        ),
+        _pallet(
+            "Utility",
+            3,
+            calls=utility_call,
+            constants=[
+                _constant(
+                    "batched_calls_limit", u32, (10_922).to_bytes(4, "little")
+                )
+            ],
+        ),
+        _pallet(
+            "Multisig",
+            4,
+            storage=[
+                _storage_entry(
+                    "Multisigs",
+                    _map(
+                        ["Twox64Concat", "Blake2_128Concat"],
+                        r.tuple_of(account_id, bytes32),
+                        multisig,
+                    ),
+                    bytes(1),
+                    modifier="Optional",
+                ),
+            ],
+            calls=multisig_call,
+        ),
+        _pallet(
+            "Torus0",
+            10,
+            storage=[
+                _storage_entry(
+                    "Agents", _map(["Identity"], account_id, agent), bytes(0)
+                ),
+                _storage_entry(
+                    "RegistrationBlock",
+                    _map(["Identity"], account_id, u64),
+                    bytes(8),
+                ),
+                _storage_entry(
+                    "StakedBy",
+                    _map(
+                        ["Blake2_128Concat", "Blake2_128Concat"],
+                        r.tuple_of(account_id, account_id),
+                        u128,
+                    ),
+                    bytes(16),
+                ),
+                _storage_entry(
+                    "StakingTo",
+                    _map(
+                        ["Blake2_128Concat", "Blake2_128Concat"],
+                        r.tuple_of(account_id, account_id),
+                        u128,
+                    ),
+                    bytes(16),
+                ),
+                _storage_entry("TotalStake", {"Plain": u128}, bytes(16)),
+            ],
+            calls=torus0_call,
+            error=torus0_error,
+        ),
+        _pallet("Governance", 12, calls=governance_call),
+    ]
+
+    return {
+        "types": {"types": r.types},
+        "pallets": pallets,
+        "extrinsic": {
+            "ty": unchecked_extrinsic,
+            "version": 4,
+            "signed_extensions": [
+                {"identifier": name, "ty": ty, "additional_signed": extra}
+                for name, ty, extra in signed_extensions
+            ],
+        },
+        "runtime_type": runtime_call,
+    }
+
+
+@cache
+def encoded_metadata() -> str:
+    """
+    Returns the SCALE encoded `MetadataVersioned` of the synthetic runtime
+    as a hex string, as served by `state_getMetadata`.
+    """
+    runtime_config = RuntimeConfigurationObject()
+    runtime_config.update_type_registry(  # type: ignore
+        load_type_registry_preset("core")
+    )
+    metadata = runtime_config.create_scale_object(  # type: ignore
+        "MetadataVersioned"
+    )
+    data = metadata.encode(  # type: ignore
+        ("0x6d657461", {"V14": build_metadata_dict()})
+    )
+    return data.to_hex()
@@ -0,0 +1,314 @@
+"""
+Packing of many client calls into few `Utility.batch_all` extrinsics.
+
+Example:
+```py
+with client.batch(key) as batch:
+    for agent, amount in rebalance:
+        batch.stake(amount, agent)
+    batch.transfer(10**18, dest)
+print(len(batch.receipts))  # a few extrinsics instead of hundreds
+```
+"""
+
+from dataclasses import dataclass, field
+from types import TracebackType
+from typing import TYPE_CHECKING, Any, Callable
+
+from scalecodec.types import GenericCall
+from torustrateinterface import ExtrinsicReceipt, Keypair, SubstrateInterface
+
+from torusdk.errors import BatchedCallError
+
+if TYPE_CHECKING:
+    from torusdk.client import TorusClient
+
+# used when the runtime doesn't expose `System.BlockLength`
+DEFAULT_MAX_LENGTH = 1024 * 1024
+# fraction of the block limits a batch may take, leaving room for the
+# signature, extensions and other extrinsics
+LIMIT_MARGIN = 0.9
+
+
+@dataclass
+class BatchLimits:
+    """
+    Limits of a single batch extrinsic.
+
+    Attributes:
+        max_calls: Most calls in one batch (`Utility.batched_calls_limit`).
+        max_length: Most bytes of encoded calls in one batch.
+        max_ref_time: Most weight ref time of one extrinsic, if known.
+        max_proof_size: Most weight proof size of one extrinsic, if known.
+    """
+
+    max_calls: int
+    max_length: int
+    max_ref_time: int | None = None
+    max_proof_size: int | None = None
+
+    @classmethod
+    def from_runtime(cls, substrate: SubstrateInterface) -> "BatchLimits":
+        def constant(module: str, name: str) -> Any:
+            value = substrate.get_constant(module, name)  # type: ignore
+            return None if value is None else value.value  # type: ignore
+
+        max_calls = constant("Utility", "batched_calls_limit") or 1
+        max_length = DEFAULT_MAX_LENGTH
+        block_length = constant("System", "BlockLength")
+        if block_length is not None:
+            max_length = block_length["max"]["normal"]
+        limits = cls(int(max_calls), int(max_length * LIMIT_MARGIN))
+
+        block_weights = constant("System", "BlockWeights")
+        if block_weights is not None:
+            normal = block_weights["per_class"]["normal"]
+            max_weight = normal.get("max_extrinsic") or normal.get("max_total")
+            if max_weight is not None:
+                limits.max_ref_time = int(max_weight["ref_time"] * LIMIT_MARGIN)
+                limits.max_proof_size = int(
+                    max_weight["proof_size"] * LIMIT_MARGIN
+                )
+        return limits
+
+    def exceeds_weight(self, weight: dict[str, int]) -> bool:
+        if self.max_ref_time is not None:
+            if weight.get("ref_time", 0) > self.max_ref_time:
+                return True
+        if self.max_proof_size is not None:
+            if weight.get("proof_size", 0) > self.max_proof_size:
+                return True
+        return False
+
+
+@dataclass
+class BatchedCall:
+    module: str
+    fn: str
+    params: dict[str, Any]
+    sudo: bool = False
+
+
+class PendingReceipt(ExtrinsicReceipt):
+    """
+    Returned by `compose_call`, and the client methods calling it, for a
+    call recorded in a `CallBatch`. Its extrinsic only exists once the
+    batch is submitted, so reading anything of it raises
+    `BatchedCallError`; the receipts are in `CallBatch.receipts`.
+    """
+
+    def __init__(self, call: BatchedCall):
+        # no receipt state, every attribute read goes to `__getattribute__`
+        object.__setattr__(self, "_call", call)
+
+    def __getattribute__(self, name: str) -> Any:
+        if name.startswith("__"):
+            return object.__getattribute__(self, name)
+        call: BatchedCall = object.__getattribute__(self, "_call")
+        raise BatchedCallError(
+            f"The receipt of the batched call {call.module}.{call.fn} is "
+            "only known once the batch is submitted, see "
+            "`CallBatch.receipts`"
+        )
+
+
+@dataclass
+class CallBatch:
+    """
+    Collects the calls made through it and submits them packed in
+    `Utility.batch_all` extrinsics signed by `key`.
+
+    Any transaction method of `TorusClient` can be called on the batch,
+    without its key argument: `batch.stake(amount, dest)` records what
+    `client.stake(key, amount, dest)` would submit. The calls are submitted
+    when the `with` block exits without an error, or by `submit`.
+
+    Each extrinsic takes as many calls as fit in the batch call limit,
+    block length and extrinsic weight. `batch_all` is atomic, so a failing
+    call reverts its whole extrinsic, but earlier extrinsics stay included.
+
+    Attributes:
+        receipts: The receipts of the submitted extrinsics, in order.
+    """
+
+    client: "TorusClient"
+    key: Keypair
+    atomic: bool = True
+    wait_for_inclusion: bool = True
+    wait_for_finalization: bool | None = None
+    limits: BatchLimits | None = None
+    calls: list[BatchedCall] = field(default_factory=list[BatchedCall])
+    receipts: list[ExtrinsicReceipt] = field(
+        default_factory=list[ExtrinsicReceipt]
+    )
+
+    def add(
+        self,
+        fn: str,
+        params: dict[str, Any],
+        module: str = "Torus0",
+        sudo: bool = False,
+    ):
+        """
+        Adds a call to the batch.
+
+        Returns:
+            The call, as added to `calls`.
+        """
+        call = BatchedCall(module, fn, params, sudo)
+        self.calls.append(call)
+        return call
+
+    def __getattr__(self, name: str) -> Callable[..., None]:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        method = getattr(self.client, name)
+
+        def record(*args: Any, **kwargs: Any) -> None:
+            with self.client.recording_calls(self):
+                method(self.key, *args, **kwargs)
+
+        return record
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    def __enter__(self) -> "CallBatch":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ):
+        if exc_type is None:
+            self.submit()
+
+    def _compose(
+        self, substrate: SubstrateInterface, call: BatchedCall
+    ) -> GenericCall:
+        composed = substrate.compose_call(  # type: ignore
+            call_module=call.module,
+            call_function=call.fn,
+            call_params=call.params,
+        )
+        if call.sudo:
+            composed = substrate.compose_call(  # type: ignore
+                call_module="Sudo",
+                call_function="sudo",
+                call_params={"call": composed.value},  # type: ignore
+            )
+        return composed
+
+    def _as_batch(self, pack: list[GenericCall]) -> BatchedCall:
+        return BatchedCall(
+            "Utility",
+            "batch_all" if self.atomic else "force_batch",
+            {"calls": [call.value for call in pack]},  # type: ignore
+        )
+
+    def _split_by_weight(
+        self, packs: list[list[GenericCall]], limits: BatchLimits
+    ) -> list[list[list[GenericCall]]]:
+        """
+        Splits the packs that are too heavy in halves, until they fit.
+
+        The packs of each round are weighed together in one
+        `estimate_fees` batch, through `payment_queryInfo`.
+
+        Returns:
+            The packs each pack was split into, in order.
+        """
+        heavy = [pack for pack in packs if len(pack) > 1]
+        infos = iter(
+            self.client.estimate_fees(
+                [self._as_batch(pack) for pack in heavy], self.key
+            )
+            if heavy
+            else []
+        )
+        fits: list[bool] = []
+        halves: list[list[GenericCall]] = []
+        for pack in packs:
+            fit = len(pack) == 1 or not limits.exceeds_weight(
+                next(infos)["weight"]
+            )
+            fits.append(fit)
+            if not fit:
+                half = len(pack) // 2
+                halves += [pack[:half], pack[half:]]
+        splits = iter(self._split_by_weight(halves, limits) if halves else [])
+        return [
+            [pack] if fit else next(splits) + next(splits)
+            for pack, fit in zip(packs, fits)
+        ]
+
+    def pack(self) -> list[list[GenericCall]]:
+        """
+        Composes the collected calls and splits them into the calls of
+        each extrinsic.
+        """
+        with self.client.get_conn(init=True) as substrate:
+            if self.limits is None:
+                self.limits = BatchLimits.from_runtime(substrate)
+            limits = self.limits
+            composed = [self._compose(substrate, call) for call in self.calls]
+
+            packs: list[list[GenericCall]] = []
+            current: list[GenericCall] = []
+            length = 0
+            for call in composed:
+                call_length = len(call.data)  # type: ignore
+                if current and (
+                    len(current) >= limits.max_calls
+                    or length + call_length > limits.max_length
+                ):
+                    packs.append(current)
+                    current, length = [], 0
+                current.append(call)
+                length += call_length
+            if current:
+                packs.append(current)
+
+        if limits.max_ref_time is None and limits.max_proof_size is None:
+            return packs
+        return [
+            split
+            for splits in self._split_by_weight(packs, limits)
+            for split in splits
+        ]
+
+    def submit(self) -> list[ExtrinsicReceipt]:
+        """
+        Submits the collected calls, one extrinsic at a time.
+
+        Returns:
+            The receipts of the submitted extrinsics.
+
+        Raises:
+            ChainTransactionError: If an extrinsic fails. The calls of the
+              extrinsics before it stay included.
+        """
+        packs = self.pack()
+        self.calls = []
+        for pack in packs:
+            if len(pack) == 1:
+                value: dict[str, Any] = pack[0].value  # type: ignore
+                module: str = value["call_module"]
+                fn: str = value["call_function"]
+                params: dict[str, Any] = value["call_args"]
+            else:
+                module = "Utility"
+                fn = "batch_all" if self.atomic else "force_batch"
+                params = {"calls": [call.value for call in pack]}  # type: ignore
+            receipt = self.client.compose_call(
+                fn,
+                params,
+                self.key,
+                module=module,
+                wait_for_inclusion=self.wait_for_inclusion,
+                wait_for_finalization=self.wait_for_finalization,
+            )
+            self.receipts.append(receipt)
+        return self.receipts
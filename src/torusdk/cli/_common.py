@@ -10,20 +10,26 @@ import typer
 from pydantic import BaseModel
 from rich import box
 from rich.console import Console
+from rich.progress import track
 from rich.table import Table
 from torustrateinterface import Keypair
 from typer import Context
 
 from torusdk._common import CID_REGEX, TorusSettings, get_node_url
 from torusdk.balance import dict_from_nano, from_rems, to_rems
+from torusdk.batch import BatchedCall
 from torusdk.client import TorusClient
 from torusdk.errors import InvalidPasswordError, PasswordNotProvidedError
+from torusdk.fanout import fan_out
 from torusdk.key import (
     is_ss58_address,
     key_path,
     load_keypair,
+    local_keystore,
     resolve_key_ss58,
 )
+from torusdk.keyring import agent_keypair
+from torusdk.tracing import active_tracer, span, traced
 from torusdk.types.types import (
     AgentInfoWithOptionalBalance,
     Ss58Address,
@@ -73,7 +79,7 @@ def input_to_rems(value: float | None):
 
 def check_storage_exists(console: Console):
     root_path = key_path("").replace(".json", "")
-    if not os.path.exists(root_path):
+    if not os.path.exists(root_path) and local_keystore() is None:
         console.print(
             "Torus storage not found. Did you run `torus key migrate` "
             "after updating your package?",
@@ -157,13 +163,16 @@ class CustomCtx:
             node_url = self.get_node_url()
             self.info(f"Using node: {node_url}")
             for _ in range(5):
+                tracer = active_tracer()
                 try:
-                    self._com_client = TorusClient(
-                        url=node_url,
-                        num_connections=1,
-                        wait_for_finalization=False,
-                        timeout=65,
-                    )
+                    with span("connect", "client", url=node_url):
+                        self._com_client = TorusClient(
+                            url=node_url,
+                            num_connections=1,
+                            wait_for_finalization=False,
+                            timeout=65,
+                            instrumentation=tracer and tracer.instrumentation,
+                        )
                 except Exception:
                     self.info(f"Failed to connect to node: {node_url}")
                     node_url = self.get_node_url()
@@ -225,10 +234,25 @@ class CustomCtx:
             self.error(e.args[0])
             raise typer.Exit(code=1)
 
-    def load_key(self, key: str, password: str | None = None) -> Keypair:
-        root_path = key_path("").replace(".json", "")
-        if not os.path.exists(root_path):
-            check_storage_exists(self.console_err)
+    def load_key(
+        self, key: str, password: str | None = None, signing: bool = False
+    ) -> Keypair:
+        """
+        Loads a key, asking for its password if needed.
+
+        Args:
+            key: The name of the key.
+            password: The password of the key.
+            signing: The key is only used to sign. A key unlocked by a
+              running keyring agent is then returned without decrypting it,
+              but it has no private key nor seed to read.
+        """
+        if signing and password is None:
+            # unlocked by a running keyring agent, no password needed
+            agent_key = agent_keypair(key)
+            if agent_key is not None:
+                return agent_key
+        check_storage_exists(self.console_err)
         try:
             keypair = load_keypair(
                 key, password, password_provider=self.password_manager
@@ -241,6 +265,34 @@ class CustomCtx:
             self.error(f"Incorrect password for key '{key}'")
             raise typer.Exit(code=1)
 
+    def fan_out(
+        self,
+        client: TorusClient,
+        jobs: Mapping[str, tuple[Keypair, BatchedCall]],
+        description: str,
+    ) -> int:
+        """
+        Submits one call per key at once, printing each outcome as it is
+        included.
+
+        Returns:
+            The number of failed jobs.
+        """
+        failed = 0
+        results = fan_out(client, jobs)
+        for result in track(
+            results,
+            total=len(jobs),
+            description=description,
+            console=self.console_err,
+        ):
+            if result.success:
+                self.info(f"Done with key {result.name}")
+            else:
+                failed += 1
+                self.error(f"Key {result.name}: {result.error}")
+        return failed
+
 
 def make_custom_context(ctx: typer.Context) -> CustomCtx:
     return CustomCtx(
@@ -264,6 +316,7 @@ def eprint(e: Any) -> None:
     console.print(f"[bold red]ERROR: {e}", style="italic")
 
 
+@traced("render_table", "render")
 def print_table_from_plain_dict(
     result: Mapping[str, str | int | float | dict[Any, Any] | Ss58Address],
     column_names: list[str],
@@ -323,6 +376,7 @@ def render_pydantic_subtable(value: BaseModel | dict[Any, Any]) -> Table:
     return subtable
 
 
+@traced("render_table", "render")
 def render_single_pydantic_object(
     obj: BaseModel, console: Console, title: str = ""
 ) -> None:
@@ -356,6 +410,7 @@ def render_single_pydantic_object(
     console.print("\n")
 
 
+@traced("render_table", "render")
 def render_pydantic_table(
     objects: T | list[T],
     console: Console,
@@ -407,6 +462,7 @@ def render_pydantic_table(
     console.print("\n")
 
 
+@traced("render_table", "render")
 def print_table_standardize(
     result: dict[str, list[Any]], console: Console
 ) -> None:
@@ -451,6 +507,7 @@ def transform_module_into(
     return transformed_modules
 
 
+@traced("render_table", "render")
 def print_module_info(
     client: TorusClient,
     agents: list[AgentInfoWithOptionalBalance],
@@ -47,7 +47,7 @@ def register(
             "at https://docs.torus.network/agents/register-a-agent"
         )
         exit(1)
-    resolved_key = context.load_key(key, None)
+    resolved_key = context.load_key(key, None, signing=True)
     burn = client.get_burn()
     if not context.confirm(
         f"{from_rems(burn)} tokens will be burned. Do you want to continue?"
@@ -98,7 +98,7 @@ def add_application(
     context = make_custom_context(ctx)
     client = context.com_client()
 
-    resolved_key = context.load_key(payer_key)
+    resolved_key = context.load_key(payer_key, signing=True)
     application_addr = context.resolve_ss58(application_key)
     application_burn = get_governance_config(client).agent_application_cost
     confirm = context.confirm(
@@ -125,7 +125,7 @@ def deregister(ctx: Context, key: str):
     context = make_custom_context(ctx)
     client = context.com_client()
 
-    resolved_key = context.load_key(key)
+    resolved_key = context.load_key(key, signing=True)
 
     with context.progress_status("Deregistering your agent..."):
         response = client.deregister_module(key=resolved_key)
@@ -167,7 +167,7 @@ def update(
                 "at https://docs.torus.network/agents/register-a-agent"
             )
             exit(1)
-    resolved_key = context.load_key(key)
+    resolved_key = context.load_key(key, signing=True)
 
     agents = get_map_modules(client, include_balances=False)
     modules_to_list = [value for _, value in agents.items()]
@@ -1,16 +1,20 @@
+import csv
 import time
+from pathlib import Path
 from typing import Optional
 
 import typer
 from typer import Context
 
-from torusdk.balance import BalanceUnit, format_balance, to_rems
+from torusdk.balance import BalanceUnit, format_balance, from_rems, to_rems
 from torusdk.cli._common import (
     make_custom_context,
     print_table_from_plain_dict,
 )
 from torusdk.errors import ChainTransactionError
 from torusdk.faucet.powv2 import solve_for_difficulty_fast
+from torusdk.key import is_ss58_address
+from torusdk.payout import Payout, PayoutEngine
 
 balance_app = typer.Typer(no_args_is_help=True)
 
@@ -120,7 +124,7 @@ def transfer(ctx: Context, key: str, amount: float, dest: str):
 
     nano_amount = to_rems(amount)
 
-    resolved_key = context.load_key(key, None)
+    resolved_key = context.load_key(key, None, signing=True)
     resolved_dest = context.resolve_ss58(dest)
 
     if not context.confirm(
@@ -150,7 +154,7 @@ def transfer_stake(
     client = context.com_client()
 
     nano_amount = to_rems(amount)
-    keypair = context.load_key(key, None)
+    keypair = context.load_key(key, None, signing=True)
     resolved_from = context.resolve_ss58(from_key)
     resolved_dest = context.resolve_ss58(dest)
 
@@ -184,7 +188,7 @@ def stake(
     client = context.com_client()
 
     nano_amount = to_rems(amount)
-    keypair = context.load_key(key, None)
+    keypair = context.load_key(key, None, signing=True)
     resolved_dest = context.resolve_ss58(dest)
 
     delegating_message = (
@@ -215,7 +219,7 @@ def unstake(ctx: Context, key: str, amount: float, dest: str):
     client = context.com_client()
 
     nano_amount = to_rems(amount)
-    keypair = context.load_key(key, None)
+    keypair = context.load_key(key, None, signing=True)
     resolved_dest = context.resolve_ss58(dest)
 
     with context.progress_status(f"Unstaking {amount} tokens from {dest}'..."):
@@ -229,6 +233,83 @@ def unstake(ctx: Context, key: str, amount: float, dest: str):
         raise ChainTransactionError(response.error_message)  # type: ignore
 
 
+@balance_app.command()
+def payout(
+    ctx: Context,
+    key: str,
+    payouts_file: Path = typer.Argument(
+        ..., help="CSV file of `address,amount` lines, amounts in tokens."
+    ),
+    journal: Optional[Path] = typer.Option(
+        None,
+        help="Progress journal. Defaults to the payouts file with a "
+        "`.journal` suffix. Running again resumes from it.",
+    ),
+):
+    """
+    Pays every address of a CSV file, in as few extrinsics as fit a block
+    """
+    context = make_custom_context(ctx)
+
+    payouts: list[Payout] = []
+    with open(payouts_file, newline="") as f:
+        for line_number, row in enumerate(csv.reader(f), start=1):
+            if not row or row[0].startswith("#"):
+                continue
+            address = row[0].strip()
+            if not is_ss58_address(address):
+                context.error(
+                    f"Invalid address '{address}' on line {line_number}"
+                )
+                raise typer.Exit(code=1)
+            try:
+                amount = to_rems(float(row[1]))
+            except (IndexError, ValueError):
+                amount_column = row[1].strip() if len(row) > 1 else ""
+                context.error(
+                    f"Invalid amount '{amount_column}' on line {line_number}"
+                )
+                raise typer.Exit(code=1)
+            payouts.append((address, amount))
+
+    total = sum(amount for _, amount in payouts)
+    if not context.confirm(
+        f"Are you sure you want to pay {from_rems(total)} tokens "
+        f"to {len(payouts)} addresses?"
+    ):
+        raise typer.Abort()
+
+    client = context.com_client()
+    keypair = context.load_key(key, None, signing=True)
+    engine = PayoutEngine(
+        client,
+        keypair,
+        journal=journal or payouts_file.with_suffix(".journal"),
+    )
+    with context.progress_status(f"Paying {len(payouts)} addresses..."):
+        report = engine.run(payouts)
+
+    if report.skipped:
+        context.info(f"{report.skipped} addresses were already paid")
+    context.info(
+        f"Paid {report.paid} addresses in {len(report.receipts)} extrinsics"
+    )
+    for start, end in report.unconfirmed:
+        context.info(
+            f"Could not confirm payouts {start + 1} to {end}, "
+            "check their balances before paying them again"
+        )
+    for start, end, error in report.failed:
+        context.error(f"Payouts {start + 1} to {end} failed: {error}")
+    for start, end in report.unsubmitted:
+        context.error(
+            f"Payouts {start + 1} to {end} were not submitted, "
+            "run the payout again to pay them"
+        )
+    if report.failed or report.unsubmitted:
+        raise typer.Exit(code=1)
+
+
 # Ammount of seconds to wait between faucet executions
 SLEEP_BETWEEN_FAUCET_EXECUTIONS = 8
 
@@ -247,7 +328,7 @@ def run_faucet(
         context.error("Faucet only enabled on testnet")
         raise typer.Exit(code=1)
 
-    resolved_key = context.load_key(key, None)
+    resolved_key = context.load_key(key, None, signing=True)
 
     client = context.com_client()
     for _i in range(repeat):
@@ -21,7 +21,7 @@ def accept_application(
     context = make_custom_context(ctx)
     client = context.com_client()
 
-    resolved_curator_key = context.load_key(curator_key, None)
+    resolved_curator_key = context.load_key(curator_key, None, signing=True)
 
     with context.progress_status("Accepting application..."):
         client.accept_application(resolved_curator_key, application_id)
@@ -36,7 +36,7 @@ def add_to_whitelist(ctx: Context, curator_key: str, agent_key: str):
     context = make_custom_context(ctx)
     client = context.com_client()
 
-    resolved_curator_key = context.load_key(curator_key, None)
+    resolved_curator_key = context.load_key(curator_key, None, signing=True)
     resolved_agent_key = context.resolve_ss58(agent_key)
 
     with context.progress_status(f"Adding Agent {agent_key} to whitelist..."):
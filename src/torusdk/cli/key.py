@@ -1,5 +1,6 @@
 import os
 import re
+from datetime import timedelta
 from enum import Enum
 from typing import Any, Optional, cast
 
@@ -10,13 +11,17 @@ from typer import Context
 
 from torusdk._common import SS58_FORMAT
 from torusdk.balance import BalanceUnit, format_balance
+from torusdk.batch import BatchedCall
 from torusdk.cli._common import (
+    CustomCtx,
     make_custom_context,
     print_table_from_plain_dict,
     print_table_standardize,
 )
 from torusdk.compat.key import (
+    migrate_classic_keys,
     migrate_to_torus,
+    scan_classic_keys,
 )
 from torusdk.compat.storage import COMMUNE_HOME
 from torusdk.key import (
@@ -25,15 +30,26 @@ from torusdk.key import (
     generate_keypair,
     is_ss58_address,
     key_name_exists,
+    keystore_path,
     local_key_adresses,
+    local_keypairs,
+    local_keystore,
     store_key,
     to_pydantic,
 )
+from torusdk.keygen import (
+    create_keys,
+    read_mnemonic_file,
+    regen_keys,
+    rotate_key_passwords,
+)
+from torusdk.keystore import SqliteKeystore
 from torusdk.misc import (
     local_keys_allbalance,
     local_keys_to_freebalance,
     local_keys_to_stakedbalance,
 )
+from torusdk.vanity import VanityPattern, VanityProgress, find_vanity_keypair
 
 key_app = typer.Typer(no_args_is_help=True)
 
@@ -72,6 +88,55 @@ def create(
     context.info(f"Key successfully stored with name '{name}'.")
 
 
+@key_app.command()
+def vanity(
+    ctx: Context,
+    name: str,
+    prefix: str = typer.Option(
+        "", help="Characters starting the address, like 5Gx."
+    ),
+    suffix: str = typer.Option("", help="Characters ending the address."),
+    ignore_case: bool = typer.Option(False, help="Match letters in any case."),
+    password: str = typer.Option(None),
+    processes: Optional[int] = typer.Option(
+        None, help="Worker processes, the number of CPUs by default."
+    ),
+):
+    """
+    Generates a key whose address has a given prefix and/or suffix, and
+    stores it with the given name. The key has no mnemonic.
+    """
+    context = make_custom_context(ctx)
+    try:
+        pattern = VanityPattern(prefix, suffix, ignore_case)
+    except ValueError as e:
+        context.error(str(e))
+        raise typer.Exit(code=1)
+    if not prefix and not suffix:
+        context.error("Provide a prefix or a suffix to search for")
+        raise typer.Exit(code=1)
+
+    if key_name_exists(name):
+        context.info(f"WARNING! Key '{name}' already exists", style="bold")
+        if not context.confirm("Are you sure you want to override it?"):
+            raise typer.Abort()
+
+    def report(progress: VanityProgress):
+        if not progress.rate:
+            return
+        status.update(
+            f"{progress.attempts:,} attempts, {progress.rate:,.0f}/s, "
+            f"about {timedelta(seconds=round(progress.eta))} expected"
+        )
+
+    with context.progress_status("Searching...") as status:
+        keypair = find_vanity_keypair(pattern, processes, on_progress=report)
+
+    context.info(f"Found key with public address '{keypair.ss58_address}'.")
+    store_key(keypair, name, password)
+    context.info(f"Key successfully stored with name '{name}'.")
+
+
 @key_app.command()
 def regen(
     ctx: Context, name: str, key_input: str, password: Optional[str] = None
@@ -105,6 +170,116 @@ def regen(
     context.info(f"Key stored with name `{name}` successfully.")
 
 
+def _confirm_overrides(context: CustomCtx, names: list[str]):
+    existing = local_key_adresses().keys() & set(names)
+    if not existing:
+        return
+    context.info(
+        f"WARNING! {len(existing)} of the keys already exist", style="bold"
+    )
+    if not context.confirm("Are you sure you want to override them?"):
+        raise typer.Abort()
+
+
+@key_app.command()
+def create_many(
+    ctx: Context,
+    count: int,
+    prefix: str = typer.Option("key", help="Prefix of the key names."),
+    start: int = typer.Option(0, help="Index of the first key."),
+    password: str = typer.Option(None),
+    processes: Optional[int] = typer.Option(
+        None, help="Worker processes, the number of CPUs by default."
+    ),
+):
+    """
+    Generates many keys, named `<prefix><index>`, across worker processes.
+    """
+    context = make_custom_context(ctx)
+    names = [f"{prefix}{i}" for i in range(start, start + count)]
+    _confirm_overrides(context, names)
+
+    with context.progress_status(f"Generating {count} keys...") as status:
+        addresses = create_keys(
+            names,
+            password,
+            processes,
+            on_stored=lambda n: status.update(f"Stored {n}/{count} keys..."),
+        )
+
+    context.info(f"Generated and stored {len(addresses)} keys.")
+
+
+@key_app.command()
+def regen_many(
+    ctx: Context,
+    mnemonic_file: str,
+    password: str = typer.Option(None),
+    processes: Optional[int] = typer.Option(
+        None, help="Worker processes, the number of CPUs by default."
+    ),
+):
+    """
+    Stores the keys of a file with a key name and its mnemonic per line,
+    deriving them across worker processes.
+    """
+    context = make_custom_context(ctx)
+    try:
+        mnemonics = read_mnemonic_file(mnemonic_file)
+    except (OSError, ValueError) as e:
+        context.error(str(e))
+        raise typer.Exit(code=1)
+    _confirm_overrides(context, list(mnemonics))
+
+    count = len(mnemonics)
+    with context.progress_status(f"Deriving {count} keys...") as status:
+        try:
+            addresses = regen_keys(
+                mnemonics,
+                password,
+                processes,
+                on_stored=lambda n: status.update(
+                    f"Stored {n}/{count} keys..."
+                ),
+            )
+        except ValueError as e:
+            context.error(f"Invalid mnemonic: {e}")
+            raise typer.Exit(code=1)
+
+    context.info(f"Stored {len(addresses)} keys.")
+
+
+@key_app.command()
+def rotate_password(
+    ctx: Context,
+    keys: Optional[list[str]] = typer.Argument(None),
+    processes: Optional[int] = typer.Option(
+        None, help="Worker processes, the number of CPUs by default."
+    ),
+):
+    """
+    Re-encrypts keys with a new password, every local key if none is
+    given. Keys with another password are left as they are.
+    """
+    context = make_custom_context(ctx)
+    old_password = context.prompt_secret("Current password")
+    new_password = context.prompt_secret("New password")
+    if context.prompt_secret("Repeat the new password") != new_password:
+        context.error("The passwords don't match")
+        raise typer.Exit(code=1)
+
+    with context.progress_status("Re-encrypting keys...") as status:
+        rotated = rotate_key_passwords(
+            old_password,
+            new_password,
+            keys or None,
+            processes,
+            on_stored=lambda n: status.update(f"Re-encrypted {n} keys..."),
+        )
+
+    context.info(f"Re-encrypted {len(rotated)} keys.")
+
+
 @key_app.command()
 def show(
     ctx: Context,
@@ -369,21 +544,16 @@ def power_delegation(
             context.info("Aborted.")
             exit(0)
 
-        local_keys = local_key_adresses(context.password_manager)
+        keypairs = local_keypairs(context.password_manager, use_agent=True)
     else:
-        local_keys = {key: None}
-    for key_name in local_keys.keys():
-        keypair = context.load_key(key_name, None)
-        if enable is True:
-            context.info(
-                f"Enabling vote power delegation on key {key_name} ..."
-            )
-            client.enable_vote_power_delegation(keypair)
-        else:
-            context.info(
-                f"Disabling vote power delegation on key {key_name} ..."
-            )
-            client.disable_vote_power_delegation(keypair)
+        keypairs = {key: context.load_key(key, None, signing=True)}
+
+    fn = "enable_vote_delegation" if enable else "disable_vote_delegation"
+    call = BatchedCall("Governance", fn, {})
+    jobs = {name: (keypair, call) for name, keypair in keypairs.items()}
+    action = "Enabling" if enable else "Disabling"
+    if context.fan_out(client, jobs, f"{action} vote power delegation..."):
+        raise typer.Exit(code=1)
 
 
 @key_app.command()
@@ -394,7 +564,7 @@ def weight_delegation(
 ):
     context = make_custom_context(ctx)
     client = context.com_client()
-    resolved_key = context.load_key(key, None)
+    resolved_key = context.load_key(key, None, signing=True)
     resolved_target = context.resolve_ss58(target)
 
     if not context.confirm(
@@ -414,7 +584,7 @@ def regain_weight_delegation(
 ):
     context = make_custom_context(ctx)
     client = context.com_client()
-    resolved_key = context.load_key(key, None)
+    resolved_key = context.load_key(key, None, signing=True)
 
     if not context.confirm(
         "Are you sure you want to regain vote power "
@@ -426,7 +596,18 @@ def regain_weight_delegation(
 
 
 @key_app.command()
-def migrate(ctx: Context, key: Optional[str] = typer.Option(None)):
+def migrate(
+    ctx: Context,
+    key: Optional[str] = typer.Option(None),
+    processes: Optional[int] = typer.Option(
+        None, help="Worker processes, the number of CPUs by default."
+    ),
+):
+    """
+    Copies the keys of the .commune storage to the .torus storage, all of
+    them across worker processes if no key is given. Keys already in the
+    .torus storage are skipped, so an interrupted migration can be resumed.
+    """
     context = make_custom_context(ctx)
     if not context.confirm(
         "You are about to migrate your .commune keys to the .torus storage. "
@@ -436,24 +617,69 @@ def migrate(ctx: Context, key: Optional[str] = typer.Option(None)):
     ):
         raise typer.Abort()
     commune_home = os.path.expanduser(COMMUNE_HOME) + "/key"
-    torus_home = os.path.expanduser(TORUS_HOME) + "/key"
     if key is None:
-        keys = os.listdir(commune_home)
-    else:
-        keys = [key]
-    for key in keys:
-        commune_path = os.path.join(commune_home, key)
-        torus_path = os.path.join(torus_home, key)
-
-        if os.path.isfile(commune_path):
-            if not os.path.exists(torus_path):
-                key_name = key.replace(".json", "")
-                migrate_to_torus(key_name, context.password_manager)
-            else:
-                context.info(
-                    f"Key {key} already exists in .torus storage. "
-                    "Not going to migrate it."
-                )
+        # passwords are asked for before the spinner starts
+        jobs, result = scan_classic_keys(context.password_manager)
+        with context.progress_status("Migrating keys...") as status:
+            result = migrate_classic_keys(
+                jobs,
+                result,
+                processes,
+                on_stored=lambda n: status.update(f"Migrated {n} keys..."),
+            )
+        if result.skipped:
+            context.info(
+                f"{len(result.skipped)} keys already exist in .torus "
+                "storage. Not going to migrate them."
+            )
+        for name, reason in result.failed.items():
+            context.error(f"Could not migrate key {name}: {reason}")
+        context.info(f"Migrated {len(result.migrated)} keys.")
+        return
+    commune_path = os.path.join(commune_home, key)
+
+    if os.path.isfile(commune_path):
+        key_name = key.replace(".json", "")
+        # checks the SQLite keystore too, if it's the active storage
+        if not key_name_exists(key_name):
+            migrate_to_torus(key_name, context.password_manager)
         else:
-            context.error(f"Key not found in .commune storage: {key}")
+            context.info(
+                f"Key {key} already exists in .torus storage. "
+                "Not going to migrate it."
+            )
+    else:
+        context.error(f"Key not found in .commune storage: {key}")
     print("Migration completed.")
+
+
+@key_app.command()
+def keystore_import(ctx: Context, overwrite: bool = False):
+    """
+    Imports the key files into a single-file SQLite keystore, which is then
+    used instead of them. The key files are left untouched.
+    """
+    context = make_custom_context(ctx)
+    key_dir = os.path.expanduser(TORUS_HOME) + "/key"
+    if not os.path.isdir(key_dir):
+        context.error(f"No key directory found at {key_dir}")
+        raise typer.Exit(code=1)
+    keystore = local_keystore() or SqliteKeystore(keystore_path())
+    imported = keystore.import_dir(key_dir, overwrite=overwrite)
+    context.info(f"Imported {imported} keys into {keystore.path}.")
+
+
+@key_app.command()
+def keystore_export(ctx: Context, overwrite: bool = False):
+    """
+    Writes the keys of the SQLite keystore back as key files. Remove the
+    keystore afterwards to use the key files again.
+    """
+    context = make_custom_context(ctx)
+    keystore = local_keystore()
+    if keystore is None:
+        context.error(f"No keystore found at {keystore_path()}")
+        raise typer.Exit(code=1)
+    key_dir = os.path.expanduser(TORUS_HOME) + "/key"
+    exported = keystore.export_dir(key_dir, overwrite=overwrite)
+    context.info(f"Exported {exported} keys to {key_dir}.")
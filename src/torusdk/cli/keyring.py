@@ -0,0 +1,73 @@
+from typing import Optional
+
+import typer
+from torustrateinterface import Keypair
+from typer import Context
+
+from torusdk.cli._common import make_custom_context
+from torusdk.errors import KeyringAgentError
+from torusdk.key import local_keypairs
+from torusdk.keyring import (
+    DEFAULT_IDLE_TIMEOUT,
+    AgentClient,
+    KeyAgent,
+    agent_is_running,
+    agent_socket_path,
+    lock_memory,
+)
+
+
+def agentd(
+    ctx: Context,
+    keys: Optional[list[str]] = typer.Argument(None),
+    idle_timeout: float = typer.Option(
+        DEFAULT_IDLE_TIMEOUT,
+        help="Seconds without requests after which the keys are wiped.",
+    ),
+    stop: bool = typer.Option(False, help="Stop the running agent."),
+):
+    """
+    Unlocks keys once and signs with them for other torus commands.
+
+    Runs in the foreground until stopped, or idle for `--idle-timeout`
+    seconds. Meanwhile, commands using the unlocked keys ask the agent for
+    signatures instead of decrypting them. Unlocks every key if none is
+    given.
+    """
+    context = make_custom_context(ctx)
+    path = agent_socket_path()
+
+    if stop:
+        try:
+            AgentClient(path).lock()
+        except KeyringAgentError as e:
+            context.error(str(e))
+            raise typer.Exit(code=1)
+        context.info("Agent stopped, its keys were wiped.")
+        return
+
+    if agent_is_running(path):
+        context.error(f"An agent is already running on {path}")
+        raise typer.Exit(code=1)
+    keypairs: dict[str, Keypair]
+    if keys:
+        keypairs = {name: context.load_key(name) for name in keys}
+    else:
+        keypairs = local_keypairs(context.password_manager)
+    if not keypairs:
+        context.error("No keys to unlock")
+        raise typer.Exit(code=1)
+    # after loading the keys, to lock the pages holding them
+    if not lock_memory():
+        context.info(
+            "Could not lock the agent's memory, the keys may be swapped out."
+        )
+
+    agent = KeyAgent(keypairs, path, idle_timeout)
+    keypairs.clear()
+    context.info(f"Serving {len(agent.names)} keys on {path}.")
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    context.info("Agent stopped, its keys were wiped.")
@@ -2,11 +2,11 @@ import re
 from typing import Optional
 
 import typer
-from rich.progress import track
 from typer import Context
 
 from torusdk._common import CID_REGEX
 from torusdk.balance import to_rems
+from torusdk.batch import BatchedCall
 from torusdk.cli._common import (
     CustomCtx,
     extract_cid,
@@ -66,22 +66,23 @@ def vote_proposal(
         context.info("Voting with all keys on disk...")
         delegators = client.get_power_users()
         keys_stake = get_valid_voting_keys(context, client)
-        keys_stake = {
-            key: stake
-            for key, stake in keys_stake.items()
-            if key not in delegators
+        # only the keys that vote are decrypted
+        voters = {
+            name: context.load_key(name, None, signing=True)
+            for name in keys_stake
+            if name not in delegators
         }
     else:
-        keys_stake = {key: None}
+        voters = {key: context.load_key(key, None, signing=True)}
 
-    for voting_key in track(keys_stake.keys(), description="Voting..."):
-        keypair = context.load_key(voting_key, None)
-        try:
-            client.vote_on_proposal(keypair, proposal_id, agree)
-        except Exception as e:
-            print(f"Error while voting with key {key}: ", e)
-            print("Skipping...")
-            continue
+    vote = BatchedCall(
+        "Governance",
+        "vote_proposal",
+        {"proposal_id": proposal_id, "agree": agree},
+    )
+    jobs = {name: (keypair, vote) for name, keypair in voters.items()}
+    if context.fan_out(client, jobs, "Voting..."):
+        raise typer.Exit(code=1)
 
 
 @proposal_app.command()
@@ -92,7 +93,7 @@ def unvote_proposal(ctx: Context, key: str, proposal_id: int):
     context = make_custom_context(ctx)
     client = context.com_client()
 
-    resolved_key = context.load_key(key, None)
+    resolved_key = context.load_key(key, None, signing=True)
     with context.progress_status(f"Unvoting on a proposal {proposal_id}..."):
         client.unvote_on_proposal(resolved_key, proposal_id)
 
@@ -111,7 +112,7 @@ def add_custom_proposal(ctx: Context, key: str, cid: str):
         cid = ipfs_prefix + cid
     client = context.com_client()
 
-    resolved_key = context.load_key(key, None)
+    resolved_key = context.load_key(key, None, signing=True)
 
     with context.progress_status("Adding a proposal..."):
         client.add_custom_proposal(resolved_key, cid)
@@ -169,7 +170,7 @@ def transfer_dao_funds(
     context = make_custom_context(ctx)
 
     nano_amount = to_rems(amount)
-    keypair = context.load_key(signer_key, None)
+    keypair = context.load_key(signer_key, None, signing=True)
     dest = context.resolve_ss58(dest)
 
     client = context.com_client()
@@ -209,7 +210,7 @@ def propose_globally(
     global_params = get_global_params(client)
     proposal = merge_models(global_params, proposal_args)
 
-    kp = context.load_key(key)
+    kp = context.load_key(key, signing=True)
     client.add_global_proposal(kp, proposal, cid_hash)
     context.info("Proposal added.")
 
@@ -230,6 +231,6 @@ def propose_emission(
     client = context.com_client()
     emission_params = get_emission_params(client)
     proposal = merge_models(emission_params, proposal_args)
-    kp = context.load_key(key)
+    kp = context.load_key(key, signing=True)
     client.add_emission_proposal(kp, proposal, cid)
     context.info("Proposal added.")
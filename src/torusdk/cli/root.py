@@ -1,14 +1,18 @@
+import cProfile
+from pathlib import Path
 from typing import Annotated, Optional
 
 import typer
 
 from torusdk import __version__
+from torusdk.tracing import span, start_tracing, stop_tracing
 
 from ._common import ExtraCtxData
 from .agent import agent_app
 from .balance import balance_app
 from .curator import curator_app
 from .key import key_app
+from .keyring import agentd
 from .misc import misc_app
 from .network import network_app
 from .proposal import proposal_app
@@ -22,6 +26,7 @@ app.add_typer(agent_app, name="agent", help="Agent operations")
 app.add_typer(network_app, name="network", help="Network operations")
 app.add_typer(proposal_app, name="proposal", help="Proposal operations")
 app.add_typer(curator_app, name="curator", help="Curator operations")
+app.command(name="agentd")(agentd)
 
 
 def _version_callback(value: bool):
@@ -30,6 +35,31 @@ def _version_callback(value: bool):
         raise typer.Exit()
 
 
+def _start_trace(
+    ctx: typer.Context, trace: Path, profile: bool, command: str | None
+):
+    """
+    Traces the invoked command into `trace`, and profiles it into
+    `trace` with a `.prof` suffix if `profile` is set. Both are written when
+    the command exits.
+    """
+    tracer = start_tracing()
+    profiler = cProfile.Profile() if profile else None
+
+    def save():
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(trace.with_suffix(".prof"))
+        stop_tracing()
+        tracer.save(trace)
+
+    # registered before the span so it is closed first
+    ctx.call_on_close(save)
+    ctx.with_resource(span(command or "torus", "command"))
+    if profiler is not None:
+        profiler.enable()
+
+
 def flag_option(
     flag: str,
     flag_envvar: str,
@@ -65,6 +95,19 @@ def main(
     version: Annotated[
         Optional[bool], typer.Option(callback=_version_callback)
     ] = None,
+    trace: Annotated[
+        Optional[Path],
+        typer.Option(
+            help="Write a Chrome trace of the command to this file.",
+            dir_okay=False,
+        ),
+    ] = None,
+    trace_profile: Annotated[
+        bool,
+        typer.Option(
+            help="Also write cProfile stats next to the trace, as .prof.",
+        ),
+    ] = False,
 ):
     """
     Torus CLI {version}
@@ -75,6 +118,8 @@ def main(
     ctx.obj = ExtraCtxData(
         output_json=json, use_testnet=testnet, yes_to_all=yes_to_all
     )
+    if trace is not None:
+        _start_trace(ctx, trace, trace_profile, ctx.invoked_subcommand)
 
 
 if main.__doc__ is not None:
@@ -6,15 +6,42 @@ from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
 from copy import deepcopy
 from dataclasses import dataclass
-from time import sleep
-from typing import Any, Mapping, TypeVar
+from time import perf_counter, sleep
+from typing import Any, Iterable, Sequence, TypeVar
 
-import websocket
+from scalecodec.types import GenericAccountId, GenericCall, GenericExtrinsic
 from torustrateinterface import ExtrinsicReceipt, Keypair, SubstrateInterface
+from torustrateinterface.exceptions import SubstrateRequestException
 from torustrateinterface.storage import StorageKey
 
 from torusdk._common import transform_stake_dmap
+from torusdk.batch import BatchedCall, CallBatch, PendingReceipt
 from torusdk.errors import ChainTransactionError, NetworkQueryError
+from torusdk.instrumentation import (
+    NOOP_INSTRUMENTATION,
+    ChunkEvent,
+    ConnWaitEvent,
+    DecodeEvent,
+    Instrumentation,
+    InstrumentedWebSocket,
+    ReconnectEvent,
+)
+from torusdk.multisig import MultisigSession
+from torusdk.nonce import NonceManager
+from torusdk.offline import RuntimeSnapshot
+from torusdk.preflight import (
+    DryRunResult,
+    decode_apply_result,
+    normalize_payment_info,
+)
+from torusdk.receipts import ReceiptManager
+from torusdk.ss58 import AccountId
+from torusdk.tracker import ExtrinsicTracker, extrinsic_hash
+from torusdk.transport import (
+    WebSocketFactory,
+    WebSocketLike,
+    default_ws_factory,
+)
 from torusdk.types.proposal import Emission
 from torusdk.types.types import (
     Agent,
@@ -22,10 +49,17 @@ from torusdk.types.types import (
     GlobalParams,
     Ss58Address,
 )
+from torusdk.util.memo import LRUMemo, freeze
 
 # TODO: InsufficientBalanceError, MismatchedLengthError etc
 
 MAX_REQUEST_SIZE = 9_000_000
+# requests per JSON-RPC batch of `estimate_fees` and `dry_run`
+PREFLIGHT_BATCH_SIZE = 1000
+# extrinsics per JSON-RPC batch of `submit_signed`
+SUBMIT_BATCH_SIZE = 500
+# decoded values kept per storage function by `memoize_values`
+VALUE_MEMO_SIZE = 4096
 
 
 @dataclass
@@ -59,11 +93,26 @@ def send_heartbeat(
         sleep(11)  # Send heartbeat every 30 seconds
 
 
+def _connect_websocket(
+    url: str,
+    ws_factory: WebSocketFactory = default_ws_factory,
+    instrumentation: Instrumentation = NOOP_INSTRUMENTATION,
+) -> WebSocketLike:
+    ws = ws_factory()
+    if instrumentation.enabled:
+        ws = InstrumentedWebSocket(ws, instrumentation)
+    ws.connect(url)
+    return ws
+
+
 def _instantiate_substrateinterface(
-    url: str, ws_options: dict[str, bool | int], lock: threading.Lock
+    url: str,
+    ws_options: dict[str, bool | int],
+    lock: threading.Lock,
+    ws_factory: WebSocketFactory = default_ws_factory,
+    instrumentation: Instrumentation = NOOP_INSTRUMENTATION,
 ):
-    ws = websocket.WebSocket()
-    ws.connect(url)  # type: ignore
+    ws = _connect_websocket(url, ws_factory, instrumentation)
     stop_event = threading.Event()
     si = SubstrateInterface(websocket=ws, ws_options=ws_options)
     heartbeat_thread = threading.Thread(
@@ -85,6 +134,9 @@ class TorusClient:
 
     Attributes:
         wait_for_finalization: Whether to wait for transaction finalization.
+        nonce_manager: When set, signed calls take their nonces from it
+          instead of fetching them from the node, so a key can have many
+          extrinsics in flight.
 
     Example:
     ```py
@@ -101,6 +153,10 @@ class TorusClient:
     _num_connections: int
     _connection_queue: queue.Queue[ConnectionContainer]
     _ws_options: dict[str, int]
+    _ws_factory: WebSocketFactory
+    instrumentation: Instrumentation
+    nonce_manager: NonceManager | None
+    value_memos: dict[str, LRUMemo[tuple[Any, ...], Any]]
     url: str
 
     def __init__(
@@ -109,16 +165,32 @@ class TorusClient:
         num_connections: int = 1,
         wait_for_finalization: bool = False,
         timeout: int | None = None,
+        ws_factory: WebSocketFactory = default_ws_factory,
+        instrumentation: Instrumentation | None = None,
     ):
         """
         Args:
             url: The URL of the network node to connect to.
             num_connections: The number of websocket connections to be opened.
+            ws_factory: Creates the websockets of the pool. See
+              `torusdk.transport` for recording and replaying transports.
+            instrumentation: Receives timings and sizes of requests, pool
+              waits, decoding and reconnects. See `torusdk.instrumentation`.
         """
         assert num_connections > 0
         self._num_connections = num_connections
         self.wait_for_finalization = wait_for_finalization
         self._connection_queue = queue.Queue(num_connections)
+        self._ws_factory = ws_factory
+        self.instrumentation = instrumentation or NOOP_INSTRUMENTATION
+        self.nonce_manager = None
+        self._trackers: dict[bool, ExtrinsicTracker] = {}
+        self._trackers_lock = threading.Lock()
+        self._recording = threading.local()
+        self._constants: dict[tuple[str, str], Any] = {}
+        self.receipts = ReceiptManager(self)
+        self._multisigs: dict[tuple[tuple[str, ...], int], MultisigSession] = {}
+        self.value_memos = {}
         self.url = url
 
         for _ in range(num_connections):
@@ -128,10 +200,45 @@ class TorusClient:
             self._ws_options = ws_options
             self._connection_queue.put(
                 _instantiate_substrateinterface(
-                    url, ws_options, threading.Lock()
+                    url,
+                    ws_options,
+                    threading.Lock(),
+                    ws_factory,
+                    self.instrumentation,
                 )
             )
 
+    def memoize_values(
+        self, *storage_functions: str, maxsize: int = VALUE_MEMO_SIZE
+    ):
+        """
+        Memoizes the decoded values of storage maps by their SCALE bytes.
+
+        Entries of large maps often have the same bytes, like zero balances
+        in `System.Account`: each distinct value is then decoded once. The
+        memoized values are shared between entries and queries, so they are
+        immutable, dictionaries as `FrozenDict`s and lists as tuples. The
+        hit rate of each memo is in `value_memos`.
+
+        Maps with the same name in different modules share a memo, but not
+        their values, which are memoized by value type too.
+
+        Args:
+            storage_functions: The names of the storage maps.
+            maxsize: The number of values kept per storage map.
+        """
+        for storage_function in storage_functions:
+            self.value_memos[storage_function] = LRUMemo(maxsize)
+
+    def open_websocket(self) -> WebSocketLike:
+        """
+        Opens a websocket to the node outside of the pool, for long lived
+        subscriptions.
+        """
+        return _connect_websocket(
+            self.url, self._ws_factory, self.instrumentation
+        )
+
     @property
     def connections(self) -> int:
         """
@@ -159,7 +266,13 @@ class TorusClient:
             QueueEmptyError: If no connection is available within the timeout
               period.
         """
-        conn = self._connection_queue.get(timeout=timeout)
+        instrumentation = self.instrumentation
+        if instrumentation.enabled:
+            start = perf_counter()
+            conn = self._connection_queue.get(timeout=timeout)
+            instrumentation.on_conn_wait(ConnWaitEvent(perf_counter() - start))
+        else:
+            conn = self._connection_queue.get(timeout=timeout)
         if init:
             conn.substrate.init_runtime()  # type: ignore
         try:
@@ -171,8 +284,14 @@ class TorusClient:
                 # reconnects
                 conn.stop_event.set()
                 conn = _instantiate_substrateinterface(
-                    self.url, self._ws_options, threading.Lock()
+                    self.url,
+                    self._ws_options,
+                    threading.Lock(),
+                    self._ws_factory,
+                    instrumentation,
                 )
+                if instrumentation.enabled:
+                    instrumentation.on_reconnect(ReconnectEvent(self.url))
                 with conn.lock:
                     yield conn.substrate
         finally:
@@ -270,7 +389,9 @@ class TorusClient:
             extract_result: Whether to extract the result from the response.
 
         Raises:
-            NetworkQueryError: If there is an `error` in the response message.
+            NetworkQueryError: If there is an `error` in the response message,
+              when extracting results. Otherwise, the error messages are
+              returned along with the others.
 
         Note:
             No explicit return value as results are appended to the provided 'results' list.
@@ -305,7 +426,7 @@ class TorusClient:
                                 )
                         else:
                             results.append(message)
-                    if "error" in message:
+                    if extract_result and "error" in message:
                         raise NetworkQueryError(message["error"])
 
             return results
@@ -446,6 +567,21 @@ class TorusClient:
                 chunk_results.append(resul)
         return chunk_results
 
+    def rpc_batch_messages(
+        self, batch_requests: list[tuple[str, list[Any]]]
+    ) -> list[dict[str, Any]]:
+        """
+        Sends requests in a single JSON-RPC batch, returning their response
+        messages, each with a `result` or an `error`, in the order of the
+        requests.
+        """
+        [messages] = self._rpc_request_batch(  # type: ignore
+            batch_requests, extract_result=False
+        )
+        by_id = {message["id"]: message for message in messages}  # type: ignore
+        # request ids are assigned from 1, in order
+        return [by_id[i] for i in range(1, len(batch_requests) + 1)]  # type: ignore
+
     def _rpc_request_batch_chunked(
         self, chunk_requests: list[Chunk], extract_result: bool = True
     ):
@@ -501,6 +637,16 @@ class TorusClient:
                 _, mutated_chunk_info = split_chunks(
                     macro_chunk, chunk_requests, idx
                 )
+            if self.instrumentation.enabled:
+                self.instrumentation.on_chunks(
+                    ChunkEvent(
+                        chunks=len(mutated_chunk_info),
+                        requests=sum(
+                            len(chunk.batch_requests)
+                            for chunk in mutated_chunk_info
+                        ),
+                    )
+                )
             for chunk in mutated_chunk_info:
                 request_ids: list[int] = []
                 batch_payload: list[Any] = []
@@ -535,10 +681,18 @@ class TorusClient:
         function_parameters: list[tuple[Any, Any, Any, Any, str]],
         prefix_list: list[Any],
         block_hash: str,
+        accounts: dict[bytes, AccountId] | None = None,
     ) -> dict[str, dict[Any, Any]]:
         """
         Decodes a response from the substrate interface and organizes the data into a dictionary.
 
+        With `accounts`, accounts are never SS58 encoded: AccountId keys
+        and values are decoded as `AccountId`s, interned in `accounts`, and
+        AccountIds nested in values as their public keys in hex.
+
+        Values of the storage functions in `value_memos` are looked up in
+        their memo by SCALE bytes, and decoded only when missing.
+
         Args:
             response: A list of encoded responses from a substrate query.
             function_parameters: A list of tuples containing the parameters for each storage function.
@@ -570,8 +724,17 @@ class TorusClient:
             item_key: tuple[Any, ...] | Any,
         ) -> tuple[Any, ...] | Any:
             if isinstance(item_key, tuple):
-                return tuple(k.value for k in item_key)  # type: ignore
-            return item_key.value
+                return tuple(scale_value(k) for k in item_key)  # type: ignore
+            return scale_value(item_key)
+
+        def scale_value(obj: Any) -> Any:
+            if accounts is None or not isinstance(obj, GenericAccountId):
+                return obj.value
+            public_key = bytes.fromhex(obj.public_key[2:])  # type: ignore
+            account = accounts.get(public_key)
+            if account is None:
+                account = accounts[public_key] = AccountId(public_key)
+            return account
 
         def concat_hash_len(key_hasher: str) -> int:
             """
@@ -612,42 +775,76 @@ class TorusClient:
             value_type, param_types, key_hashers, params, storage_function = (
                 fun_params_tuple
             )
+            instrumentation = self.instrumentation
             with self.get_conn(init=True) as substrate:
-                for item in changes:
-                    # Determine type string
-                    key_type_string: list[Any] = []
-                    for n in range(len(params), len(param_types)):
-                        key_type_string.append(
-                            f"[u8; {concat_hash_len(key_hashers[n])}]"
-                        )
-                        key_type_string.append(param_types[n])
-
-                    item_key_obj = substrate.decode_scale(  # type: ignore
-                        type_string=f"({', '.join(key_type_string)})",
-                        scale_bytes="0x" + item[0][len(prefix) :],
+                decode_start = perf_counter() if instrumentation.enabled else 0
+                # the connection is ours, so is its runtime configuration
+                ss58_format = substrate.runtime_config.ss58_format  # type: ignore
+                if accounts is not None:
+                    substrate.runtime_config.ss58_format = None  # type: ignore
+                memo = self.value_memos.get(storage_function)
+                # the same bytes decode differently in another runtime, or
+                # as the value type of a map of another module
+                runtime: int = substrate.runtime_version  # type: ignore
+                raw = accounts is not None
+
+                def decode_value(scale_bytes: str) -> Any:
+                    item_value = substrate.decode_scale(  # type: ignore
+                        type_string=value_type,
+                        scale_bytes=scale_bytes,
                         return_scale_obj=True,
                         block_hash=block_hash,
                     )
-                    # strip key_hashers to use as item key
-                    if len(param_types) - len(params) == 1:
-                        item_key = item_key_obj.value_object[1]  # type: ignore
-                    else:
-                        item_key = tuple(  # type: ignore
-                            item_key_obj.value_object[key + 1]  # type: ignore
-                            for key in range(  # type: ignore
-                                len(params), len(param_types) + 1, 2
+                    return scale_value(item_value)
+
+                try:
+                    for item in changes:
+                        # Determine type string
+                        key_type_string: list[Any] = []
+                        for n in range(len(params), len(param_types)):
+                            key_type_string.append(
+                                f"[u8; {concat_hash_len(key_hashers[n])}]"
                             )
+                            key_type_string.append(param_types[n])
+
+                        item_key_obj = substrate.decode_scale(  # type: ignore
+                            type_string=f"({', '.join(key_type_string)})",
+                            scale_bytes="0x" + item[0][len(prefix) :],
+                            return_scale_obj=True,
+                            block_hash=block_hash,
                         )
+                        # strip key_hashers to use as item key
+                        if len(param_types) - len(params) == 1:
+                            item_key = item_key_obj.value_object[1]  # type: ignore
+                        else:
+                            item_key = tuple(  # type: ignore
+                                item_key_obj.value_object[key + 1]  # type: ignore
+                                for key in range(  # type: ignore
+                                    len(params), len(param_types) + 1, 2
+                                )
+                            )
 
-                    item_value = substrate.decode_scale(  # type: ignore
-                        type_string=value_type,
-                        scale_bytes=item[1],
-                        return_scale_obj=True,
-                        block_hash=block_hash,
+                        scale_bytes: str = item[1]
+                        if memo is None:
+                            value = decode_value(scale_bytes)
+                        else:
+                            value = memo.get_or_insert_lazy(
+                                (runtime, raw, value_type, scale_bytes),
+                                lambda: freeze(decode_value(scale_bytes)),
+                            )
+                        result_dict.setdefault(storage_function, {})
+                        key = get_item_key_value(item_key)  # type: ignore
+                        result_dict[storage_function][key] = value
+                finally:
+                    substrate.runtime_config.ss58_format = ss58_format  # type: ignore
+                if instrumentation.enabled:
+                    instrumentation.on_decode(
+                        DecodeEvent(
+                            storage_function,
+                            len(changes),  # type: ignore
+                            perf_counter() - decode_start,
+                        )
                     )
-                    result_dict.setdefault(storage_function, {})
-                    key = get_item_key_value(item_key)  # type: ignore
-                    result_dict[storage_function][key] = item_value.value  # type: ignore
 
         return result_dict
 
@@ -703,6 +900,7 @@ class TorusClient:
         self,
         functions: dict[str, list[tuple[str, list[Any]]]],
         block_hash: str | None = None,
+        raw_accounts: bool = False,
     ) -> dict[str, dict[Any, Any]]:
         """
         Queries multiple storage functions using a map batch approach and returns the combined result.
@@ -710,6 +908,10 @@ class TorusClient:
         Args:
             substrate: An instance of SubstrateInterface for substrate interaction.
             functions (dict[str, list[query_call]]): A dictionary mapping module names to lists of query calls.
+            raw_accounts: Decode accounts as `AccountId`s, the 32-byte
+              public keys encoded as SS58 only when printed, instead of
+              addresses. Each account is a single object across the result.
+              Accounts nested in values are decoded as hex public keys.
 
         Returns:
             The combined result of the map batch query.
@@ -719,17 +921,7 @@ class TorusClient:
             # Returns the combined result of the map batch query
         """
         multi_result: dict[str, dict[Any, Any]] = {}
-
-        def recursive_update(
-            d: dict[str, dict[T1, T2] | dict[str, Any]],
-            u: Mapping[str, dict[Any, Any] | str],
-        ) -> dict[str, dict[T1, T2]]:
-            for k, v in u.items():
-                if isinstance(v, dict):
-                    d[k] = recursive_update(d.get(k, {}), v)  # type: ignore
-                else:
-                    d[k] = v  # type: ignore
-            return d  # type: ignore
+        accounts: dict[bytes, AccountId] | None = {} if raw_accounts else None
 
         def get_page():
             send, prefix_list = self._get_storage_keys(
@@ -771,8 +963,14 @@ class TorusClient:
                     chunk_info.fun_params,
                     chunk_info.prefix_list,
                     block_hash,
+                    accounts,
                 )
-                multi_result = recursive_update(multi_result, storage_result)
+                # chunks have distinct keys, and the values may be shared
+                # memoized ones: merge the maps without copying the values
+                for storage_function, entries in storage_result.items():
+                    multi_result.setdefault(storage_function, {}).update(
+                        entries
+                    )
 
         return multi_result
 
@@ -814,6 +1012,7 @@ class TorusClient:
         module: str = "Torus0",
         extract_value: bool = True,
         block_hash: str | None = None,
+        raw_accounts: bool = False,
     ) -> dict[Any, Any]:
         """
         Queries a storage map from a network node.
@@ -822,6 +1021,8 @@ class TorusClient:
             name: The name of the storage map to query.
             params: A list of parameters for the query.
             module: The module in which the storage map is located.
+            raw_accounts: Decode accounts as `AccountId`s instead of SS58
+              addresses, see `query_batch_map`.
 
         Returns:
             A dictionary representing the key-value pairs
@@ -831,13 +1032,369 @@ class TorusClient:
             QueryError: If the query to the network fails or is invalid.
         """
 
-        result = self.query_batch_map({module: [(name, params)]}, block_hash)
+        result = self.query_batch_map(
+            {module: [(name, params)]}, block_hash, raw_accounts
+        )
 
         if extract_value:
             return {k.value: v.value for k, v in result}  # type: ignore
 
         return result
 
+    def _create_extrinsic(
+        self,
+        substrate: SubstrateInterface,
+        fn: str,
+        params: dict[str, Any],
+        key: Keypair | None,
+        module: str,
+        sudo: bool,
+        unsigned: bool,
+        nonce: int | None,
+        signature: str | None = None,
+        era: dict[str, int] | None = None,
+    ) -> GenericExtrinsic:
+        call = self._compose_call(substrate, fn, params, module, sudo)
+        if not unsigned:
+            assert key is not None
+            return substrate.create_signed_extrinsic(  # type: ignore
+                call=call,
+                keypair=key,
+                nonce=nonce,  # type: ignore
+                signature=signature,  # type: ignore
+                era=era,  # type: ignore
+            )
+        return substrate.create_unsigned_extrinsic(call=call)  # type: ignore
+
+    def _compose_call(
+        self,
+        substrate: SubstrateInterface,
+        fn: str,
+        params: dict[str, Any],
+        module: str,
+        sudo: bool,
+    ) -> GenericCall:
+        call = substrate.compose_call(  # type: ignore
+            call_module=module, call_function=fn, call_params=params
+        )
+        if sudo:
+            call = substrate.compose_call(  # type: ignore
+                call_module="Sudo",
+                call_function="sudo",
+                call_params={
+                    "call": call.value,  # type: ignore
+                },
+            )
+        return call
+
+    def _encode_calls(
+        self,
+        substrate: SubstrateInterface,
+        calls: Sequence[BatchedCall],
+        key: Keypair,
+        nonce: int,
+        signature: str | None = None,
+    ) -> list[str]:
+        encoded: list[str] = []
+        for call in calls:
+            extrinsic = self._create_extrinsic(
+                substrate,
+                call.fn,
+                call.params,
+                key,
+                call.module,
+                call.sudo,
+                False,
+                nonce,
+                signature,
+            )
+            encoded.append(str(extrinsic.data))  # type: ignore
+        return encoded
+
+    def _preflight_batch(self, method: str, extrinsics: list[str]) -> list[Any]:
+        """
+        Sends one `method` request per extrinsic, in batches of
+        `PREFLIGHT_BATCH_SIZE` spread over the connection pool.
+        """
+
+        def send(chunk: list[str]) -> list[Any]:
+            messages = self.rpc_batch_messages(
+                [(method, [data]) for data in chunk]
+            )
+            results: list[Any] = []
+            for message in messages:
+                if "result" not in message:
+                    raise NetworkQueryError(message.get("error"))
+                results.append(message["result"])
+            return results
+
+        chunks = [
+            extrinsics[i : i + PREFLIGHT_BATCH_SIZE]
+            for i in range(0, len(extrinsics), PREFLIGHT_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(self.connections) as executor:
+            return [
+                result
+                for results in executor.map(send, chunks)
+                for result in results
+            ]
+
+    def estimate_fees(
+        self, calls: Sequence[BatchedCall], key: Keypair | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Estimates the weight and fee of many calls, without submitting
+        them, with pipelined `payment_queryInfo` batches.
+
+        The extrinsics are not really signed, as no valid signature is
+        needed to estimate a fee.
+
+        Args:
+            calls: The calls to estimate, each as its own extrinsic.
+            key: The signer of the extrinsics. A throwaway key is used if
+              omitted, the fee doesn't depend on the signer.
+
+        Returns:
+            The payment info of each call, in order, in the format of
+              `SubstrateInterface.get_payment_info`.
+
+        Raises:
+            NetworkQueryError: If the node fails to estimate a call.
+        """
+        if key is None:
+            key = Keypair.create_from_mnemonic(Keypair.generate_mnemonic())
+        signature = "0x" + "00" * 64
+        with self.get_conn(init=True) as substrate:
+            extrinsics = self._encode_calls(substrate, calls, key, 0, signature)
+        infos = self._preflight_batch("payment_queryInfo", extrinsics)
+        return [normalize_payment_info(info) for info in infos]
+
+    def dry_run(
+        self, calls: Sequence[BatchedCall], key: Keypair
+    ) -> list[DryRunResult]:
+        """
+        Checks whether many calls would be valid and succeed, without
+        submitting them, with pipelined `system_dryRun` batches.
+
+        Every call is applied on its own to the state of the best block, so
+        a call depending on an earlier one of the list may be reported as
+        failing. `system_dryRun` is an unsafe RPC method, only exposed by
+        nodes run with `--rpc-methods unsafe`.
+
+        Args:
+            calls: The calls to check, each as its own extrinsic.
+            key: The keypair signing the extrinsics.
+
+        Returns:
+            The outcome of each call, in order.
+
+        Raises:
+            NetworkQueryError: If the node fails to dry run a call.
+        """
+        with self.get_conn(init=True) as substrate:
+            nonce: int = substrate.get_account_nonce(key.ss58_address) or 0  # type: ignore
+            extrinsics = self._encode_calls(substrate, calls, key, nonce)
+        results = self._preflight_batch("system_dryRun", extrinsics)
+        with self.get_conn() as substrate:
+            return [
+                decode_apply_result(substrate, result) for result in results
+            ]
+
+    def runtime_snapshot(self) -> RuntimeSnapshot:
+        """
+        Takes what an `OfflineComposer` needs to encode and sign extrinsics
+        for the current runtime.
+        """
+        with self.get_conn(init=True) as substrate:
+            return RuntimeSnapshot.from_substrate(substrate)
+
+    def submit_signed(
+        self,
+        extrinsics: Iterable[str],
+        wait_for_finalization: bool | None = None,
+    ) -> list[Future[ExtrinsicReceipt]]:
+        """
+        Streams signed extrinsics to the node, in JSON-RPC batches of
+        `SUBMIT_BATCH_SIZE`, without waiting for their inclusion.
+
+        Args:
+            extrinsics: The signed extrinsics, as hex, e.g. from an
+              `OfflineComposer`. Consumed lazily, so they may be produced
+              while earlier ones are being sent.
+            wait_for_finalization: Resolve once the block is finalized,
+              instead of once it is imported.
+
+        Returns:
+            A future per extrinsic, in order, resolved with its receipt
+              once included. The future of an extrinsic the node rejects
+              fails with `SubstrateRequestException`, and the futures of a
+              batch that couldn't be sent with the error of the request.
+        """
+        if wait_for_finalization is None:
+            wait_for_finalization = self.wait_for_finalization
+        tracker = self.tracker(wait_for_finalization)
+        futures: list[Future[ExtrinsicReceipt]] = []
+
+        def send(chunk: list[str]):
+            hashes = [extrinsic_hash(data) for data in chunk]
+            # tracked first, so their blocks can't be missed
+            futures.extend(tracker.track(hash) for hash in hashes)
+            try:
+                messages = self.rpc_batch_messages(
+                    [("author_submitExtrinsic", [data]) for data in chunk]
+                )
+            except Exception as e:
+                # their futures fail, instead of waiting for the timeout
+                for hash in hashes:
+                    tracker.untrack(hash, e)
+                return
+            for hash, message in zip(hashes, messages):
+                if "error" in message:
+                    tracker.untrack(
+                        hash, SubstrateRequestException(message["error"])
+                    )
+
+        chunk: list[str] = []
+        for extrinsic in extrinsics:
+            chunk.append(extrinsic)
+            if len(chunk) >= SUBMIT_BATCH_SIZE:
+                send(chunk)
+                chunk = []
+        if chunk:
+            send(chunk)
+        return futures
+
+    def batch(
+        self,
+        key: Keypair,
+        atomic: bool = True,
+        wait_for_inclusion: bool = True,
+        wait_for_finalization: bool | None = None,
+    ) -> CallBatch:
+        """
+        Creates a batch packing the calls made through it into as few
+        `Utility.batch_all` extrinsics as the block limits allow.
+
+        Args:
+            key: The keypair signing every call of the batch.
+            atomic: Revert the whole extrinsic when one of its calls fails
+              (`batch_all`). Otherwise, calls are dispatched independently
+              (`force_batch`).
+            wait_for_inclusion: Wait for each extrinsic's inclusion in a
+              block.
+            wait_for_finalization: Wait for each extrinsic's finalization.
+
+        Example:
+        ```py
+        with client.batch(key) as batch:
+            batch.stake(amount, agent)
+            batch.transfer(amount, dest)
+        ```
+        """
+        return CallBatch(
+            self,
+            key,
+            atomic=atomic,
+            wait_for_inclusion=wait_for_inclusion,
+            wait_for_finalization=wait_for_finalization,
+        )
+
+    @contextmanager
+    def recording_calls(self, batch: CallBatch):
+        """
+        Makes the calls composed in this thread be added to `batch`
+        instead of being submitted.
+        """
+        previous = getattr(self._recording, "batch", None)
+        self._recording.batch = batch
+        try:
+            yield batch
+        finally:
+            self._recording.batch = previous
+
+    def tracker(self, finalized: bool = False) -> ExtrinsicTracker:
+        """
+        Gets the shared tracker resolving extrinsics on new or finalized
+        blocks, creating it on first use.
+        """
+        with self._trackers_lock:
+            tracker = self._trackers.get(finalized)
+            if tracker is None:
+                tracker = ExtrinsicTracker(self, finalized=finalized)
+                self._trackers[finalized] = tracker
+        return tracker
+
+    def submit_async(
+        self,
+        fn: str,
+        params: dict[str, Any],
+        key: Keypair,
+        module: str = "Torus0",
+        wait_for_finalization: bool | None = None,
+        sudo: bool = False,
+        nonce: int | None = None,
+    ) -> Future[ExtrinsicReceipt]:
+        """
+        Composes and submits a call, without waiting for its inclusion.
+
+        The connection is only used to sign and submit the extrinsic. Its
+        inclusion is followed by the shared `tracker`, which watches any
+        number of extrinsics over a single subscription.
+
+        Args:
+            fn: The function name to call on the network.
+            params: A dictionary of parameters for the call.
+            key: The keypair for signing the extrinsic.
+            module: The module containing the function.
+            wait_for_finalization: Resolve once the block is finalized,
+              instead of once it is imported.
+            sudo: Execute the call as a sudo (superuser) operation.
+            nonce: The nonce to sign the extrinsic with. If omitted, it is
+              taken from `nonce_manager` if set, or fetched from the node.
+
+        Returns:
+            A future resolved with the receipt of the included extrinsic.
+              Its `is_success` tells whether the call succeeded.
+
+        Raises:
+            SubstrateRequestException: If the node rejects the extrinsic.
+        """
+        if nonce is None and self.nonce_manager is not None:
+            address = Ss58Address(key.ss58_address)  # type: ignore
+            with self.nonce_manager.reserve(address) as nonce:
+                future = self.submit_async(
+                    fn,
+                    params,
+                    key,
+                    module=module,
+                    wait_for_finalization=wait_for_finalization,
+                    sudo=sudo,
+                    nonce=nonce,
+                )
+            # a dropped extrinsic leaves a gap, the nonce is fetched again
+            self.nonce_manager.watch(address, future)
+            return future
+
+        if wait_for_finalization is None:
+            wait_for_finalization = self.wait_for_finalization
+        tracker = self.tracker(wait_for_finalization)
+
+        with self.get_conn() as substrate:
+            extrinsic = self._create_extrinsic(
+                substrate, fn, params, key, module, sudo, False, nonce
+            )
+            hash = "0x" + extrinsic.extrinsic_hash.hex()  # type: ignore
+            # tracked first, so the block can't be missed
+            future = tracker.track(hash)
+            try:
+                substrate.submit_extrinsic(
+                    extrinsic=extrinsic, wait_for_inclusion=False
+                )
+            except Exception:
+                tracker.untrack(hash)
+                raise
+        return future
+
     def compose_call(
         self,
         fn: str,
@@ -848,6 +1405,7 @@ class TorusClient:
         wait_for_finalization: bool | None = None,
         sudo: bool = False,
         unsigned: bool = False,
+        nonce: int | None = None,
     ) -> ExtrinsicReceipt:
         """
         Composes and submits a call to the network node.
@@ -865,11 +1423,15 @@ class TorusClient:
             wait_for_inclusion: Wait for the call's inclusion in a block.
             wait_for_finalization: Wait for the transaction's finalization.
             sudo: Execute the call as a sudo (superuser) operation.
+            nonce: The nonce to sign the extrinsic with. If omitted, it is
+              taken from `nonce_manager` if set, or fetched from the node.
 
         Returns:
             The receipt of the submitted extrinsic, if
               `wait_for_inclusion` is True. Otherwise, returns a string
-              identifier of the extrinsic.
+              identifier of the extrinsic. While a `CallBatch` records the
+              calls of this thread, the call is only added to it, and a
+              `PendingReceipt` is returned.
 
         Raises:
             ChainTransactionError: If the transaction fails.
@@ -878,30 +1440,42 @@ class TorusClient:
         if key is None and not unsigned:
             raise ValueError("Key must be provided for signed extrinsics.")
 
+        recording: CallBatch | None = getattr(self._recording, "batch", None)
+        if recording is not None:
+            if (
+                unsigned
+                or key is None
+                or key.public_key != recording.key.public_key  # type: ignore
+            ):
+                raise ValueError(
+                    "Batched calls must be signed by the key of the batch."
+                )
+            # the receipt is only known once the batch is submitted
+            return PendingReceipt(
+                recording.add(fn, params, module=module, sudo=sudo)
+            )
+
+        if nonce is None and not unsigned and self.nonce_manager is not None:
+            assert key is not None
+            with self.nonce_manager.reserve(key.ss58_address) as nonce:  # type: ignore
+                return self.compose_call(
+                    fn,
+                    params,
+                    key,
+                    module=module,
+                    wait_for_inclusion=wait_for_inclusion,
+                    wait_for_finalization=wait_for_finalization,
+                    sudo=sudo,
+                    nonce=nonce,
+                )
+
         with self.get_conn() as substrate:
             if wait_for_finalization is None:
                 wait_for_finalization = self.wait_for_finalization
 
-            call = substrate.compose_call(  # type: ignore
-                call_module=module, call_function=fn, call_params=params
+            extrinsic = self._create_extrinsic(
+                substrate, fn, params, key, module, sudo, unsigned, nonce
             )
-            if sudo:
-                call = substrate.compose_call(  # type: ignore
-                    call_module="Sudo",
-                    call_function="sudo",
-                    call_params={
-                        "call": call.value,  # type: ignore
-                    },
-                )
-
-            if not unsigned:
-                assert key is not None
-                extrinsic = substrate.create_signed_extrinsic(  # type: ignore
-                    call=call,
-                    keypair=key,
-                )
-            else:
-                extrinsic = substrate.create_unsigned_extrinsic(call=call)  # type: ignore
 
             response = substrate.submit_extrinsic(
                 extrinsic=extrinsic,
@@ -909,6 +1483,7 @@ class TorusClient:
                 wait_for_finalization=wait_for_finalization,
             )
         if wait_for_inclusion:
+            response = self.receipts.wrap(response)
             if not response.is_success:
                 raise ChainTransactionError(
                     response.error_message,  # type: ignore
@@ -943,6 +1518,10 @@ class TorusClient:
         block and/or its finalization. Make sure to pass all keys,
         that are part of the multisignature.
 
+        The multisig account and its pending operations are cached by the
+        session returned by `multisig`, which can also approve many calls
+        in a single extrinsic.
+
         Args:
             fn: The function name to call on the network. params: A dictionary
             of parameters for the call. key: The keypair for signing the
@@ -966,59 +1545,36 @@ class TorusClient:
             ChainTransactionError: If the transaction fails.
         """
 
-        # getting the call ready
-        with self.get_conn() as substrate:
-            if wait_for_finalization is None:
-                wait_for_finalization = self.wait_for_finalization
-
-            # prepares the `GenericCall` object
-            call = substrate.compose_call(  # type: ignore
-                call_module=module, call_function=fn, call_params=params
-            )
-            if sudo:
-                call = substrate.compose_call(  # type: ignore
-                    call_module="Sudo",
-                    call_function="sudo",
-                    call_params={
-                        "call": call.value,  # type: ignore
-                    },
-                )
-
-            # modify the rpc methods at runtime, to allow for correct payment
-            # fee calculation parity has a bug in this version,
-            # where the method has to be removed
-            rpc_methods = substrate.config.get("rpc_methods")  # type: ignore
-
-            if "state_call" in rpc_methods:  # type: ignore
-                rpc_methods.remove("state_call")  # type: ignore
-
-            # create the multisig account
-            multisig_acc = substrate.generate_multisig_account(  # type: ignore
-                signatories, threshold
-            )
-
-            # send the multisig extrinsic
-            extrinsic = substrate.create_multisig_extrinsic(  # type: ignore
-                call=call,  # type: ignore
-                keypair=key,
-                multisig_account=multisig_acc,  # type: ignore
-                era=era,  # type: ignore
-            )  # type: ignore
-
-            response = substrate.submit_extrinsic(
-                extrinsic=extrinsic,
-                wait_for_inclusion=wait_for_inclusion,
-                wait_for_finalization=wait_for_finalization,
-            )
+        session = self.multisig(signatories, threshold)
+        response = session.approve(
+            key,
+            [BatchedCall(module, fn, params, sudo)],
+            wait_for_inclusion=wait_for_inclusion,
+            wait_for_finalization=wait_for_finalization,
+            era=era,
+        )
+        if response is None:
+            raise ChainTransactionError("The key already approved this call")
+        return response
 
-        if wait_for_inclusion:
-            if not response.is_success:
-                raise ChainTransactionError(
-                    response.error_message,  # type: ignore
-                    response,  # type: ignore
-                )
+    def multisig(
+        self, signatories: Sequence[Ss58Address], threshold: int
+    ) -> MultisigSession:
+        """
+        Gets the session of a multisig account, keeping its derived account
+        and pending operations across calls.
 
-        return response
+        Args:
+            signatories: The SS58 addresses of all signatories.
+            threshold: The approvals needed to execute a call.
+        """
+        session_key = (tuple(sorted(signatories)), threshold)
+        with self._trackers_lock:
+            session = self._multisigs.get(session_key)
+            if session is None:
+                session = MultisigSession(self, signatories, threshold)
+                self._multisigs[session_key] = session
+        return session
 
     def transfer(
         self,
@@ -3301,13 +3857,18 @@ class TorusClient:
         The existential deposit is the minimum balance that must be maintained
         in an account to prevent it from being purged. Denotated in nano units.
 
+        Args:
+            block_hash: The block to read the constant at. If omitted, the
+              value of the latest runtime is used, cached after the first
+              call.
+
         Returns:
             The existential deposit value in nano units.
-        Note:
-            The value returned is a fixed value defined in the
-            client and may not reflect changes in the network's configuration.
         """
 
+        if block_hash is None:
+            return self.get_constant("Balances", "ExistentialDeposit")
+
         with self.get_conn() as substrate:
             result: int = substrate.get_constant(  #  type: ignore
                 "Balances", "ExistentialDeposit", block_hash
@@ -3315,6 +3876,29 @@ class TorusClient:
 
         return result
 
+    def get_constant(self, module: str, name: str) -> Any:
+        """
+        Retrieves the value of a runtime constant, at the latest runtime.
+
+        Constants only change with runtime upgrades, so the value is looked
+        up once and cached for the lifetime of the client.
+
+        Args:
+            module: The pallet defining the constant.
+            name: The name of the constant.
+
+        Returns:
+            The decoded value, or None if the runtime has no such constant.
+        """
+        cache_key = (module, name)
+        if cache_key in self._constants:
+            return self._constants[cache_key]
+        with self.get_conn() as substrate:
+            constant = substrate.get_constant(module, name)  # type: ignore
+        value = None if constant is None else constant.value  # type: ignore
+        self._constants[cache_key] = value
+        return value  # type: ignore
+
     def get_power_users(self) -> list[Ss58Address]:
         result = self.query("NotDelegatingVotingPower", [], module="Governance")
         return result
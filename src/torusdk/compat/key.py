@@ -6,20 +6,33 @@ WIP
 
 import json
 import os
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, cast
+from typing import Any, Callable, Iterator, cast
 
 from nacl.exceptions import CryptoError
 from torustrateinterface import Keypair
 
-from torusdk.compat.storage import COMMUNE_HOME, classic_load, classic_put
+from torusdk.compat.storage import (
+    COMMUNE_HOME,
+    classic_decode,
+    classic_load,
+    classic_put,
+)
 from torusdk.compat.types import CommuneKeyDict
 from torusdk.errors import (
     InvalidPasswordError,
     KeyNotFoundError,
     PasswordNotProvidedError,
 )
-from torusdk.key import check_ss58_address, is_ss58_address, store_key
+from torusdk.key import (
+    check_ss58_address,
+    is_ss58_address,
+    key_record,
+    local_key_adresses,
+    store_key,
+)
+from torusdk.keygen import map_chunks, store_in_batches
 from torusdk.password import NoPassword, PasswordProvider
 from torusdk.types.types import Ss58Address
 from torusdk.util import bytes_to_hex, check_str
@@ -229,6 +242,161 @@ def migrate_to_torus(name: str, password_provider: PasswordProvider):
     store_key(commune_key, name, password)
 
 
+@dataclass
+class LegacyMigration:
+    """
+    The outcome of `migrate_all_to_torus`.
+
+    Attributes:
+        migrated: The SS58 address of each migrated key, by name.
+        skipped: The keys already in the torus storage, left as they are.
+        failed: The reason each remaining key couldn't be migrated, by name.
+    """
+
+    migrated: dict[str, Ss58Address]
+    skipped: list[str]
+    failed: dict[str, str]
+
+
+# a classic key's name, file body and password
+_MigrationJob = tuple[str, str, str | None]
+
+
+def _convert_classic_keys(
+    jobs: list[_MigrationJob],
+) -> list[tuple[str, str | None, str | None]]:
+    converted: list[tuple[str, str | None, str | None]] = []
+    for name, body, password in jobs:
+        try:
+            key_dict = json.loads(classic_decode(json.loads(body), password))
+            try:
+                keypair = from_classic_dict(key_dict)
+            except ValueError:
+                keypair = from_classic_dict(key_dict, from_mnemonic=False)
+            record = key_record(keypair, name, password)
+        except CryptoError:
+            converted.append((name, None, "invalid password"))
+        except (AssertionError, KeyError, TypeError, ValueError) as e:
+            converted.append((name, None, f"invalid key: {e!r}"))
+        else:
+            converted.append((name, record, None))
+    return converted
+
+
+def scan_classic_keys(
+    password_provider: PasswordProvider = NoPassword(),
+) -> tuple[list[_MigrationJob], LegacyMigration]:
+    """
+    Scans `~/.commune/key` once for the classic keys to migrate, collecting
+    the passwords of the encrypted ones from the provider, which may ask
+    for them.
+
+    Returns:
+        The keys to migrate, with their file body and password, for
+          `migrate_classic_keys`, and the migration with the keys skipped
+          or failed while scanning.
+    """
+    key_dir = os.path.expanduser(os.path.join(COMMUNE_HOME, "key"))
+    result = LegacyMigration({}, [], {})
+    existing = local_key_adresses().keys()
+    jobs: list[_MigrationJob] = []
+    with os.scandir(key_dir) as entries:
+        for entry in sorted(entries, key=lambda entry: entry.name):
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            name = entry.name.removesuffix(".json")
+            # an address book, not a key
+            if name == "key2address":
+                continue
+            if name in existing:
+                result.skipped.append(name)
+                continue
+            with open(entry.path, "r") as file:
+                body = file.read()
+            try:
+                encrypted = bool(json.loads(body)["encrypted"])
+            except (ValueError, KeyError, TypeError):
+                result.failed[name] = "not a commune storage file"
+                continue
+            password = None
+            if encrypted:
+                password = password_provider.get_password(
+                    name
+                ) or password_provider.ask_password(name)
+            jobs.append((name, body, password))
+    return jobs, result
+
+
+def migrate_classic_keys(
+    jobs: list[_MigrationJob],
+    result: LegacyMigration,
+    processes: int | None = None,
+    on_stored: Callable[[int], None] | None = None,
+) -> LegacyMigration:
+    """
+    Migrates the keys found by `scan_classic_keys`, without asking for
+    anything.
+
+    The keys are decrypted, converted and encrypted again with the same
+    password across a process pool, and stored in batches, each key file
+    replaced atomically.
+
+    Args:
+        jobs: The keys to migrate, from `scan_classic_keys`.
+        result: The migration from `scan_classic_keys`, completed with the
+          migrated and failed keys.
+        processes: Size of the process pool, the number of CPUs if
+          omitted. 0 migrates the keys in this process.
+        on_stored: Called with the number of keys stored so far after
+          each batch.
+
+    Returns:
+        The migrated, skipped and failed keys.
+    """
+
+    def converted() -> Iterator[list[tuple[str, str]]]:
+        for results in map_chunks(_convert_classic_keys, jobs, processes):
+            records: list[tuple[str, str]] = []
+            for name, record, error in results:
+                if record is None:
+                    result.failed[name] = error or "unknown error"
+                else:
+                    records.append((name, record))
+            yield records
+
+    result.migrated = store_in_batches(converted(), on_stored)
+    return result
+
+
+def migrate_all_to_torus(
+    password_provider: PasswordProvider = NoPassword(),
+    processes: int | None = None,
+    on_stored: Callable[[int], None] | None = None,
+) -> LegacyMigration:
+    """
+    Migrates every classic key to the torus storage in one pass.
+
+    `~/.commune/key` is scanned once, and the passwords of the encrypted
+    keys collected from the provider up front, with `scan_classic_keys`.
+    The keys are then migrated across a process pool by
+    `migrate_classic_keys`. Keys already in the torus storage are skipped,
+    so an interrupted migration resumes where it stopped when run again.
+
+    Args:
+        password_provider: Gives, or asks for, the password of each
+          encrypted key.
+        processes: Size of the process pool, the number of CPUs if
+          omitted. 0 migrates the keys in this process.
+        on_stored: Called with the number of keys stored so far after
+          each batch.
+
+    Returns:
+        The migrated, skipped and failed keys.
+    """
+    jobs, result = scan_classic_keys(password_provider)
+    return migrate_classic_keys(jobs, result, processes, on_stored)
+
+
 def legacy_resolve_key_ss58_encrypted(
     key: Ss58Address | Keypair | str,
     password: str | None = None,
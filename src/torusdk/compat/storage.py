@@ -54,7 +54,18 @@ def classic_load(
     full_path = os.path.expanduser(os.path.join(COMMUNE_HOME, path))
     with open(full_path, "r") as file:
         body = json.load(file)
+    return classic_decode(body, password)
 
+
+def classic_decode(body: Any, password: str | None = None) -> Any:
+    """
+    The data of a parsed commune data storage file, decrypted if needed.
+
+    Raises:
+        PasswordNotProvidedError: If the data is encrypted and no password
+          is provided.
+        AssertionError: Raised when the data is not in the classic format.
+    """
     if body["encrypted"] and password is None:
         raise PasswordNotProvidedError(
             "Data is encrypted but no password provided"
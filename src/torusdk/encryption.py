@@ -1,7 +1,7 @@
 import base64
 import hashlib
 import json
-from typing import Any
+from typing import Any, Mapping
 
 from nacl.secret import SecretBox
 from nacl.utils import random
@@ -17,22 +17,62 @@ def derive_key(password: str):
     return key
 
 
+class Cipher:
+    """
+    Encrypts and decrypts values with a key derived from a password once.
+
+    Every value is JSON encoded and sealed on its own, with a random nonce
+    prepended, as base64: the format of `encrypt_data`.
+    """
+
+    nonce_size = SecretBox.NONCE_SIZE
+
+    def __init__(self, password: str):
+        self._box = SecretBox(derive_key(password))
+
+    def encrypt(self, data: Any) -> str:
+        nonce = random(SecretBox.NONCE_SIZE)
+        raw = json.dumps(data).encode()
+        ciphertext = self._box.encrypt(raw, nonce).ciphertext
+        return base64.b64encode(nonce + ciphertext).decode()
+
+    def decrypt(self, data: str) -> Any:
+        encrypted = base64.b64decode(data.encode())
+        nonce = encrypted[: SecretBox.NONCE_SIZE]
+        ciphertext = encrypted[SecretBox.NONCE_SIZE :]
+        raw = self._box.decrypt(ciphertext, nonce)
+        return json.loads(raw.decode())
+
+    def encrypt_fields(self, values: Mapping[str, Any]) -> dict[str, str]:
+        """Encrypts each value of a mapping, keeping the keys."""
+        return {field: self.encrypt(value) for field, value in values.items()}
+
+    def decrypt_fields(self, values: Mapping[str, str]) -> dict[str, Any]:
+        """Decrypts each value of a mapping, keeping the keys."""
+        return {field: self.decrypt(value) for field, value in values.items()}
+
+
+def cipher(password: str, ciphers: dict[str, Cipher] | None = None) -> Cipher:
+    """
+    The cipher of a password.
+
+    Args:
+        password: The password to derive the key from.
+        ciphers: Ciphers by password, scoped to a bulk operation, so the
+          key of each password is derived once. Dropping it forgets the
+          passwords and their keys.
+    """
+    if ciphers is None:
+        return Cipher(password)
+    found = ciphers.get(password)
+    if found is None:
+        found = ciphers[password] = Cipher(password)
+    return found
+
+
 def encrypt_data(password: str, data: Any) -> tuple[str, int]:
-    key = derive_key(password)
-    box = SecretBox(key)
-    nonce = random(SecretBox.NONCE_SIZE)
-    raw = json.dumps(data).encode()
-    ciphertext = box.encrypt(raw, nonce).ciphertext
-    encrypted = nonce + ciphertext
-    decoded_data = base64.b64encode(encrypted).decode()
-    return decoded_data, SecretBox.NONCE_SIZE
+    return cipher(password).encrypt(data), Cipher.nonce_size
 
 
 def decrypt_data(password: str, data: str) -> Any:
-    key = derive_key(password)
-    box = SecretBox(key)
-    encrypted = base64.b64decode(data.encode())
-    nonce = encrypted[: SecretBox.NONCE_SIZE]
-    ciphertext = encrypted[SecretBox.NONCE_SIZE :]
-    raw = box.decrypt(ciphertext, nonce)
-    return json.loads(raw.decode())
+    return cipher(password).decrypt(data)
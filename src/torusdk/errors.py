@@ -2,6 +2,10 @@ class ChainTransactionError(Exception):
     """Error for any chain transaction related errors."""
 
 
+class BatchedCallError(ChainTransactionError):
+    """The receipt of a batched call was read before it was submitted."""
+
+
 class NetworkError(Exception):
     """Base for any network related errors."""
 
@@ -14,6 +18,10 @@ class NetworkTimeoutError(NetworkError):
     """Timeout error"""
 
 
+class ReplayMismatchError(NetworkError):
+    """The client traffic diverged from the recording being replayed."""
+
+
 class PasswordError(Exception):
     """Password related error."""
 
@@ -28,3 +36,7 @@ class InvalidPasswordError(PasswordError):
 
 class KeyNotFoundError(Exception):
     """Key not found error."""
+
+
+class KeyringAgentError(Exception):
+    """The keyring agent is not running or failed a request."""
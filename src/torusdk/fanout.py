@@ -0,0 +1,112 @@
+"""
+Submission of one call from each of many keys at once.
+
+Commands acting with every local key, like voting on a proposal, used to
+sign and wait for one extrinsic after another. `fan_out` signs them all in
+parallel against a single runtime snapshot, with nonces fetched in one
+batch, sends them together and yields their outcomes as they are included.
+
+Example:
+```py
+vote = BatchedCall(
+    "Governance", "vote_proposal", {"proposal_id": 7, "agree": True}
+)
+jobs = {name: (keypair, vote) for name, keypair in keypairs.items()}
+for result in fan_out(client, jobs):
+    print(result.name, result.success)
+```
+"""
+
+from concurrent.futures import Future, as_completed
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterator, Mapping
+
+from torustrateinterface import ExtrinsicReceipt, Keypair
+
+from torusdk.batch import BatchedCall
+from torusdk.nonce import NonceManager
+from torusdk.offline import SIGN_CHUNK_SIZE, OfflineComposer
+
+if TYPE_CHECKING:
+    from torusdk.client import TorusClient
+
+
+@dataclass
+class FanOutResult:
+    """
+    Outcome of the extrinsic of one key.
+
+    Attributes:
+        name: The name the job was given.
+        receipt: The receipt, if the extrinsic was included.
+        error: Why the extrinsic was rejected or failed, if it did.
+    """
+
+    name: str
+    receipt: ExtrinsicReceipt | None = None
+    error: Any = None
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
+
+
+def fan_out(
+    client: "TorusClient",
+    jobs: Mapping[str, tuple[Keypair, BatchedCall]],
+    wait_for_finalization: bool | None = None,
+    processes: int | None = None,
+) -> Iterator[FanOutResult]:
+    """
+    Signs and submits one extrinsic per job, all at once.
+
+    The nonces of all signers are fetched in a single batch, and taken from
+    the client's `nonce_manager` if set, so a key may appear in many jobs.
+    The extrinsics are signed across a process pool, see `OfflineComposer`,
+    and sent in JSON-RPC batches by `TorusClient.submit_signed`.
+
+    Args:
+        client: The client to submit through.
+        jobs: The signing keypair and the call of each job, by name.
+        wait_for_finalization: Yield results once their block is finalized,
+          instead of once it is imported.
+        processes: Size of the signing pool, the number of CPUs if omitted.
+          Few jobs are signed in the calling process.
+
+    Yields:
+        The result of each job, in the order they are included.
+    """
+    if not jobs:
+        return
+    nonces = client.nonce_manager or NonceManager(client)
+    nonces.prefetch(keypair.ss58_address for keypair, _ in jobs.values())  # type: ignore
+    if len(jobs) <= SIGN_CHUNK_SIZE:
+        processes = 0
+
+    names = list(jobs)
+    with OfflineComposer(client.runtime_snapshot(), processes) as composer:
+        signed = composer.sign(
+            [
+                (call, keypair, nonces.next(keypair.ss58_address))  # type: ignore
+                for keypair, call in jobs.values()
+            ]
+        )
+    futures = client.submit_signed(signed, wait_for_finalization)
+    name_of: dict[Future[ExtrinsicReceipt], str] = dict(zip(futures, names))
+
+    failed_signers: set[str] = set()
+    for future in as_completed(name_of):
+        name = name_of[future]
+        try:
+            receipt = future.result()
+        except Exception as e:
+            failed_signers.add(jobs[name][0].ss58_address)  # type: ignore
+            yield FanOutResult(name, error=e)
+            continue
+        if receipt.is_success:
+            yield FanOutResult(name, receipt)
+        else:
+            yield FanOutResult(name, receipt, receipt.error_message)  # type: ignore
+    if failed_signers:
+        # the nonces of rejected extrinsics were not used
+        nonces.resync(*failed_signers)  # type: ignore
@@ -0,0 +1,413 @@
+"""
+Instrumentation hooks for `TorusClient`.
+
+The client reports what it is doing to an `Instrumentation` object: every
+JSON-RPC request with its payload and response sizes and wire time, the
+time spent waiting for a pooled connection, storage decoding, request
+chunking and reconnects.
+
+The default, `NOOP_INSTRUMENTATION`, is disabled and the client skips all
+measurements for it. `MetricsCollector` aggregates the events and renders
+them in the Prometheus/OpenMetrics text format.
+
+Example:
+```py
+metrics = MetricsCollector()
+client = TorusClient(url, instrumentation=metrics)
+get_map_modules(client)
+print(metrics.render())
+```
+"""
+
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Any
+
+from torusdk.transport import WebSocketLike, frame_items
+
+
+@dataclass(frozen=True)
+class RpcEvent:
+    """
+    A JSON-RPC request answered by the node.
+
+    Attributes:
+        method: The JSON-RPC method.
+        request_id: The JSON-RPC id of the request.
+        request_bytes: Size of the request. Requests sent in a batch share
+          the size of the batch frame evenly.
+        response_bytes: Size of the response, shared the same way.
+        wire_time: Seconds between sending the request and receiving its
+          response.
+        batch_size: Number of requests sent in the same frame.
+    """
+
+    method: str
+    request_id: int | str | None
+    request_bytes: int
+    response_bytes: int
+    wire_time: float
+    batch_size: int
+
+
+@dataclass(frozen=True)
+class ConnWaitEvent:
+    """Time spent in `get_conn` waiting for a pooled connection."""
+
+    wait_time: float
+
+
+@dataclass(frozen=True)
+class DecodeEvent:
+    """SCALE decoding of the results of one storage map query."""
+
+    storage_function: str
+    items: int
+    decode_time: float
+
+
+@dataclass(frozen=True)
+class ChunkEvent:
+    """A batch of storage requests split into chunks."""
+
+    chunks: int
+    requests: int
+
+
+@dataclass(frozen=True)
+class ReconnectEvent:
+    """A dropped pooled connection was replaced."""
+
+    url: str
+
+
+class Instrumentation:
+    """
+    Receives the events of a `TorusClient`.
+
+    Subclasses override the hooks they are interested in. All hooks may be
+    called concurrently from several threads.
+
+    Attributes:
+        enabled: When False, the client doesn't measure or emit anything.
+    """
+
+    enabled: bool = True
+
+    def on_rpc(self, event: RpcEvent) -> None:
+        pass
+
+    def on_conn_wait(self, event: ConnWaitEvent) -> None:
+        pass
+
+    def on_decode(self, event: DecodeEvent) -> None:
+        pass
+
+    def on_chunks(self, event: ChunkEvent) -> None:
+        pass
+
+    def on_reconnect(self, event: ReconnectEvent) -> None:
+        pass
+
+
+class NoopInstrumentation(Instrumentation):
+    enabled = False
+
+
+NOOP_INSTRUMENTATION = NoopInstrumentation()
+
+
+class MultiInstrumentation(Instrumentation):
+    """Forwards every event to several instrumentations."""
+
+    def __init__(self, *targets: Instrumentation):
+        self.targets = [target for target in targets if target.enabled]
+        self.enabled = bool(self.targets)
+
+    def on_rpc(self, event: RpcEvent) -> None:
+        for target in self.targets:
+            target.on_rpc(event)
+
+    def on_conn_wait(self, event: ConnWaitEvent) -> None:
+        for target in self.targets:
+            target.on_conn_wait(event)
+
+    def on_decode(self, event: DecodeEvent) -> None:
+        for target in self.targets:
+            target.on_decode(event)
+
+    def on_chunks(self, event: ChunkEvent) -> None:
+        for target in self.targets:
+            target.on_chunks(event)
+
+    def on_reconnect(self, event: ReconnectEvent) -> None:
+        for target in self.targets:
+            target.on_reconnect(event)
+
+
+# responses can be megabytes long, so ids are found without parsing them
+_RESPONSE_ID = re.compile(r'"id":\s*(\d+)')
+
+
+class InstrumentedWebSocket:
+    """
+    Wraps a websocket and reports every JSON-RPC exchange as an `RpcEvent`.
+    """
+
+    def __init__(self, inner: WebSocketLike, instrumentation: Instrumentation):
+        self._inner = inner
+        self._instrumentation = instrumentation
+        # request id -> (method, request bytes, batch size, send time)
+        self._in_flight: dict[int, tuple[str, int, int, float]] = {}
+
+    @property
+    def connected(self) -> bool:
+        return self._inner.connected
+
+    def connect(self, url: str, **options: Any) -> Any:
+        return self._inner.connect(url, **options)
+
+    def pong(self, payload: str | bytes = b"") -> Any:
+        return self._inner.pong(payload)
+
+    def close(self, *args: Any, **kwargs: Any) -> Any:
+        return self._inner.close(*args, **kwargs)
+
+    def send(self, payload: str, opcode: int = 1) -> int:
+        requests = frame_items(json.loads(payload))
+        share = len(payload) // max(len(requests), 1)
+        now = time.perf_counter()
+        for request in requests:
+            request_id = request.get("id")
+            if isinstance(request_id, int):
+                self._in_flight[request_id] = (
+                    str(request.get("method")),
+                    share,
+                    len(requests),
+                    now,
+                )
+        return self._inner.send(payload, opcode)
+
+    def recv(self) -> str | bytes:
+        message = self._inner.recv()
+        now = time.perf_counter()
+        text = message.decode() if isinstance(message, bytes) else message
+        ids = [int(found) for found in _RESPONSE_ID.findall(text)]
+        answered = [i for i in ids if i in self._in_flight]
+        share = len(text) // max(len(answered), 1)
+        for request_id in answered:
+            method, request_bytes, batch_size, sent_at = self._in_flight.pop(
+                request_id
+            )
+            self._instrumentation.on_rpc(
+                RpcEvent(
+                    method=method,
+                    request_id=request_id,
+                    request_bytes=request_bytes,
+                    response_bytes=share,
+                    wire_time=now - sent_at,
+                    batch_size=batch_size,
+                )
+            )
+        return message
+
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+class _Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        key + '="' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        for key, value in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+class MetricsCollector(Instrumentation):
+    """
+    Aggregates client events into counters and histograms, exposed in the
+    OpenMetrics text format by `render`.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "torus_client",
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.namespace = namespace
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._rpc_count: dict[str, int] = {}
+        self._rpc_request_bytes: dict[str, int] = {}
+        self._rpc_response_bytes: dict[str, int] = {}
+        self._rpc_wire_time: dict[str, _Histogram] = {}
+        self._conn_wait = _Histogram(buckets)
+        self._decode_items: dict[str, int] = {}
+        self._decode_time: dict[str, float] = {}
+        self._chunks = 0
+        self._chunked_requests = 0
+        self._reconnects = 0
+
+    def on_rpc(self, event: RpcEvent) -> None:
+        method = event.method
+        with self._lock:
+            self._rpc_count[method] = self._rpc_count.get(method, 0) + 1
+            self._rpc_request_bytes[method] = (
+                self._rpc_request_bytes.get(method, 0) + event.request_bytes
+            )
+            self._rpc_response_bytes[method] = (
+                self._rpc_response_bytes.get(method, 0) + event.response_bytes
+            )
+            if method not in self._rpc_wire_time:
+                self._rpc_wire_time[method] = _Histogram(self._buckets)
+            self._rpc_wire_time[method].observe(event.wire_time)
+
+    def on_conn_wait(self, event: ConnWaitEvent) -> None:
+        with self._lock:
+            self._conn_wait.observe(event.wait_time)
+
+    def on_decode(self, event: DecodeEvent) -> None:
+        name = event.storage_function
+        with self._lock:
+            self._decode_items[name] = (
+                self._decode_items.get(name, 0) + event.items
+            )
+            self._decode_time[name] = (
+                self._decode_time.get(name, 0.0) + event.decode_time
+            )
+
+    def on_chunks(self, event: ChunkEvent) -> None:
+        with self._lock:
+            self._chunks += event.chunks
+            self._chunked_requests += event.requests
+
+    def on_reconnect(self, event: ReconnectEvent) -> None:
+        with self._lock:
+            self._reconnects += 1
+
+    def _histogram_lines(
+        self, name: str, histogram: _Histogram, **labels: str
+    ) -> list[str]:
+        lines: list[str] = []
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(
+                f"{name}_bucket{_labels(**labels, le=str(bound))} {cumulative}"
+            )
+        lines.append(
+            f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}"
+        )
+        lines.append(f"{name}_sum{_labels(**labels)} {histogram.sum}")
+        lines.append(f"{name}_count{_labels(**labels)} {histogram.count}")
+        return lines
+
+    def render(self) -> str:
+        """
+        Renders all metrics in the OpenMetrics text exposition format.
+        """
+        ns = self.namespace
+        lines: list[str] = []
+
+        def counter(
+            name: str, help: str, values: dict[str, Any], label: str
+        ) -> None:
+            lines.append(f"# TYPE {ns}_{name} counter")
+            lines.append(f"# HELP {ns}_{name} {help}")
+            for key, value in sorted(values.items()):
+                lines.append(
+                    f"{ns}_{name}_total{_labels(**{label: key})} {value}"
+                )
+
+        with self._lock:
+            counter(
+                "rpc_requests", "JSON-RPC requests.", self._rpc_count, "method"
+            )
+            counter(
+                "rpc_request_bytes",
+                "Bytes sent in JSON-RPC requests.",
+                self._rpc_request_bytes,
+                "method",
+            )
+            counter(
+                "rpc_response_bytes",
+                "Bytes received in JSON-RPC responses.",
+                self._rpc_response_bytes,
+                "method",
+            )
+            lines.append(f"# TYPE {ns}_rpc_wire_seconds histogram")
+            lines.append(
+                f"# HELP {ns}_rpc_wire_seconds "
+                "Time between sending a request and receiving its response."
+            )
+            for method, histogram in sorted(self._rpc_wire_time.items()):
+                lines += self._histogram_lines(
+                    f"{ns}_rpc_wire_seconds", histogram, method=method
+                )
+            lines.append(f"# TYPE {ns}_conn_wait_seconds histogram")
+            lines.append(
+                f"# HELP {ns}_conn_wait_seconds "
+                "Time waiting for a pooled connection."
+            )
+            lines += self._histogram_lines(
+                f"{ns}_conn_wait_seconds", self._conn_wait
+            )
+            counter(
+                "decode_items",
+                "Storage items decoded.",
+                self._decode_items,
+                "storage",
+            )
+            counter(
+                "decode_seconds",
+                "Time spent decoding storage items.",
+                self._decode_time,
+                "storage",
+            )
+            lines.append(f"# TYPE {ns}_rpc_chunks counter")
+            lines.append(f"# HELP {ns}_rpc_chunks Chunks of storage requests.")
+            lines.append(f"{ns}_rpc_chunks_total {self._chunks}")
+            lines.append(f"# TYPE {ns}_rpc_chunked_requests counter")
+            lines.append(
+                f"# HELP {ns}_rpc_chunked_requests Requests sent in chunks."
+            )
+            lines.append(
+                f"{ns}_rpc_chunked_requests_total {self._chunked_requests}"
+            )
+            lines.append(f"# TYPE {ns}_reconnects counter")
+            lines.append(f"# HELP {ns}_reconnects Replaced pooled connections.")
+            lines.append(f"{ns}_reconnects_total {self._reconnects}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
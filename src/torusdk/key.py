@@ -3,25 +3,30 @@ import os
 from dataclasses import dataclass
 from pathlib import Path
 from time import time
-from typing import TypeGuard
+from typing import Any, Iterable, TypeGuard
 
-import torustrateinterface.utils.ss58 as ss58
 from nacl.exceptions import CryptoError
 from pydantic import BaseModel
 from torustrateinterface import Keypair
 
 from torusdk._common import SS58_FORMAT
-from torusdk.encryption import (
-    decrypt_data,
-    encrypt_data,
-)
+from torusdk.encryption import Cipher, cipher
 from torusdk.errors import PasswordNotProvidedError
+from torusdk.keyring import agent_keypairs
+from torusdk.keystore import KEYSTORE_NAME, SqliteKeystore, record_of
 from torusdk.password import NoPassword, PasswordProvider
+from torusdk.ss58 import is_valid_ss58
+from torusdk.tracing import span
 from torusdk.types.types import Ss58Address
 from torusdk.util import bytes_to_hex
 
 TORUS_KEY_VERSION = 1
 TORUS_HOME = "~/.torus"
+# public index of the key directory: names, addresses and file stamps
+KEY_INDEX_NAME = ".index.json"
+KEY_INDEX_VERSION = 1
+# the fields of a key record encrypted with its password, when set
+SECRET_FIELDS = ("seed_hex", "private_key", "mnemonic")
 
 
 class TorusKey(BaseModel):
@@ -52,34 +57,43 @@ class TorusStorage(TorusKey):
     encryption_metadata: EncryptionMetadata | None
 
 
-def local_key_adresses(
+def local_keypairs(
     password_provider: PasswordProvider = NoPassword(),
-) -> dict[str, Ss58Address]:
+    use_agent: bool = False,
+) -> dict[str, Keypair]:
     """
-    Retrieves a mapping of local key names to their SS58 addresses.
-    If password is passed, it will be used to decrypt every key.
-    If password is not passed and ctx is,
-    the user will be prompted for the password.
+    Loads every local key, decrypting each one once. With `use_agent`, the
+    keys held by a running keyring agent are not decrypted, they sign
+    through the agent and have no private key nor seed: only pass it to
+    sign with the keys.
+    If the password provider has no password for a key,
+    the user will be prompted for it.
     """
 
-    # TODO: refactor to return mapping of (key_name -> Keypair)
-    # Outside of this, Keypair can be mapped to Ss58Address
-
-    key_dir = os.path.expanduser(os.path.join(TORUS_HOME, "key"))
-    key_dir = Path(key_dir)
+    # keys unlocked by a running keyring agent sign there, undecrypted
+    keypairs: dict[str, Keypair] = dict(agent_keypairs()) if use_agent else {}
 
-    if not key_dir.exists():
-        return {}
+    keystore = local_keystore()
+    if keystore is not None:
+        key_names = keystore.names()
+    else:
+        key_dir = os.path.expanduser(os.path.join(TORUS_HOME, "key"))
+        key_dir = Path(key_dir)
 
-    key_names = [
-        f.stem
-        for f in key_dir.iterdir()
-        if f.is_file() and not f.name.startswith(".")
-    ]
+        if not key_dir.exists():
+            return keypairs
 
-    addresses_map: dict[str, Ss58Address] = {}
+        key_names = [
+            f.stem
+            for f in key_dir.iterdir()
+            if f.is_file() and not f.name.startswith(".")
+        ]
 
+    # dropped on return, with the passwords it holds
+    ciphers: dict[str, Cipher] = {}
     for key_name in key_names:
+        if key_name in keypairs:
+            continue
         # issue #12 https://github.com/agicommies/torus/issues/12
         # added check for key2address to stop error
         # from being thrown by wrong key type.
@@ -91,14 +105,149 @@ def local_key_adresses(
 
         password = password_provider.get_password(key_name)
         try:
-            keypair = load_key(key_name, password=password)
+            keypair = load_keypair(key_name, password, ciphers=ciphers)
         except PasswordNotProvidedError:
             password = password_provider.ask_password(key_name)
-            keypair = load_key(key_name, password=password)
+            keypair = load_keypair(key_name, password, ciphers=ciphers)
+
+        keypairs[key_name] = keypair
+
+    return keypairs
+
+
+def keystore_path() -> Path:
+    """The path of the SQLite keystore, used instead of key files if it exists."""
+    return Path(os.path.expanduser(TORUS_HOME)) / KEYSTORE_NAME
+
+
+_keystores: dict[Path, SqliteKeystore] = {}
+
+
+def local_keystore() -> SqliteKeystore | None:
+    """
+    The local `SqliteKeystore`, if `~/.torus/keystore.db` exists. Keys are
+    then read from and stored to it instead of the key directory.
+    """
+    path = keystore_path()
+    if not path.exists():
+        return None
+    keystore = _keystores.get(path)
+    if keystore is None:
+        keystore = _keystores[path] = SqliteKeystore(path)
+    return keystore
+
+
+def _key_dir() -> Path:
+    return Path(key_path("")).parent
+
+
+def _read_index() -> dict[str, dict[str, Any]]:
+    try:
+        with open(_key_dir() / KEY_INDEX_NAME, "r") as file:
+            index: dict[str, Any] = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+    # rebuilt from the key files if from another version
+    if index.get("version") != KEY_INDEX_VERSION:
+        return {}
+    return index["keys"]
+
+
+def _write_index(entries: dict[str, dict[str, Any]]):
+    key_dir = _key_dir()
+    tmp_path = key_dir / f"{KEY_INDEX_NAME}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump({"version": KEY_INDEX_VERSION, "keys": entries}, file)
+    # atomic, readers never see a partial index
+    os.replace(tmp_path, key_dir / KEY_INDEX_NAME)
+
+
+def _index_entry(
+    stat: os.stat_result, ss58_address: str, public_key: str
+) -> dict[str, Any]:
+    return {
+        "ss58_address": ss58_address,
+        "public_key": public_key,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+    }
+
+
+def _is_current(entry: dict[str, Any] | None, stat: os.stat_result) -> bool:
+    return (
+        entry is not None
+        and entry["mtime_ns"] == stat.st_mtime_ns
+        and entry["size"] == stat.st_size
+    )
 
-        addresses_map[key_name] = check_ss58_address(keypair.ss58_address)
 
-    return addresses_map
+def _update_index(entries: dict[str, dict[str, Any]]):
+    index = _read_index()
+    index.update(entries)
+    _write_index(index)
+
+
+def local_key_adresses(
+    password_provider: PasswordProvider = NoPassword(),
+) -> dict[str, Ss58Address]:
+    """
+    Retrieves a mapping of local key names to their SS58 addresses.
+
+    The addresses come from a public index of the key directory, without
+    decrypting any key or asking for passwords. Keys whose file changed
+    since they were indexed, by modification time or size, are read again,
+    and the index is updated.
+
+    Args:
+        password_provider: Unused, as no key is decrypted. Kept for
+          compatibility.
+    """
+    keystore = local_keystore()
+    if keystore is not None:
+        return {
+            key_name: Ss58Address(address)
+            for key_name, address in keystore.addresses().items()
+        }
+
+    key_dir = _key_dir()
+    if not key_dir.exists():
+        return {}
+
+    index = _read_index()
+    updated: dict[str, dict[str, Any]] = {}
+    changed = False
+    with os.scandir(key_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or not entry.name.endswith(".json"):
+                continue
+            if not entry.is_file():
+                continue
+            key_name = entry.name.removesuffix(".json")
+            # issue #12 https://github.com/agicommies/torus/issues/12
+            # added check for key2address to stop error
+            # from being thrown by wrong key type.
+            if key_name == "key2address":
+                print(
+                    "key2address is saved in an invalid format. "
+                    "It will be ignored."
+                )
+                continue
+            stat = entry.stat()
+            cached = index.get(key_name)
+            if cached is None or not _is_current(cached, stat):
+                stored = load_key_public(key_name)
+                cached = _index_entry(
+                    stat, stored.ss58_address, stored.public_key
+                )
+                changed = True
+            updated[key_name] = cached
+    if changed or len(updated) != len(index):
+        _write_index(updated)
+
+    return {
+        key_name: Ss58Address(entry["ss58_address"])
+        for key_name, entry in updated.items()
+    }
 
 
 def is_ss58_address(
@@ -112,11 +261,10 @@ def is_ss58_address(
         ss58_format: The SS58 format code to validate against.
 
     Returns:
-        True if the address is valid, False otherwise.
+        True if the address is valid, False otherwise. Results are cached.
     """
 
-    # ? Weird type error
-    return ss58.is_valid_ss58_address(address, valid_ss58_format=ss58_format)  # type: ignore
+    return is_valid_ss58(address, ss58_format)
 
 
 def check_ss58_address(
@@ -196,6 +344,7 @@ def load_keypair(
     name: str,
     password: str | None = None,
     password_provider: PasswordProvider = NoPassword(),
+    ciphers: dict[str, Cipher] | None = None,
 ) -> Keypair:
     """
     Loads a key from the filesystem.
@@ -203,6 +352,8 @@ def load_keypair(
     Args:
         name: The name of the key.
         password: The password to decrypt the key with.
+        ciphers: Ciphers by password, shared by the keys of a bulk load,
+          see `encryption.cipher`.
 
     Returns:
         The loaded key.
@@ -211,7 +362,7 @@ def load_keypair(
         FileNotFoundError: If the key file does not exist.
         PasswordNotProvidedError: If the key is encrypted and no password is provided.
     """
-    stored_key = load_key(name, password, password_provider)
+    stored_key = load_key(name, password, password_provider, ciphers)
     key = from_pydantic(stored_key)
     return key
 
@@ -230,7 +381,20 @@ def resolve_key_ss58(key: Ss58Address | Keypair | str) -> Ss58Address:
     if is_ss58_address(key):
         return key
 
+    keystore = local_keystore()
+    if keystore is not None:
+        address = keystore.address(key)
+        if address is None:
+            raise ValueError(
+                f"Key is not a valid SS58 address nor a valid key name: {key}"
+            )
+        return Ss58Address(address)
+
     try:
+        stat = os.stat(key_path(key))
+        entry = _read_index().get(key)
+        if _is_current(entry, stat):
+            return Ss58Address(entry["ss58_address"])  # type: ignore
         storage_obj = load_key_public(key)
         return storage_obj.ss58_address
     except FileNotFoundError:
@@ -239,20 +403,49 @@ def resolve_key_ss58(key: Ss58Address | Keypair | str) -> Ss58Address:
         )
 
 
-def decrypt_storage(stored_key: TorusStorage, password: str) -> TorusStorage:
-    if stored_key.seed_hex:
-        stored_key.seed_hex = decrypt_data(password, stored_key.seed_hex)
-    stored_key.private_key = decrypt_data(password, stored_key.private_key)
-    if stored_key.mnemonic:
-        stored_key.mnemonic = decrypt_data(password, stored_key.mnemonic)
+def _secrets(stored_key: TorusKey) -> dict[str, Any]:
+    return {
+        field: value
+        for field in SECRET_FIELDS
+        if (value := getattr(stored_key, field))
+    }
+
+
+def decrypt_storage(
+    stored_key: TorusStorage,
+    password: str,
+    ciphers: dict[str, Cipher] | None = None,
+) -> TorusStorage:
+    fields = cipher(password, ciphers).decrypt_fields(_secrets(stored_key))
+    for field, value in fields.items():
+        setattr(stored_key, field, value)
     stored_key.encrypted = False
     return stored_key
 
 
+def encrypt_storage(
+    stored_key: TorusStorage,
+    password: str,
+    ciphers: dict[str, Cipher] | None = None,
+) -> TorusStorage:
+    fields = cipher(password, ciphers).encrypt_fields(_secrets(stored_key))
+    for field, value in fields.items():
+        setattr(stored_key, field, value)
+    stored_key.encrypted = True
+    stored_key.encryption_metadata = EncryptionMetadata(
+        kdf="blake2b",
+        cipher="xsalsa20-poly1305",
+        cipher_text="base64",
+        nonce_size=Cipher.nonce_size,
+    )
+    return stored_key
+
+
 def load_key(
     name: str,
     password: str | None = None,
     password_provider: PasswordProvider = NoPassword(),
+    ciphers: dict[str, Cipher] | None = None,
 ):
     """
     Loads a key from the filesystem.
@@ -260,6 +453,8 @@ def load_key(
     Args:
         name: The name of the key.
         password: The password to decrypt the key with.
+        ciphers: Ciphers by password, shared by the keys of a bulk load,
+          see `encryption.cipher`.
 
     Returns:
         The loaded key.
@@ -268,16 +463,14 @@ def load_key(
         FileNotFoundError: If the key file does not exist.
         PasswordNotProvidedError: If the key is encrypted and no password is provided.
     """
-    path = key_path(name)
-    full_path = os.path.expanduser(os.path.join(TORUS_HOME, path))
     try:
-        with open(full_path, "r") as file:
-            body = json.load(file)
-        stored_key = TorusStorage.model_validate(body)
-        if stored_key.encrypted:
-            if password is None:
-                password = password_provider.ask_password(name)
-            stored_key = decrypt_storage(stored_key, password)
+        with span("load_key", "key", key=name):
+            stored_key = _read_key(name)
+            if stored_key.encrypted:
+                if password is None:
+                    password = password_provider.ask_password(name)
+                with span("decrypt_key", "key", key=name):
+                    stored_key = decrypt_storage(stored_key, password, ciphers)
     except FileNotFoundError as err:
         raise FileNotFoundError(f"Key '{name}' not found", err)
     except CryptoError as err:
@@ -285,6 +478,36 @@ def load_key(
     return stored_key
 
 
+def load_keys(
+    names: Iterable[str],
+    password: str | None = None,
+    password_provider: PasswordProvider = NoPassword(),
+) -> dict[str, TorusStorage]:
+    """
+    Loads many keys, deriving the decryption key of each distinct password
+    once.
+
+    Args:
+        names: The names of the keys.
+        password: The password to decrypt every key with. Otherwise, the
+          password of each key is asked to the provider.
+
+    Returns:
+        The loaded keys, by name.
+
+    Raises:
+        FileNotFoundError: If a key does not exist.
+        PasswordNotProvidedError: If a key is encrypted and no password is
+          provided.
+    """
+    # dropped on return, with the passwords it holds
+    ciphers: dict[str, Cipher] = {}
+    return {
+        name: load_key(name, password, password_provider, ciphers)
+        for name in names
+    }
+
+
 def load_key_public(name: str) -> TorusStorage:
     """
     Loads a key from the filesystem.
@@ -300,60 +523,112 @@ def load_key_public(name: str) -> TorusStorage:
         FileNotFoundError: If the key file does not exist.
         PasswordNotProvidedError: If the key is encrypted and no password is provided.
     """
-    path = key_path(name)
-    full_path = os.path.expanduser(os.path.join(TORUS_HOME, path))
-    with open(full_path, "r") as file:
-        body = json.load(file)
-    stored_key = TorusStorage.model_validate(body)
-    return stored_key
+    return _read_key(name)
+
+
+def _read_key(name: str) -> TorusStorage:
+    return TorusStorage.model_validate_json(load_key_record(name))
+
+
+def load_key_record(name: str) -> str:
+    """
+    The stored JSON record of a key, as written by `store_key_records`.
+
+    Raises:
+        FileNotFoundError: If the key does not exist.
+    """
+    keystore = local_keystore()
+    if keystore is not None:
+        body = keystore.get(name)
+        if body is None:
+            raise FileNotFoundError(
+                f"Key '{name}' not found in {keystore.path}"
+            )
+    else:
+        path = key_path(name)
+        full_path = os.path.expanduser(os.path.join(TORUS_HOME, path))
+        with open(full_path, "r") as file:
+            body = file.read()
+    return body
 
 
 def key_name_exists(name: str) -> bool:
     """
     Checks if a key with the given name exists.
     """
+    keystore = local_keystore()
+    if keystore is not None:
+        return name in keystore
     path = key_path(name)
     return os.path.exists(path)
 
 
-def store_key(keypair: Keypair, name: str, password: str | None = None) -> None:
+def key_record(
+    keypair: Keypair,
+    name: str,
+    password: str | None = None,
+    ciphers: dict[str, Cipher] | None = None,
+) -> str:
     """
-    Stores a key to the filesystem.
+    The JSON record a key is stored as.
 
     Args:
         keypair: The key to store.
         name: The name of the key.
         password: The password to encrypt the key with.
+        ciphers: Ciphers by password, shared by the keys of a bulk store,
+          see `encryption.cipher`.
     """
-    path = key_path(name)
-    dir_path = os.path.dirname(path)
-    os.makedirs(dir_path, exist_ok=True)
-
     data = to_pydantic(keypair, name)
-    is_mnemonic = keypair.mnemonic is not None
-    if password is not None:
-        if data.seed_hex:
-            data.seed_hex, _ = encrypt_data(password, data.seed_hex)
-        if data.mnemonic:
-            data.mnemonic, _ = encrypt_data(password, data.mnemonic)
-        data.private_key, nonce_size = encrypt_data(password, data.private_key)
-        encrypted = True
-        encryption_metadata = EncryptionMetadata(
-            kdf="blake2b",
-            cipher="xsalsa20-poly1305",
-            cipher_text="base64",
-            nonce_size=nonce_size,
-        )
-    else:
-        encrypted = False
-        encryption_metadata = None
     storage_obj = TorusStorage(
         version=1,
-        encrypted=encrypted,
-        mnemonic_present=is_mnemonic,
+        encrypted=False,
+        mnemonic_present=keypair.mnemonic is not None,
         timestamp=int(time()),
-        encryption_metadata=encryption_metadata,
+        encryption_metadata=None,
         **data.model_dump(),
     )
-    with open(path, "w") as file:
-        json.dump(storage_obj.model_dump(), file)
+    if password is not None:
+        storage_obj = encrypt_storage(storage_obj, password, ciphers)
+    return json.dumps(storage_obj.model_dump())
+
+
+def store_key(keypair: Keypair, name: str, password: str | None = None) -> None:
+    """
+    Stores a key to the filesystem.
+
+    Args:
+        keypair: The key to store.
+        name: The name of the key.
+        password: The password to encrypt the key with.
+    """
+    store_key_records([(name, key_record(keypair, name, password))])
+
+
+def store_key_records(records: Iterable[tuple[str, str]]) -> int:
+    """
+    Stores many keys at once, from their names and `key_record`s: in a
+    single keystore transaction, or as key files with a single update of
+    the index.
+
+    Returns:
+        The number of keys stored.
+    """
+    rows = [record_of(name, body) for name, body in records]
+    keystore = local_keystore()
+    if keystore is not None:
+        return keystore.put_many(rows)
+
+    entries: dict[str, dict[str, Any]] = {}
+    for name, ss58_address, public_key, body in rows:
+        path = key_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # a key file is either the old or the new record, never partial;
+        # hidden until renamed, so listings skip it
+        tmp_path = os.path.join(os.path.dirname(path), f".{name}.json.tmp")
+        with open(tmp_path, "w") as file:
+            file.write(body)
+        os.replace(tmp_path, path)
+        entries[name] = _index_entry(os.stat(path), ss58_address, public_key)
+    _update_index(entries)
+    return len(rows)
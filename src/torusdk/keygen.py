@@ -0,0 +1,266 @@
+"""
+Generation, regeneration and password rotation of many keys at once.
+
+Deriving a key from its mnemonic runs PBKDF2 with 2048 rounds, and storing
+it may encrypt it, so generating keys one at a time is CPU bound. Here the
+keys are derived and encrypted across a process pool, and the records
+stored in batches with `store_key_records`: a transaction of the keystore
+or a single index update per batch.
+
+Example:
+```py
+addresses = create_keys([f"operator{i}" for i in range(10_000)], password)
+```
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Iterable, Iterator, Mapping, Sequence, TypeVar
+
+from nacl.exceptions import CryptoError
+from torustrateinterface import Keypair
+
+from torusdk.encryption import Cipher
+from torusdk.key import (
+    TorusStorage,
+    decrypt_storage,
+    encrypt_storage,
+    key_record,
+    load_key_record,
+    local_key_adresses,
+    store_key_records,
+)
+from torusdk.keystore import record_of
+from torusdk.types.types import Ss58Address
+
+# keys derived by a worker per task
+KEYGEN_CHUNK_SIZE = 64
+# keys stored per write
+COMMIT_BATCH_SIZE = 1000
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+# a key's name, mnemonic (generated if None) and password
+_Job = tuple[str, str | None, str | None]
+
+
+def _reencrypt_records(
+    records: list[tuple[str, str]], old_password: str, new_password: str
+) -> list[tuple[str, str]]:
+    reencrypted: list[tuple[str, str]] = []
+    # the two ciphers of the chunk, dropped with their passwords on return
+    ciphers: dict[str, Cipher] = {}
+    for name, body in records:
+        stored_key = TorusStorage.model_validate_json(body)
+        if not stored_key.encrypted:
+            continue
+        try:
+            stored_key = decrypt_storage(stored_key, old_password, ciphers)
+        except CryptoError:
+            # encrypted with another password
+            continue
+        stored_key = encrypt_storage(stored_key, new_password, ciphers)
+        reencrypted.append((name, json.dumps(stored_key.model_dump())))
+    return reencrypted
+
+
+def _make_records(jobs: list[_Job]) -> list[tuple[str, str]]:
+    records: list[tuple[str, str]] = []
+    ciphers: dict[str, Cipher] = {}
+    for name, mnemonic, password in jobs:
+        if mnemonic is None:
+            mnemonic = Keypair.generate_mnemonic()
+        keypair = Keypair.create_from_mnemonic(mnemonic)
+        records.append((name, key_record(keypair, name, password, ciphers)))
+    return records
+
+
+def map_chunks(
+    fn: Callable[[list[_T]], list[_R]],
+    items: Sequence[_T],
+    processes: int | None = None,
+) -> Iterator[list[_R]]:
+    """
+    Applies `fn` to chunks of `items` across a process pool, yielding the
+    results of each chunk in order. `fn` must be a picklable module-level
+    function, or a `partial` of one.
+
+    Args:
+        fn: Maps a chunk of items to its results.
+        items: The items.
+        processes: Size of the process pool, the number of CPUs if
+          omitted. 0 runs `fn` in this process.
+    """
+    chunks = [
+        list(items[i : i + KEYGEN_CHUNK_SIZE])
+        for i in range(0, len(items), KEYGEN_CHUNK_SIZE)
+    ]
+    if processes == 0 or len(chunks) <= 1:
+        yield from map(fn, chunks)
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            yield from pool.map(fn, chunks)
+
+
+def store_in_batches(
+    results: Iterable[list[tuple[str, str]]],
+    on_stored: Callable[[int], None] | None = None,
+) -> dict[str, Ss58Address]:
+    """
+    Stores key records as they come, `COMMIT_BATCH_SIZE` at a time with
+    `store_key_records`.
+
+    Args:
+        results: Chunks of key names and their `key_record`s.
+        on_stored: Called with the number of keys stored so far after
+          each batch.
+
+    Returns:
+        The SS58 address of each stored key, by name.
+    """
+    addresses: dict[str, Ss58Address] = {}
+    pending: list[tuple[str, str]] = []
+
+    def commit():
+        store_key_records(pending)
+        for name, body in pending:
+            addresses[name] = Ss58Address(record_of(name, body)[1])
+        pending.clear()
+        if on_stored is not None:
+            on_stored(len(addresses))
+
+    for records in results:
+        pending.extend(records)
+        if len(pending) >= COMMIT_BATCH_SIZE:
+            commit()
+    if pending:
+        commit()
+    return addresses
+
+
+def _provision(
+    jobs: Sequence[_Job],
+    processes: int | None,
+    on_stored: Callable[[int], None] | None,
+) -> dict[str, Ss58Address]:
+    return store_in_batches(
+        map_chunks(_make_records, jobs, processes), on_stored
+    )
+
+
+def create_keys(
+    names: Sequence[str],
+    password: str | None = None,
+    processes: int | None = None,
+    on_stored: Callable[[int], None] | None = None,
+) -> dict[str, Ss58Address]:
+    """
+    Generates and stores new keys, replacing any key with the same name.
+
+    Args:
+        names: The names of the keys.
+        password: The password to encrypt the keys with.
+        processes: Size of the process pool, the number of CPUs if
+          omitted. 0 generates the keys in this process.
+        on_stored: Called with the number of keys stored so far after
+          each batch.
+
+    Returns:
+        The SS58 address of each key, by name.
+    """
+    return _provision(
+        [(name, None, password) for name in names], processes, on_stored
+    )
+
+
+def regen_keys(
+    mnemonics: Mapping[str, str],
+    password: str | None = None,
+    processes: int | None = None,
+    on_stored: Callable[[int], None] | None = None,
+) -> dict[str, Ss58Address]:
+    """
+    Stores keys from their mnemonics, replacing any key with the same name.
+
+    Args:
+        mnemonics: The mnemonic of each key, by name.
+        password: The password to encrypt the keys with.
+        processes: Size of the process pool, the number of CPUs if
+          omitted. 0 derives the keys in this process.
+        on_stored: Called with the number of keys stored so far after
+          each batch.
+
+    Returns:
+        The SS58 address of each key, by name.
+    """
+    return _provision(
+        [(name, mnemonic, password) for name, mnemonic in mnemonics.items()],
+        processes,
+        on_stored,
+    )
+
+
+def read_mnemonic_file(path: str) -> dict[str, str]:
+    """
+    Reads the keys of a mnemonic file: a line per key, its name followed
+    by its mnemonic, separated by whitespace. Blank lines and lines starting
+    with `#` are skipped.
+
+    Raises:
+        ValueError: If a line has no mnemonic, or a name appears twice.
+    """
+    mnemonics: dict[str, str] = {}
+    with open(path, "r") as file:
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            name, *words = line.split()
+            if not words:
+                raise ValueError(f"Line {number} has no mnemonic")
+            if name in mnemonics:
+                raise ValueError(
+                    f"Key '{name}' appears twice, on line {number}"
+                )
+            mnemonics[name] = " ".join(words)
+    return mnemonics
+
+
+def rotate_key_passwords(
+    old_password: str,
+    new_password: str,
+    names: Iterable[str] | None = None,
+    processes: int | None = None,
+    on_stored: Callable[[int], None] | None = None,
+) -> dict[str, Ss58Address]:
+    """
+    Re-encrypts keys with a new password, across a process pool.
+
+    Keys that are not encrypted, or encrypted with another password, are
+    left as they are.
+
+    Args:
+        old_password: The current password of the keys.
+        new_password: The password to encrypt them with.
+        names: The names of the keys. Every local key if omitted.
+        processes: Size of the process pool, the number of CPUs if
+          omitted. 0 re-encrypts the keys in this process.
+        on_stored: Called with the number of keys stored so far after
+          each batch.
+
+    Returns:
+        The SS58 address of each re-encrypted key, by name.
+    """
+    if names is None:
+        names = local_key_adresses().keys()
+    records = [(name, load_key_record(name)) for name in names]
+    reencrypt = partial(
+        _reencrypt_records,
+        old_password=old_password,
+        new_password=new_password,
+    )
+    return store_in_batches(
+        map_chunks(reencrypt, records, processes), on_stored
+    )
@@ -0,0 +1,450 @@
+"""
+A keyring agent holding decrypted keys and signing for other processes.
+
+Every command decrypts the keys it uses from disk, asking for a password
+or looking it up in the environment. `torus agentd` instead unlocks the
+keys once, and serves signatures over a Unix socket only the current user
+can connect to. While it runs, the CLI gets `AgentKeypair`s for the keys it
+holds: keypairs with a public key only, whose `sign` asks the agent, so
+they work anywhere a `Keypair` does, `TorusClient.compose_call` included.
+
+Protocol: every message is a frame of a 4-byte big-endian length followed
+by the body. A request body is an opcode byte and its arguments; a
+response body is a status byte, 0 for success or 1 for an error followed
+by its UTF-8 message, and the result. Strings are prefixed by their
+2-byte length, and data blobs by their 4-byte length.
+
+- `LIST`: the keys held, as a 4-byte count, then for each its name, public
+  key blob, SS58 format (2 bytes) and crypto type (1 byte).
+- `SIGN name data`: the signature of `data` by the key.
+- `SIGN_MANY name count data...`: the signatures of many blobs, each
+  prefixed by its length.
+- `LOCK`: wipes the keys and stops the agent.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence, cast
+
+from scalecodec.base import ScaleBytes
+from torustrateinterface import Keypair
+
+from torusdk.errors import KeyringAgentError
+
+AGENT_SOCKET_ENV = "TORUS_AGENT_SOCK"
+DEFAULT_AGENT_SOCKET = "~/.torus/agent.sock"
+# seconds without requests after which the agent wipes its keys and exits
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+
+OP_LIST = 1
+OP_SIGN = 2
+OP_SIGN_MANY = 3
+OP_LOCK = 4
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+_LENGTH = struct.Struct(">I")
+_SHORT = struct.Struct(">H")
+# mlockall flags, from <sys/mman.h>
+_MCL_CURRENT = 1
+
+
+def agent_socket_path() -> Path:
+    """The socket of the agent, `TORUS_AGENT_SOCK` if set."""
+    path = os.environ.get(AGENT_SOCKET_ENV) or DEFAULT_AGENT_SOCKET
+    return Path(os.path.expanduser(path))
+
+
+# ==== Wire format ====
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks: list[bytes] = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("The connection was closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    (size,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return _recv_exact(sock, size)
+
+
+def _send_frame(sock: socket.socket, body: bytes):
+    sock.sendall(_LENGTH.pack(len(body)) + body)
+
+
+def _pack_str(value: str) -> bytes:
+    encoded = value.encode()
+    return _SHORT.pack(len(encoded)) + encoded
+
+
+def _pack_blob(value: bytes) -> bytes:
+    return _LENGTH.pack(len(value)) + value
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self._data = memoryview(data)
+        self._offset = 0
+
+    def byte(self) -> int:
+        value = self._data[self._offset]
+        self._offset += 1
+        return value
+
+    def short(self) -> int:
+        (value,) = _SHORT.unpack_from(self._data, self._offset)
+        self._offset += _SHORT.size
+        return value
+
+    def length(self) -> int:
+        (value,) = _LENGTH.unpack_from(self._data, self._offset)
+        self._offset += _LENGTH.size
+        return value
+
+    def raw(self, size: int) -> bytes:
+        value = bytes(self._data[self._offset : self._offset + size])
+        self._offset += size
+        return value
+
+    def str(self) -> str:
+        return self.raw(self.short()).decode()
+
+    def blob(self) -> bytes:
+        return self.raw(self.length())
+
+    def rest(self) -> bytes:
+        return self.raw(len(self._data) - self._offset)
+
+
+# ==== Server ====
+
+
+def lock_memory() -> bool:
+    """
+    Keeps the current memory of the process, like the keys already loaded,
+    out of swap, and the process out of core dumps, as far as the platform
+    and limits allow.
+
+    Only the pages mapped now are locked: locking future ones too would
+    make allocations fail once `RLIMIT_MEMLOCK` is reached.
+
+    Returns:
+        Whether the memory could be locked.
+    """
+    try:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    except (ImportError, ValueError, OSError):
+        pass
+    libc_name = ctypes.util.find_library("c")
+    if libc_name is None:
+        return False
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    mlockall = getattr(libc, "mlockall", None)
+    if mlockall is None:
+        return False
+    return mlockall(_MCL_CURRENT) == 0
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        sock: socket.socket = self.request
+        agent = cast(_AgentServer, self.server).agent
+        if not agent.is_owner(sock):
+            return
+        while True:
+            try:
+                request = _recv_frame(sock)
+            except (ConnectionError, OSError):
+                return
+            try:
+                response = bytes([STATUS_OK]) + agent.handle(request)
+            except Exception as e:
+                response = bytes([STATUS_ERROR]) + str(e).encode()
+            _send_frame(sock, response)
+
+
+class _AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, agent: "KeyAgent"):
+        self.agent = agent
+        super().__init__(path, _Handler)
+
+
+class KeyAgent:
+    """
+    Serves signatures by unlocked keys over a Unix socket.
+
+    The socket is created with owner-only permissions, and connections
+    from other users are refused where the platform reports the peer.
+    After `idle_timeout` seconds without a request, the keys are wiped and
+    the agent stops.
+    """
+
+    def __init__(
+        self,
+        keypairs: dict[str, Keypair],
+        path: str | Path | None = None,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ):
+        self._keypairs = dict(keypairs)
+        self.path = Path(path) if path is not None else agent_socket_path()
+        self.idle_timeout = idle_timeout
+        self._last_request = time.monotonic()
+        self._server: _AgentServer | None = None
+        self._stopped = threading.Event()
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._keypairs)
+
+    def is_owner(self, sock: socket.socket) -> bool:
+        peercred = getattr(socket, "SO_PEERCRED", None)
+        if peercred is None:
+            # the socket permissions still keep other users out
+            return True
+        creds = sock.getsockopt(socket.SOL_SOCKET, peercred, 12)
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def handle(self, request: bytes) -> bytes:
+        self._last_request = time.monotonic()
+        reader = _Reader(request)
+        op = reader.byte()
+        if op == OP_LIST:
+            entries = [
+                _pack_str(name)
+                + _pack_blob(keypair.public_key)  # type: ignore
+                + _SHORT.pack(keypair.ss58_format)  # type: ignore
+                + bytes([keypair.crypto_type])
+                for name, keypair in self._keypairs.items()
+            ]
+            return _LENGTH.pack(len(entries)) + b"".join(entries)
+        if op == OP_SIGN:
+            keypair = self._keypair(reader.str())
+            return keypair.sign(reader.rest())
+        if op == OP_SIGN_MANY:
+            keypair = self._keypair(reader.str())
+            count = reader.length()
+            return b"".join(
+                _pack_blob(keypair.sign(reader.blob())) for _ in range(count)
+            )
+        if op == OP_LOCK:
+            threading.Thread(target=self.stop, daemon=True).start()
+            return b""
+        raise ValueError(f"Unknown operation {op}")
+
+    def _keypair(self, name: str) -> Keypair:
+        keypair = self._keypairs.get(name)
+        if keypair is None:
+            raise KeyringAgentError(f"The agent doesn't hold key '{name}'")
+        return keypair
+
+    def serve_forever(self):
+        """
+        Serves until locked, idle for `idle_timeout` seconds, or
+        interrupted. The keys are wiped and the socket removed on exit.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            if agent_is_running(self.path):
+                raise KeyringAgentError(
+                    f"An agent is already running on {self.path}"
+                )
+            self.path.unlink()
+        umask = os.umask(0o177)
+        try:
+            self._server = _AgentServer(str(self.path), self)
+        finally:
+            os.umask(umask)
+        watcher = threading.Thread(target=self._watch_idle, daemon=True)
+        watcher.start()
+        try:
+            self._server.serve_forever(poll_interval=0.5)
+        finally:
+            self._keypairs.clear()
+            self._server.server_close()
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            self._stopped.set()
+
+    def _watch_idle(self):
+        while not self._stopped.wait(1):
+            if time.monotonic() - self._last_request > self.idle_timeout:
+                self.stop()
+                return
+
+    def stop(self):
+        server = self._server
+        if server is not None:
+            server.shutdown()
+
+
+# ==== Client ====
+
+
+@dataclass
+class AgentKey:
+    name: str
+    public_key: bytes
+    ss58_format: int
+    crypto_type: int
+
+
+class AgentClient:
+    """
+    A connection to a running agent, reused for every request. Safe to
+    share between threads.
+    """
+
+    def __init__(self, path: str | Path | None = None):
+        self.path = Path(path) if path is not None else agent_socket_path()
+        self._lock = threading.Lock()
+        self._sock: socket.socket | None = None
+
+    def _request(self, body: bytes) -> _Reader:
+        with self._lock:
+            response = b""
+            for attempt in range(2):
+                if self._sock is None:
+                    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                    try:
+                        sock.connect(str(self.path))
+                    except OSError as e:
+                        sock.close()
+                        raise KeyringAgentError(
+                            f"No agent running on {self.path}"
+                        ) from e
+                    self._sock = sock
+                try:
+                    _send_frame(self._sock, body)
+                    response = _recv_frame(self._sock)
+                    break
+                except (ConnectionError, OSError):
+                    self._sock.close()
+                    self._sock = None
+                    # the agent may have dropped an idle connection
+                    if attempt:
+                        raise KeyringAgentError(
+                            "The agent closed the connection"
+                        )
+        reader = _Reader(response)
+        if reader.byte() != STATUS_OK:
+            raise KeyringAgentError(reader.rest().decode())
+        return reader
+
+    def list_keys(self) -> dict[str, AgentKey]:
+        reader = self._request(bytes([OP_LIST]))
+        keys: dict[str, AgentKey] = {}
+        for _ in range(reader.length()):
+            name = reader.str()
+            keys[name] = AgentKey(
+                name, reader.blob(), reader.short(), reader.byte()
+            )
+        return keys
+
+    def sign(self, name: str, data: bytes) -> bytes:
+        return self._request(bytes([OP_SIGN]) + _pack_str(name) + data).rest()
+
+    def sign_many(self, name: str, blobs: Sequence[bytes]) -> list[bytes]:
+        """Signs many blobs with a key in a single round trip."""
+        body = [
+            bytes([OP_SIGN_MANY]),
+            _pack_str(name),
+            _LENGTH.pack(len(blobs)),
+        ]
+        body.extend(_pack_blob(blob) for blob in blobs)
+        reader = self._request(b"".join(body))
+        return [reader.blob() for _ in blobs]
+
+    def lock(self):
+        """Wipes the keys of the agent and stops it."""
+        self._request(bytes([OP_LOCK]))
+
+    def close(self):
+        with self._lock:
+            if self._sock is not None:
+                self._sock.close()
+                self._sock = None
+
+
+class AgentKeypair(Keypair):
+    """
+    A keypair whose private key stays in the agent, which signs for it.
+    """
+
+    def __init__(self, agent: AgentClient, key: AgentKey):
+        super().__init__(  # type: ignore
+            public_key=key.public_key,
+            ss58_format=key.ss58_format,
+            crypto_type=key.crypto_type,
+        )
+        self.agent = agent
+        self.name = key.name
+
+    def sign(self, data: ScaleBytes | bytes | str) -> bytes:
+        if isinstance(data, ScaleBytes):
+            data = bytes(data.data)
+        elif isinstance(data, str):
+            data = (
+                bytes.fromhex(data[2:]) if data[:2] == "0x" else data.encode()
+            )
+        return self.agent.sign(self.name, data)
+
+
+def agent_is_running(path: str | Path | None = None) -> bool:
+    path = Path(path) if path is not None else agent_socket_path()
+    if not path.exists():
+        return False
+    try:
+        AgentClient(path).list_keys()
+    except KeyringAgentError:
+        return False
+    return True
+
+
+_agent_keys: dict[Path, tuple[AgentClient, dict[str, AgentKey]]] = {}
+
+
+def agent_keypairs() -> dict[str, AgentKeypair]:
+    """
+    The keys held by the running agent, by name, or none if it isn't
+    running. The list is fetched once per process.
+    """
+    path = agent_socket_path()
+    cached = _agent_keys.get(path)
+    if cached is None:
+        if not path.exists():
+            return {}
+        client = AgentClient(path)
+        try:
+            keys = client.list_keys()
+        except KeyringAgentError:
+            return {}
+        cached = _agent_keys[path] = (client, keys)
+    client, keys = cached
+    return {name: AgentKeypair(client, key) for name, key in keys.items()}
+
+
+def agent_keypair(name: str) -> AgentKeypair | None:
+    """The key of the running agent with this name, if any."""
+    return agent_keypairs().get(name)
@@ -0,0 +1,167 @@
+"""
+Single-file SQLite keystore, an alternative to one JSON file per key.
+
+With thousands of keys, scanning `~/.torus/key` and parsing a file for
+every key dominates each command. Once `~/.torus/keystore.db` exists, the
+functions of `torusdk.key` read and write keys there instead: a key is a
+row holding the same JSON record a key file would, with its name and
+address in indexed columns, so resolving a name or listing all addresses
+is a single query that parses no record.
+
+Create it from the existing key files with `torus key keystore-import`,
+and go back with `torus key keystore-export`.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Iterable
+
+KEYSTORE_NAME = "keystore.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (
+    name TEXT PRIMARY KEY,
+    ss58_address TEXT NOT NULL,
+    public_key TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS keys_ss58_address ON keys (ss58_address);
+"""
+
+KeyRecord = tuple[str, str, str, str]
+"""A key's name, SS58 address, public key and JSON record."""
+
+
+def record_of(name: str, body: str) -> KeyRecord:
+    """The row of a key, from the JSON record of its key file."""
+    data: dict[str, Any] = json.loads(body)
+    return name, data["ss58_address"], data["public_key"], body
+
+
+class SqliteKeystore:
+    """
+    Keys stored as rows of a SQLite database in WAL mode.
+
+    The records are stored as given, encrypted fields included, so the
+    keystore never sees a secret in the clear. Safe to share between
+    threads.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # durable on checkpoint, which is enough for WAL
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get(self, name: str) -> str | None:
+        """The JSON record of a key, or None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM keys WHERE name = ?", (name,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def address(self, name: str) -> str | None:
+        """The SS58 address of a key, without reading its record."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ss58_address FROM keys WHERE name = ?", (name,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def addresses(self) -> dict[str, str]:
+        """The SS58 address of every key, by name."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, ss58_address FROM keys"
+            ).fetchall()
+        return dict(rows)
+
+    def names(self) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM keys").fetchall()
+        return [name for (name,) in rows]
+
+    def __contains__(self, name: str) -> bool:
+        return self.address(name) is not None
+
+    def put(self, record: KeyRecord):
+        self.put_many([record])
+
+    def put_many(self, records: Iterable[KeyRecord]) -> int:
+        """
+        Inserts or replaces many keys in a single transaction.
+
+        Returns:
+            The number of keys written.
+        """
+        with self._lock, self._conn:
+            cursor = self._conn.executemany(
+                "INSERT OR REPLACE INTO keys VALUES (?, ?, ?, ?)", records
+            )
+        return cursor.rowcount
+
+    def import_dir(self, key_dir: str | Path, overwrite: bool = False) -> int:
+        """
+        Imports the key files of a directory, in a single transaction.
+
+        Args:
+            key_dir: A directory of `<name>.json` key files.
+            overwrite: Replace the keys already in the keystore, instead of
+              keeping them.
+
+        Returns:
+            The number of keys imported.
+        """
+        existing: set[str] = set() if overwrite else set(self.names())
+        records: list[KeyRecord] = []
+        with os.scandir(key_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not entry.is_file():
+                    continue
+                if not entry.name.endswith(".json"):
+                    continue
+                name = entry.name.removesuffix(".json")
+                if name in existing:
+                    continue
+                with open(entry.path, "r") as file:
+                    body = file.read()
+                try:
+                    records.append(record_of(name, body))
+                except (ValueError, KeyError):
+                    # not a key file, like the legacy `key2address`
+                    continue
+        return self.put_many(records)
+
+    def export_dir(self, key_dir: str | Path, overwrite: bool = False) -> int:
+        """
+        Writes every key as a `<name>.json` file, the layout used without a
+        keystore.
+
+        Returns:
+            The number of files written.
+        """
+        key_dir = Path(key_dir)
+        key_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, record FROM keys"
+            ).fetchall()
+        written = 0
+        for name, record in rows:
+            path = key_dir / f"{name}.json"
+            if not overwrite and path.exists():
+                continue
+            path.write_text(record)
+            written += 1
+        return written
@@ -3,7 +3,7 @@ from typing import Any, TypeVar
 
 from torusdk._common import transform_stake_dmap
 from torusdk.client import TorusClient
-from torusdk.key import check_ss58_address
+from torusdk.ss58 import check_ss58_addresses
 from torusdk.types.proposal import Emission
 from torusdk.types.types import (
     Agent,
@@ -50,8 +50,9 @@ def get_map_modules(
     }
     result_agents: dict[str, AgentInfoWithOptionalBalance] = {}
     ss58_to_stakeby = transform_stake_dmap(ss58_to_stakeby)
-    for ss58 in ss58_to_agents.keys():
-        key = check_ss58_address(ss58)
+    # decoded from the chain, valid by construction
+    keys = check_ss58_addresses(ss58_to_agents, trusted=True)
+    for ss58, key in zip(ss58_to_agents, keys):
         regblock = ss58_to_agents[ss58].registration_block
         stake_from = ss58_to_stakeby.get(key, [])
         metadata = ss58_to_agents[ss58].metadata
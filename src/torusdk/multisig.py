@@ -0,0 +1,288 @@
+"""
+Approval of many calls of a multisig account at once.
+
+Example:
+```py
+treasury = client.multisig(signatories, threshold=2)
+receipt = treasury.approve(key, [
+    BatchedCall("Balances", "transfer_keep_alive", {"dest": a, "value": x}),
+    BatchedCall("Balances", "transfer_keep_alive", {"dest": b, "value": y}),
+])
+print(treasury.pending())  # approvals collected so far, by call hash
+```
+"""
+
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Iterable, Sequence
+
+from scalecodec.types import GenericCall, MultiAccountId
+from scalecodec.utils.ss58 import ss58_encode
+from torustrateinterface import ExtrinsicReceipt, Keypair, SubstrateInterface
+
+from torusdk.batch import BatchedCall
+from torusdk.errors import ChainTransactionError
+from torusdk.types.types import Ss58Address
+
+if TYPE_CHECKING:
+    from torusdk.client import TorusClient
+
+# multisig accounts kept derived, by signatories and threshold
+MULTISIG_CACHE_SIZE = 256
+
+
+@lru_cache(maxsize=MULTISIG_CACHE_SIZE)
+def _multisig_account(
+    signatories: tuple[str, ...], threshold: int
+) -> MultiAccountId:
+    return MultiAccountId.create_from_account_list(  # type: ignore
+        list(signatories), threshold
+    )
+
+
+def multisig_account(
+    signatories: Iterable[Ss58Address], threshold: int
+) -> MultiAccountId:
+    """
+    Derives the account of a multisig, once per set of signatories and
+    threshold. The order of the signatories doesn't matter.
+
+    The result is shared, it must not be modified.
+    """
+    return _multisig_account(tuple(sorted(signatories)), threshold)
+
+
+@dataclass
+class PendingMultisig:
+    """
+    An operation of a multisig account waiting for approvals, as stored in
+    `Multisig.Multisigs`.
+
+    Attributes:
+        when: The block height and extrinsic index of the first approval,
+          which later approvals must refer to.
+        depositor: The signatory who reserved the deposit.
+        approvals: The signatories who approved so far.
+    """
+
+    when: dict[str, int]
+    depositor: Ss58Address
+    approvals: list[Ss58Address]
+
+
+class MultisigSession:
+    """
+    Submits the approvals of a multisig account, caching the derived
+    account and the pending operations of the calls it has seen.
+
+    The pending state of the calls of an approval is fetched in a single
+    query, and their maximum weights in a single fee estimation batch. Both
+    are done with direct RPC calls, leaving the connection configuration
+    as it is.
+    """
+
+    def __init__(
+        self,
+        client: "TorusClient",
+        signatories: Sequence[Ss58Address],
+        threshold: int,
+    ):
+        """
+        Args:
+            client: The client to query and submit through.
+            signatories: The SS58 addresses of all signatories.
+            threshold: The approvals needed to execute a call.
+        """
+        self._client = client
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        # `None` for the calls known to have no pending operation
+        self._pending: dict[str, PendingMultisig | None] = {}
+        with client.get_conn(init=True) as substrate:
+            self.account = multisig_account(signatories, threshold)
+            self.address = Ss58Address(
+                ss58_encode(self.account.value, substrate.ss58_format)  # type: ignore
+            )
+
+    def _compose(
+        self, substrate: SubstrateInterface, calls: Sequence[BatchedCall]
+    ) -> list[GenericCall]:
+        return [
+            self._client._compose_call(  # type: ignore
+                substrate, call.fn, call.params, call.module, call.sudo
+            )
+            for call in calls
+        ]
+
+    def _fetch(
+        self, substrate: SubstrateInterface, call_hashes: list[str]
+    ) -> dict[str, PendingMultisig | None]:
+        storage_keys = [
+            substrate.create_storage_key(  # type: ignore
+                "Multisig",
+                "Multisigs",
+                [self.account.value, call_hash],  # type: ignore
+            )
+            for call_hash in call_hashes
+        ]
+        results: list[Any] = substrate.query_multi(storage_keys)  # type: ignore
+        ss58_format: int = substrate.ss58_format  # type: ignore
+
+        def address(account: str) -> Ss58Address:
+            # decoded as hex when the runtime has no SS58 format
+            if account.startswith("0x"):
+                account = ss58_encode(account, ss58_format)
+            return Ss58Address(account)
+
+        fetched: dict[str, PendingMultisig | None] = {}
+        for call_hash, (_, value) in zip(call_hashes, results):
+            data: dict[str, Any] | None = value.value  # type: ignore
+            fetched[call_hash] = (
+                None
+                if not data
+                else PendingMultisig(
+                    data["when"],
+                    address(data["depositor"]),
+                    [address(a) for a in data["approvals"]],
+                )
+            )
+        return fetched
+
+    def pending(
+        self, call_hashes: Iterable[str] | None = None, refresh: bool = False
+    ) -> dict[str, PendingMultisig | None]:
+        """
+        The pending operations of calls, fetching the unknown ones in a
+        single query.
+
+        Args:
+            call_hashes: The hashes of the calls, as hex. All the calls seen
+              by the session if omitted.
+            refresh: Fetch them all again, instead of only the unknown ones.
+
+        Returns:
+            The pending operation of each call, or None if it has none.
+        """
+        with self._lock:
+            hashes = list(
+                dict.fromkeys(
+                    self._pending if call_hashes is None else call_hashes
+                )
+            )
+            missing = [h for h in hashes if refresh or h not in self._pending]
+        if missing:
+            with self._client.get_conn(init=True) as substrate:
+                fetched = self._fetch(substrate, missing)
+            with self._lock:
+                self._pending.update(fetched)
+        with self._lock:
+            return {h: self._pending.get(h) for h in hashes}
+
+    def approve(
+        self,
+        key: Keypair,
+        calls: Sequence[BatchedCall],
+        wait_for_inclusion: bool = True,
+        wait_for_finalization: bool | None = None,
+        era: dict[str, int] | None = None,
+    ) -> ExtrinsicReceipt | None:
+        """
+        Approves many calls in a single extrinsic.
+
+        Every call gets an `approve_as_multi`, or an `as_multi` executing it
+        if this approval reaches the threshold. With more than one call,
+        they are wrapped in a `Utility.batch_all`. Calls the key already
+        approved are skipped. The pending operations of the calls are
+        fetched again, in one query, rather than taken from the cache.
+
+        Args:
+            key: The keypair of one of the signatories.
+            calls: The calls to approve.
+            wait_for_inclusion: Wait for the extrinsic's inclusion in a
+              block.
+            wait_for_finalization: Wait for the extrinsic's finalization.
+            era: The mortality of the extrinsic, as `{"period": blocks}`.
+              Immortal if omitted.
+
+        Returns:
+            The receipt of the extrinsic, or None if the key already
+              approved every call.
+
+        Raises:
+            ChainTransactionError: If the extrinsic fails.
+        """
+        client = self._client
+        if wait_for_finalization is None:
+            wait_for_finalization = client.wait_for_finalization
+        signer = f"0x{key.public_key.hex()}"
+        others = [s for s in self.account.signatories if s != signer]  # type: ignore
+
+        with client.get_conn(init=True) as substrate:
+            composed = self._compose(substrate, calls)
+        hashes = [f"0x{call.call_hash.hex()}" for call in composed]  # type: ignore
+        # other signatories may have approved or executed them since
+        pending = self.pending(hashes, refresh=True)
+        todo = [
+            (call, spec, call_hash)
+            for call, spec, call_hash in zip(composed, calls, hashes)
+            if (op := pending[call_hash]) is None
+            or key.ss58_address not in op.approvals
+        ]
+        if not todo:
+            return None
+        # the weight limit of each call, from one batch of estimates
+        infos = client.estimate_fees([spec for _, spec, _ in todo])
+
+        approvals: list[tuple[str, dict[str, Any]]] = []
+        for (call, _, call_hash), info in zip(todo, infos):
+            op = pending[call_hash]
+            params: dict[str, Any] = {
+                "threshold": self.threshold,
+                "other_signatories": others,
+                "maybe_timepoint": op.when if op else None,
+                "max_weight": info["weight"],
+            }
+            approved = len(op.approvals) if op else 0
+            if approved + 1 >= self.threshold:
+                params["call"] = call.value  # type: ignore
+                approvals.append(("as_multi", params))
+            else:
+                params["call_hash"] = call_hash
+                approvals.append(("approve_as_multi", params))
+
+        if len(approvals) == 1:
+            [(fn, params)] = approvals
+            module = "Multisig"
+        else:
+            fn, module = "batch_all", "Utility"
+            with client.get_conn(init=True) as substrate:
+                params = {
+                    "calls": [
+                        substrate.compose_call("Multisig", name, approval).value  # type: ignore
+                        for name, approval in approvals
+                    ]
+                }
+
+        with client.get_conn() as substrate:
+            extrinsic = client._create_extrinsic(  # type: ignore
+                substrate, fn, params, key, module, False, False, None, era=era
+            )
+            response = substrate.submit_extrinsic(
+                extrinsic=extrinsic,
+                wait_for_inclusion=wait_for_inclusion,
+                wait_for_finalization=wait_for_finalization,
+            )
+        with self._lock:
+            # their state changed, it is fetched again when needed
+            for _, _, call_hash in todo:
+                self._pending.pop(call_hash, None)
+
+        if wait_for_inclusion:
+            response = client.receipts.wrap(response)
+            if not response.is_success:
+                raise ChainTransactionError(
+                    response.error_message,  # type: ignore
+                    response,  # type: ignore
+                )
+        return response
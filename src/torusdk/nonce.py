@@ -0,0 +1,146 @@
+"""
+Local account nonce management for pipelined extrinsic submission.
+
+By default every signed extrinsic asks the node for the signer's next nonce,
+so a key can only have a single transaction in flight. A `NonceManager`
+fetches the nonces once, for many keys in a single batch, and then hands
+them out locally, so one key can submit many extrinsics into the same
+block.
+
+Example:
+```py
+nonces = NonceManager(client)
+nonces.prefetch([key.ss58_address for key in keys])
+client.nonce_manager = nonces
+for dest in destinations:
+    transfer(client, key, 1, dest)  # nonces n, n+1, n+2, ...
+```
+"""
+
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Generator, Iterable
+
+from torusdk.errors import ChainTransactionError, NetworkQueryError
+from torusdk.types.types import Ss58Address
+
+if TYPE_CHECKING:
+    from torusdk.client import TorusClient
+
+
+class NonceManager:
+    """
+    Hands out consecutive nonces per account, starting from the node's
+    `system_accountNextIndex`.
+
+    Nonces reserved through `reserve` are given back by resyncing with the
+    node when the submission fails, and the ones of extrinsics followed
+    through `watch` when they are dropped after being accepted, so a
+    rejected or dropped extrinsic doesn't leave a gap that would stall
+    every later one.
+    """
+
+    def __init__(self, client: "TorusClient"):
+        self._client = client
+        self._lock = threading.Lock()
+        self._next: dict[Ss58Address, int] = {}
+
+    def _fetch(self, addresses: list[Ss58Address]) -> dict[Ss58Address, int]:
+        """Fetches the next index of every address in a single batch."""
+        batch = [
+            ("system_accountNextIndex", [address]) for address in addresses
+        ]
+        messages = self._client.rpc_batch_messages(batch)
+        nonces: dict[Ss58Address, int] = {}
+        for address, message in zip(addresses, messages):
+            if "result" not in message:
+                raise NetworkQueryError(message.get("error"))
+            nonces[address] = message["result"]
+        return nonces
+
+    def prefetch(self, addresses: Iterable[Ss58Address]):
+        """
+        Fetches the nonces of the addresses not known yet, in one batch.
+        """
+        with self._lock:
+            missing = list(
+                dict.fromkeys(a for a in addresses if a not in self._next)
+            )
+        if not missing:
+            return
+        fetched = self._fetch(missing)
+        with self._lock:
+            for address, nonce in fetched.items():
+                self._next.setdefault(address, nonce)
+
+    def next(self, address: Ss58Address) -> int:
+        """
+        Takes the next nonce of the address, fetching it first if needed.
+        """
+        self.prefetch([address])
+        with self._lock:
+            nonce = self._next[address]
+            self._next[address] = nonce + 1
+        return nonce
+
+    def resync(self, *addresses: Ss58Address):
+        """
+        Replaces the local nonces of the addresses with the node's.
+
+        The node's next index accounts for the extrinsics in its pool, so
+        the nonces still in flight are not handed out again.
+        """
+        if not addresses:
+            with self._lock:
+                addresses = tuple(self._next)
+            if not addresses:
+                return
+        fetched = self._fetch(list(addresses))
+        with self._lock:
+            self._next.update(fetched)
+
+    def forget(self, address: Ss58Address):
+        """Drops the local nonce, it will be fetched again when needed."""
+        with self._lock:
+            self._next.pop(address, None)
+
+    def peek(self, address: Ss58Address) -> int | None:
+        """The nonce the next extrinsic of the address will use, if known."""
+        with self._lock:
+            return self._next.get(address)
+
+    @contextmanager
+    def reserve(self, address: Ss58Address) -> Generator[int, None, None]:
+        """
+        Takes the next nonce of the address, resyncing if the enclosed
+        submission raises before the extrinsic is included.
+        """
+        nonce = self.next(address)
+        try:
+            yield nonce
+        except ChainTransactionError:
+            # the extrinsic was included, and its nonce used, but it failed
+            raise
+        except Exception:
+            self.resync(address)
+            raise
+
+    def watch(self, address: Ss58Address, future: Future[Any]):
+        """
+        Forgets the local nonce of the address if the extrinsic of `future`
+        is not included, like when it is dropped from the pool or times out
+        in the tracker, so the next nonce is fetched from the node again.
+        """
+
+        def done(future: Future[Any]):
+            if future.cancelled():
+                return
+            error = future.exception()
+            # a failed call was included, and its nonce used
+            if error is not None and not isinstance(
+                error, ChainTransactionError
+            ):
+                self.forget(address)
+
+        future.add_done_callback(done)
@@ -0,0 +1,431 @@
+"""
+Encoding and signing of extrinsics without a node connection.
+
+`TorusClient.compose_call` encodes and signs on a pooled connection, one
+extrinsic at a time. An `OfflineComposer` only needs a `RuntimeSnapshot`,
+the runtime metadata and versions fetched once, so the CPU-bound work runs
+across a pool of processes while no connection is held. Unsigned payloads
+can be exported to be signed elsewhere, and the signed extrinsics are sent
+by `TorusClient.submit_signed`.
+
+Extrinsics signed offline are always immortal: a mortal era signs a recent
+block hash, which a snapshot doesn't have. They stay valid until their
+nonce is used.
+
+Example:
+```py
+nonces = NonceManager(client)
+with OfflineComposer(client.runtime_snapshot()) as composer:
+    signed = composer.sign(
+        [(call, key, nonces.next(key.ss58_address)) for call in calls]
+    )
+receipts = [f.result() for f in client.submit_signed(signed)]
+```
+"""
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Sequence
+
+from scalecodec.base import ScaleBytes
+from scalecodec.types import GenericCall
+from torustrateinterface import Keypair, SubstrateInterface
+
+from torusdk.batch import BatchedCall
+from torusdk.errors import NetworkError
+from torusdk.types.types import Ss58Address
+
+# extrinsics handed to a worker process at a time
+SIGN_CHUNK_SIZE = 64
+
+
+@dataclass(frozen=True)
+class RuntimeSnapshot:
+    """
+    What encoding and signing extrinsics needs from the node, valid until
+    the next runtime upgrade.
+
+    Attributes:
+        metadata: The SCALE encoded runtime metadata, as hex.
+        spec_version: The runtime spec version.
+        transaction_version: The runtime transaction version.
+        genesis_hash: The hash of the genesis block, signed by immortal
+          extrinsics.
+        ss58_format: The address format of the chain.
+        type_registry_preset: The scalecodec preset of the chain, if any.
+    """
+
+    metadata: str
+    spec_version: int
+    transaction_version: int
+    genesis_hash: str
+    ss58_format: int
+    type_registry_preset: str | None = None
+
+    @classmethod
+    def from_substrate(cls, substrate: SubstrateInterface) -> "RuntimeSnapshot":
+        """Takes the snapshot of an initialized connection."""
+        return cls(
+            metadata=str(substrate.metadata.data),  # type: ignore
+            spec_version=substrate.runtime_version,  # type: ignore
+            transaction_version=substrate.transaction_version,  # type: ignore
+            genesis_hash=substrate.get_block_hash(0),  # type: ignore
+            ss58_format=substrate.ss58_format,  # type: ignore
+            type_registry_preset=substrate.type_registry_preset,  # type: ignore
+        )
+
+    def save(self, path: str | Path):
+        with open(path, "w") as f:
+            json.dump(asdict(self), f)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "RuntimeSnapshot":
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+@dataclass(frozen=True)
+class UnsignedExtrinsic:
+    """
+    An extrinsic waiting for its signature.
+
+    Attributes:
+        call: The SCALE encoded call, as hex.
+        signer: The address expected to sign it.
+        nonce: The nonce of the signer it was made for.
+        payload: The exact bytes to sign, as hex, for signers without the
+          runtime metadata.
+        spec_version: The runtime it was encoded for.
+    """
+
+    call: str
+    signer: Ss58Address
+    nonce: int
+    payload: str
+    spec_version: int
+
+    def to_json(self) -> str:
+        return json.dumps(asdict(self))
+
+    @classmethod
+    def from_json(cls, data: str) -> "UnsignedExtrinsic":
+        return cls(**json.loads(data))
+
+
+class OfflineSubstrate(SubstrateInterface):
+    """
+    A `SubstrateInterface` that encodes and signs against a snapshot, and
+    refuses any request to a node.
+    """
+
+    def __init__(self, snapshot: RuntimeSnapshot):
+        super().__init__(  # type: ignore
+            url="offline",
+            ss58_format=snapshot.ss58_format,
+            type_registry_preset=snapshot.type_registry_preset,
+            auto_discover=False,
+        )
+        self._genesis_hash = snapshot.genesis_hash
+        metadata = self.runtime_config.create_scale_object(  # type: ignore
+            "MetadataVersioned", data=ScaleBytes(snapshot.metadata)
+        )
+        metadata.decode()  # type: ignore
+        self.metadata = metadata  # type: ignore
+        self.runtime_version = snapshot.spec_version
+        self.transaction_version = snapshot.transaction_version
+        self.reload_type_registry(use_remote_preset=False, auto_discover=False)
+        self.runtime_config.add_portable_registry(metadata)  # type: ignore
+        self.runtime_config.set_active_spec_version_id(snapshot.spec_version)  # type: ignore
+        try:
+            self.runtime_config.create_scale_object(  # type: ignore
+                "sp_weights::weight_v2::Weight"
+            )
+            self.runtime_config.update_type_registry_types(  # type: ignore
+                {"Weight": "sp_weights::weight_v2::Weight"}
+            )
+        except NotImplementedError:
+            self.runtime_config.update_type_registry_types(  # type: ignore
+                {"Weight": "WeightV1"}
+            )
+
+    def init_runtime(self, block_hash: Any = None, block_id: Any = None):
+        pass
+
+    def get_block_hash(self, block_id: int | None = None) -> str:
+        if block_id == 0:
+            return self._genesis_hash
+        raise NetworkError("An offline runtime can only sign immortal eras")
+
+    def rpc_request(self, method: str, params: Any, result_handler: Any = None):
+        raise NetworkError(f"Offline, can't request `{method}`")
+
+    def compose(self, call: BatchedCall) -> GenericCall:
+        composed = self.compose_call(  # type: ignore
+            call_module=call.module,
+            call_function=call.fn,
+            call_params=call.params,
+        )
+        if call.sudo:
+            composed = self.compose_call(  # type: ignore
+                call_module="Sudo",
+                call_function="sudo",
+                call_params={"call": composed.value},  # type: ignore
+            )
+        return composed
+
+    def decode_call(self, data: str) -> GenericCall:
+        call: GenericCall = self.runtime_config.create_scale_object(  # type: ignore
+            "Call",
+            data=ScaleBytes(data),
+            metadata=self.metadata,  # type: ignore
+        )
+        call.decode()  # type: ignore
+        return call
+
+    def sign(self, call: GenericCall, key: Keypair, nonce: int) -> str:
+        extrinsic = self.create_signed_extrinsic(  # type: ignore
+            call=call, keypair=key, nonce=nonce
+        )
+        return str(extrinsic.data)  # type: ignore
+
+
+# ==== Worker processes ====
+
+# the runtime of each worker process, decoded once by `_init_worker`
+_worker_substrate: OfflineSubstrate | None = None
+
+_KeyParts = tuple[str, str, int, int]
+
+
+def _key_parts(key: Keypair) -> _KeyParts:
+    assert key.private_key is not None, "The key can't sign"
+    return (
+        key.public_key.hex(),  # type: ignore
+        key.private_key.hex(),  # type: ignore
+        key.ss58_format,  # type: ignore
+        key.crypto_type,
+    )
+
+
+def _init_worker(snapshot: RuntimeSnapshot):
+    global _worker_substrate
+    _worker_substrate = OfflineSubstrate(snapshot)
+
+
+_Job = tuple[BatchedCall | str, _KeyParts, int]
+
+
+def _sign_chunk(jobs: list[_Job]) -> list[str]:
+    assert _worker_substrate is not None
+    return _sign_jobs(_worker_substrate, jobs)
+
+
+def _sign_jobs(substrate: OfflineSubstrate, jobs: list[_Job]) -> list[str]:
+    keys: dict[_KeyParts, Keypair] = {}
+    signed: list[str] = []
+    for call, parts, nonce in jobs:
+        key = keys.get(parts)
+        if key is None:
+            public_key, private_key, ss58_format, crypto_type = parts
+            key = Keypair(
+                public_key=public_key,
+                private_key=private_key,
+                ss58_format=ss58_format,
+                crypto_type=crypto_type,
+            )
+            keys[parts] = key
+        composed = (
+            substrate.decode_call(call)
+            if isinstance(call, str)
+            else substrate.compose(call)
+        )
+        signed.append(substrate.sign(composed, key, nonce))
+    return signed
+
+
+class OfflineComposer:
+    """
+    Encodes and signs extrinsics from a `RuntimeSnapshot`, spreading the
+    signing over a pool of processes.
+
+    The private keys are sent to the worker processes through pipes, and
+    stay in their memory until the composer is closed. The extrinsics are
+    immortal, they stay valid until their nonce is used.
+    """
+
+    def __init__(self, snapshot: RuntimeSnapshot, processes: int | None = None):
+        """
+        Args:
+            snapshot: The runtime to encode against.
+            processes: Size of the signing pool, the number of CPUs if
+              omitted. With 0, signing runs in the calling process.
+        """
+        self.snapshot = snapshot
+        self.substrate = OfflineSubstrate(snapshot)
+        self._processes = processes
+        self._pool: ProcessPoolExecutor | None = None
+
+    def __enter__(self) -> "OfflineComposer":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                self._processes,
+                initializer=_init_worker,
+                initargs=(self.snapshot,),
+            )
+        return self._pool
+
+    def encode(self, calls: Sequence[BatchedCall]) -> list[str]:
+        """Encodes the calls, as hex."""
+        return [str(self.substrate.compose(call).data) for call in calls]  # type: ignore
+
+    def unsigned(
+        self, calls: Sequence[BatchedCall], signer: Ss58Address, nonce: int
+    ) -> list[UnsignedExtrinsic]:
+        """
+        Prepares the calls to be signed elsewhere, with consecutive nonces
+        from `nonce`.
+        """
+        unsigned: list[UnsignedExtrinsic] = []
+        for i, call in enumerate(calls):
+            composed = self.substrate.compose(call)
+            payload = self.substrate.generate_signature_payload(  # type: ignore
+                call=composed, nonce=nonce + i
+            )
+            unsigned.append(
+                UnsignedExtrinsic(
+                    call=str(composed.data),  # type: ignore
+                    signer=signer,
+                    nonce=nonce + i,
+                    payload=str(payload),  # type: ignore
+                    spec_version=self.snapshot.spec_version,
+                )
+            )
+        return unsigned
+
+    def sign(
+        self,
+        jobs: Sequence[tuple[BatchedCall | UnsignedExtrinsic, Keypair, int]],
+    ) -> list[str]:
+        """
+        Encodes and signs extrinsics across the process pool.
+
+        Args:
+            jobs: Each extrinsic as its call, or an exported unsigned
+              extrinsic, the keypair signing it and its nonce.
+
+        Returns:
+            The signed extrinsics, as hex, in order.
+
+        Raises:
+            ValueError: If an unsigned extrinsic was made for another
+              runtime or signer.
+        """
+        prepared: list[_Job] = []
+        parts_by_key: dict[int, _KeyParts] = {}
+        for call, key, nonce in jobs:
+            if isinstance(call, UnsignedExtrinsic):
+                if call.spec_version != self.snapshot.spec_version:
+                    raise ValueError(
+                        f"Extrinsic encoded for runtime {call.spec_version}, "
+                        f"not {self.snapshot.spec_version}"
+                    )
+                if call.signer != key.ss58_address:
+                    raise ValueError(
+                        f"Extrinsic expects signer {call.signer}, "
+                        f"not {key.ss58_address}"
+                    )
+
+        if any(not key.private_key for _, key, _ in jobs):
+            # keys signing elsewhere, like a keyring agent's, can't be sent
+            # to the workers
+            return [
+                self.substrate.sign(
+                    self.substrate.decode_call(call.call)
+                    if isinstance(call, UnsignedExtrinsic)
+                    else self.substrate.compose(call),
+                    key,
+                    nonce,
+                )
+                for call, key, nonce in jobs
+            ]
+
+        for call, key, nonce in jobs:
+            parts = parts_by_key.get(id(key))
+            if parts is None:
+                parts = parts_by_key[id(key)] = _key_parts(key)
+            encoded = call.call if isinstance(call, UnsignedExtrinsic) else call
+            prepared.append((encoded, parts, nonce))
+
+        if self._processes == 0:
+            return _sign_jobs(self.substrate, prepared)
+
+        chunks = [
+            prepared[i : i + SIGN_CHUNK_SIZE]
+            for i in range(0, len(prepared), SIGN_CHUNK_SIZE)
+        ]
+        pool = self._get_pool()
+        return [
+            extrinsic
+            for signed in pool.map(_sign_chunk, chunks)
+            for extrinsic in signed
+        ]
+
+    def sign_unsigned(
+        self, unsigned: Sequence[UnsignedExtrinsic], key: Keypair
+    ) -> list[str]:
+        """Signs exported unsigned extrinsics, with their own nonces."""
+        return self.sign([(entry, key, entry.nonce) for entry in unsigned])
+
+    def assemble(self, unsigned: UnsignedExtrinsic, signature: str) -> str:
+        """
+        Builds the signed extrinsic from an exported unsigned one and the
+        signature of its payload, made by an external signer.
+
+        Args:
+            unsigned: The extrinsic that was signed.
+            signature: The signature of `unsigned.payload`, as hex. A
+              `MultiSignature` with its leading type byte is accepted.
+
+        Returns:
+            The signed extrinsic, as hex.
+        """
+        signer = Keypair(ss58_address=unsigned.signer)
+        extrinsic = self.substrate.create_signed_extrinsic(  # type: ignore
+            call=self.substrate.decode_call(unsigned.call),
+            keypair=signer,
+            nonce=unsigned.nonce,
+            signature=signature,
+        )
+        return str(extrinsic.data)  # type: ignore
+
+
+def save_unsigned(path: str | Path, unsigned: Sequence[UnsignedExtrinsic]):
+    """Exports unsigned extrinsics as JSON lines."""
+    with open(path, "w") as f:
+        for entry in unsigned:
+            f.write(entry.to_json() + "\n")
+
+
+def load_unsigned(path: str | Path) -> list[UnsignedExtrinsic]:
+    """Imports unsigned extrinsics exported by `save_unsigned`."""
+    with open(path) as f:
+        return [UnsignedExtrinsic.from_json(line) for line in f if line.strip()]
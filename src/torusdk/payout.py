@@ -0,0 +1,453 @@
+"""
+Bulk payouts to any number of recipients.
+
+A single `transfer_multiple` extrinsic can't grow past the block length and
+weight limits. A `PayoutEngine` splits the recipients into the largest
+`Utility.batch_all` extrinsics of `Balances.transfer_keep_alive` calls that
+fit, submits all of them at once with consecutive nonces, and records its
+progress in a journal, so an interrupted payout is resumed without paying
+anyone twice.
+
+Example:
+```py
+engine = PayoutEngine(client, key, journal="payout.jsonl")
+report = engine.run([(address, amount) for address, amount in rewards])
+print(f"paid {report.paid} recipients in {len(report.receipts)} extrinsics")
+```
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Sequence
+
+from torustrateinterface import ExtrinsicReceipt, Keypair, SubstrateInterface
+from torustrateinterface.exceptions import SubstrateRequestException
+
+from torusdk.batch import BatchedCall, BatchLimits
+from torusdk.errors import NetworkError
+from torusdk.nonce import NonceManager
+from torusdk.types.types import Ss58Address
+
+if TYPE_CHECKING:
+    from torusdk.client import TorusClient
+
+Payout = tuple[Ss58Address, int]
+
+
+def _compact_length(value: int) -> int:
+    """Length of `value` in the SCALE compact encoding."""
+    if value < 1 << 6:
+        return 1
+    if value < 1 << 14:
+        return 2
+    if value < 1 << 30:
+        return 4
+    return 1 + (value.bit_length() + 7) // 8
+
+
+def payouts_digest(payouts: Sequence[Payout]) -> str:
+    """Identifies a payout list, to match it against a journal."""
+    digest = hashlib.sha256()
+    for dest, amount in payouts:
+        digest.update(f"{dest}:{amount}\n".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class PayoutReport:
+    """
+    Outcome of a payout run.
+
+    Attributes:
+        paid: Recipients paid by this run.
+        skipped: Recipients already paid according to the journal.
+        receipts: The receipts of the successful extrinsics, in order.
+        failed: Recipient ranges `(start, end)` whose extrinsic failed or
+          was rejected by the node, with the error. They are paid when
+          resumed.
+        unconfirmed: Recipient ranges whose extrinsic may have been
+          submitted, but whose outcome is unknown. When resumed, they are
+          paid again only if the nonce of their extrinsic was not used.
+        unsubmitted: Recipient ranges left unsubmitted after an earlier
+          extrinsic was rejected or its submission failed. They are paid
+          when resumed.
+    """
+
+    paid: int = 0
+    skipped: int = 0
+    receipts: list[ExtrinsicReceipt] = field(
+        default_factory=list[ExtrinsicReceipt]
+    )
+    failed: list[tuple[int, int, str]] = field(
+        default_factory=list[tuple[int, int, str]]
+    )
+    unconfirmed: list[tuple[int, int]] = field(
+        default_factory=list[tuple[int, int]]
+    )
+    unsubmitted: list[tuple[int, int]] = field(
+        default_factory=list[tuple[int, int]]
+    )
+
+
+class PayoutJournal:
+    """
+    Append-only JSON lines log of the extrinsics of a payout.
+
+    Each extrinsic is recorded as submitted, with its nonce, before it is
+    sent, and then as included or failed. A range that was submitted but
+    never resolved is unconfirmed: it was paid if its nonce was used.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def _append(self, entry: dict[str, Any]):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def entries(self) -> list[dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        with open(self.path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def start(self, digest: str, count: int):
+        """
+        Opens the journal for a payout list, checking it's the one the
+        journal was started with.
+
+        Raises:
+            ValueError: If the journal belongs to a different payout list.
+        """
+        entries = self.entries()
+        if not entries:
+            self._append({"event": "start", "digest": digest, "count": count})
+            return
+        if entries[0].get("digest") != digest:
+            raise ValueError(
+                f"The journal {self.path} was written for a different "
+                "payout list"
+            )
+
+    def submitted(self, start: int, end: int, nonce: int):
+        self._append(
+            {"event": "submitted", "start": start, "end": end, "nonce": nonce}
+        )
+
+    def included(self, start: int, end: int, receipt: ExtrinsicReceipt):
+        self._append(
+            {
+                "event": "included",
+                "start": start,
+                "end": end,
+                "extrinsic": receipt.extrinsic_hash,
+                "block": receipt.block_hash,
+            }
+        )
+
+    def failed(self, start: int, end: int, error: str):
+        self._append(
+            {"event": "failed", "start": start, "end": end, "error": error}
+        )
+
+    def state(
+        self,
+    ) -> tuple[list[tuple[int, int]], list[tuple[int, int, int]]]:
+        """
+        Returns:
+            The paid ranges, and the submitted but unresolved ranges with
+              their nonces.
+        """
+        paid: list[tuple[int, int]] = []
+        open_ranges: dict[tuple[int, int], int] = {}
+        for entry in self.entries():
+            event = entry["event"]
+            if event == "start":
+                continue
+            span = (entry["start"], entry["end"])
+            if event == "submitted":
+                open_ranges[span] = entry["nonce"]
+            else:
+                open_ranges.pop(span, None)
+                if event == "included":
+                    paid.append(span)
+        unresolved = [
+            (start, end, nonce) for (start, end), nonce in open_ranges.items()
+        ]
+        return paid, unresolved
+
+
+class PayoutEngine:
+    """
+    Pays a list of `(address, amount)` from one key, in as few extrinsics as
+    the block limits allow, all submitted at once.
+
+    The recipients are cut into consecutive ranges. Each range becomes one
+    `Utility.batch_all` extrinsic, so a range is either fully paid or not
+    paid at all. The range sizes are bounded by `Utility.batched_calls_limit`,
+    the block length, computed from the exact encoded length of every
+    transfer, and the extrinsic weight, estimated from `payment_queryInfo`
+    of sample batches.
+    """
+
+    def __init__(
+        self,
+        client: "TorusClient",
+        key: Keypair,
+        journal: str | Path | None = None,
+        limits: BatchLimits | None = None,
+        wait_for_finalization: bool | None = None,
+    ):
+        """
+        Args:
+            client: The client to submit the extrinsics through.
+            key: The keypair paying every recipient.
+            journal: Path of the progress journal. Running again with the
+              same journal and payout list only pays what is left.
+            limits: Limits of each extrinsic, read from the runtime if
+              omitted.
+            wait_for_finalization: Consider an extrinsic done once its block
+              is finalized, instead of once it is imported.
+        """
+        self._client = client
+        self.key = key
+        self.journal = None if journal is None else PayoutJournal(journal)
+        self.limits = limits
+        self.wait_for_finalization = wait_for_finalization
+        self._call_length: int | None = None
+        self._weight: tuple[dict[str, int], dict[str, int]] | None = None
+
+    def _transfer(self, dest: Ss58Address, amount: int) -> dict[str, Any]:
+        return {
+            "call_module": "Balances",
+            "call_function": "transfer_keep_alive",
+            "call_args": {"dest": dest, "value": amount},
+        }
+
+    def _batch_params(self, payouts: Sequence[Payout]) -> dict[str, Any]:
+        return {
+            "calls": [self._transfer(dest, amount) for dest, amount in payouts]
+        }
+
+    def _probe_length(self, substrate: SubstrateInterface):
+        """Measures the encoded length of a transfer."""
+        template = substrate.compose_call(  # type: ignore
+            call_module="Balances",
+            call_function="transfer_keep_alive",
+            call_params={
+                "dest": Ss58Address(self.key.ss58_address),
+                "value": 0,
+            },
+        )
+        # the value is encoded as a compact, 1 byte for zero
+        self._call_length = len(template.data) - 1  # type: ignore
+
+    def _probe_weight(self):
+        """
+        Measures the weight of a batch without calls and of each transfer in
+        it, from the `payment_queryInfo` of batches of one and two.
+        """
+        dest = Ss58Address(self.key.ss58_address)
+        one, two = (
+            info["weight"]
+            for info in self._client.estimate_fees(
+                [
+                    BatchedCall(
+                        "Utility",
+                        "batch_all",
+                        self._batch_params([(dest, 1)] * size),
+                    )
+                    for size in (1, 2)
+                ],
+                self.key,
+            )
+        )
+        per_call = {
+            dim: max(two.get(dim, 0) - one.get(dim, 0), 0) for dim in two
+        }
+        base = {
+            dim: max(one.get(dim, 0) - per_call[dim], 0) for dim in per_call
+        }
+        self._weight = (base, per_call)
+
+    def max_calls(self) -> int:
+        """
+        The most transfers an extrinsic can take, by count and weight.
+        """
+        limits = self._ensure_limits()
+        assert self._weight is not None
+        base, per_call = self._weight
+        most = limits.max_calls
+        for dim, limit in (
+            ("ref_time", limits.max_ref_time),
+            ("proof_size", limits.max_proof_size),
+        ):
+            if limit is None or not per_call.get(dim):
+                continue
+            fit = (limit - base.get(dim, 0)) // per_call[dim]
+            most = min(most, fit)
+        return max(most, 1)
+
+    def _ensure_limits(self) -> BatchLimits:
+        if self.limits is None or self._call_length is None:
+            with self._client.get_conn(init=True) as substrate:
+                if self.limits is None:
+                    self.limits = BatchLimits.from_runtime(substrate)
+                self._probe_length(substrate)
+        if self._weight is None:
+            # checks out a connection of its own
+            self._probe_weight()
+        return self.limits
+
+    def plan(
+        self,
+        payouts: Sequence[Payout],
+        start: int = 0,
+        end: int | None = None,
+    ) -> list[tuple[int, int]]:
+        """
+        Cuts the payouts from `start` to `end` into the ranges of each
+        extrinsic.
+        """
+        limits = self._ensure_limits()
+        assert self._call_length is not None
+        most = self.max_calls()
+        end = len(payouts) if end is None else end
+
+        ranges: list[tuple[int, int]] = []
+        first, length = start, 0
+        for i in range(start, end):
+            call_length = self._call_length + _compact_length(payouts[i][1])
+            if i > first and (
+                i - first >= most or length + call_length > limits.max_length
+            ):
+                ranges.append((first, i))
+                first, length = i, 0
+            length += call_length
+        if first < end:
+            ranges.append((first, end))
+        return ranges
+
+    def _pending_ranges(
+        self,
+        payouts: Sequence[Payout],
+        nonces: NonceManager,
+        report: PayoutReport,
+    ) -> list[tuple[int, int]]:
+        """
+        The ranges still to pay, according to the journal. Unresolved
+        ranges whose nonce was used are left out as unconfirmed.
+        """
+        done = [False] * len(payouts)
+        if self.journal is not None:
+            self.journal.start(payouts_digest(payouts), len(payouts))
+            paid, unresolved = self.journal.state()
+            for start, end in paid:
+                done[start:end] = [True] * (end - start)
+                report.skipped += end - start
+            if unresolved:
+                # the node's next nonce counts its pool, a used nonce means
+                # the extrinsic was included or is about to be
+                address = Ss58Address(self.key.ss58_address)
+                nonces.resync(address)
+                next_nonce = nonces.peek(address) or 0
+                for start, end, nonce in unresolved:
+                    if nonce < next_nonce:
+                        done[start:end] = [True] * (end - start)
+                        report.unconfirmed.append((start, end))
+
+        ranges: list[tuple[int, int]] = []
+        i = 0
+        while i < len(done):
+            if done[i]:
+                i += 1
+                continue
+            j = i
+            while j < len(done) and not done[j]:
+                j += 1
+            ranges.extend(self.plan(payouts, i, j))
+            i = j
+        return ranges
+
+    def run(self, payouts: Sequence[Payout]) -> PayoutReport:
+        """
+        Pays every recipient not paid yet, and waits for the extrinsics.
+
+        All extrinsics are submitted before waiting for any, with nonces
+        from the client's `nonce_manager`, or from a new one, so they are
+        included in as few blocks as their weight allows. Submission stops
+        at the first extrinsic the node rejects; its range, in `failed`, and
+        the ones after it, in `unsubmitted`, are paid when the payout is run
+        again. If submitting fails otherwise, the extrinsic may have reached
+        the node: its range is `unconfirmed`, and paid again when resumed
+        only if its nonce was not used.
+
+        Args:
+            payouts: The `(address, amount)` pairs to pay, amounts in
+              nanotokens. The list must be the same when resuming.
+
+        Returns:
+            A report of the run.
+
+        Raises:
+            ValueError: If the journal was written for a different list.
+        """
+        client = self._client
+        report = PayoutReport()
+        nonces = client.nonce_manager or NonceManager(client)
+        ranges = self._pending_ranges(payouts, nonces, report)
+        address = Ss58Address(self.key.ss58_address)
+
+        in_flight: list[tuple[int, int, Future[ExtrinsicReceipt]]] = []
+        for index, (start, end) in enumerate(ranges):
+            try:
+                with nonces.reserve(address) as nonce:
+                    if self.journal is not None:
+                        self.journal.submitted(start, end, nonce)
+                    future = client.submit_async(
+                        "batch_all",
+                        self._batch_params(payouts[start:end]),
+                        self.key,
+                        module="Utility",
+                        wait_for_finalization=self.wait_for_finalization,
+                        nonce=nonce,
+                    )
+            except SubstrateRequestException as e:
+                if self.journal is not None:
+                    self.journal.failed(start, end, str(e))
+                report.failed.append((start, end, str(e)))
+                report.unsubmitted.extend(ranges[index + 1 :])
+                break
+            except Exception:
+                # it may have reached the node, the journal keeps it
+                # unresolved, settled by its nonce when resumed
+                report.unconfirmed.append((start, end))
+                report.unsubmitted.extend(ranges[index + 1 :])
+                break
+            nonces.watch(address, future)
+            in_flight.append((start, end, future))
+
+        for start, end, future in in_flight:
+            try:
+                receipt = future.result()
+            except NetworkError:
+                # it may still be included, the journal keeps it unresolved
+                report.unconfirmed.append((start, end))
+                continue
+            if receipt.is_success:
+                if self.journal is not None:
+                    self.journal.included(start, end, receipt)
+                report.paid += end - start
+                report.receipts.append(receipt)
+            else:
+                error = str(receipt.error_message)  # type: ignore
+                if self.journal is not None:
+                    self.journal.failed(start, end, error)
+                report.failed.append((start, end, error))
+        return report
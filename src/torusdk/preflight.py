@@ -0,0 +1,114 @@
+"""
+Decoding of the fee estimates and dry runs of extrinsics, made without
+submitting them by `TorusClient.estimate_fees` and `TorusClient.dry_run`.
+"""
+
+from dataclasses import dataclass
+from typing import Any, cast
+
+from scalecodec.base import ScaleBytes
+from torustrateinterface import SubstrateInterface
+
+# variants of `sp_runtime::transaction_validity::InvalidTransaction`
+INVALID_TRANSACTION = [
+    "Call",
+    "Payment",
+    "Future",
+    "Stale",
+    "BadProof",
+    "AncientBirthBlock",
+    "ExhaustsResources",
+    "Custom",
+    "BadMandatory",
+    "MandatoryValidation",
+    "BadSigner",
+]
+# variants of `sp_runtime::transaction_validity::UnknownTransaction`
+UNKNOWN_TRANSACTION = ["CannotLookup", "NoUnsignedValidator", "Custom"]
+
+
+@dataclass
+class DryRunResult:
+    """
+    Outcome of dry running an extrinsic on the state of the best block.
+
+    Attributes:
+        valid: Whether the extrinsic would be accepted into a block.
+        success: Whether its call would dispatch without an error.
+        error: Why it would be rejected or fail, in the format of
+          `ExtrinsicReceipt.error_message`, or None.
+    """
+
+    valid: bool
+    success: bool
+    error: dict[str, Any] | None = None
+
+
+def normalize_payment_info(info: dict[str, Any]) -> dict[str, Any]:
+    """
+    Converts a `payment_queryInfo` result to the format of
+    `SubstrateInterface.get_payment_info`.
+    """
+    info["partialFee"] = int(info["partialFee"])
+    if isinstance(info["weight"], int):
+        info["weight"] = {"ref_time": info["weight"], "proof_size": 0}
+    return info
+
+
+def _dispatch_error(
+    substrate: SubstrateInterface, data: bytes
+) -> dict[str, Any]:
+    scale_object = substrate.runtime_config.create_scale_object(  # type: ignore
+        "sp_runtime::DispatchError",
+        data=ScaleBytes(data),
+        metadata=substrate.metadata,  # type: ignore
+    )
+    decoded = cast(dict[str, Any] | str, scale_object.decode())  # type: ignore
+    if isinstance(decoded, str):
+        return {"type": "System", "name": decoded, "docs": decoded}
+    error = decoded
+    if "Module" not in error:
+        name = next(iter(error))
+        return {"type": "System", "name": name, "docs": str(error)}
+    module: dict[str, Any] = error["Module"]
+    raw_index: int | str = module["error"]
+    # the error index is the first byte of `[u8; 4]`
+    error_index = (
+        int(raw_index[2:4], 16) if isinstance(raw_index, str) else raw_index
+    )
+    module_error = substrate.metadata.get_module_error(  # type: ignore
+        module_index=module["index"], error_index=error_index
+    )
+    return {
+        "type": "Module",
+        "name": module_error.name,  # type: ignore
+        "docs": module_error.docs,  # type: ignore
+    }
+
+
+def _validity_error(data: bytes) -> dict[str, Any]:
+    kind, variant = data[0], data[1]
+    names = INVALID_TRANSACTION if kind == 0 else UNKNOWN_TRANSACTION
+    name = names[variant] if variant < len(names) else str(variant)
+    if name == "Custom" and len(data) > 2:
+        name = f"Custom({data[2]})"
+    return {
+        "type": "Invalid" if kind == 0 else "Unknown",
+        "name": name,
+        "docs": "The transaction would not be included in a block",
+    }
+
+
+def decode_apply_result(
+    substrate: SubstrateInterface, result: str
+) -> DryRunResult:
+    """
+    Decodes the `ApplyExtrinsicResult` returned by `system_dryRun`, a
+    `Result<Result<(), DispatchError>, TransactionValidityError>`.
+    """
+    data = bytes.fromhex(result.removeprefix("0x"))
+    if data[0] == 1:
+        return DryRunResult(False, False, _validity_error(data[1:]))
+    if data[1] == 1:
+        return DryRunResult(True, False, _dispatch_error(substrate, data[2:]))
+    return DryRunResult(True, True)
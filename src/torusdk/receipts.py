@@ -0,0 +1,252 @@
+"""
+Receipts sharing the events of their blocks.
+
+An `ExtrinsicReceipt` fetches and decodes all the events of its block the
+first time `is_success` is read, and the body of the block when its index
+isn't known. With many extrinsics in the same block, the same events are
+decoded once per extrinsic. The receipts of a `ReceiptManager` instead
+share a cache by block hash: the events of a block are fetched and decoded
+once, the events of many blocks can be fetched in a single batch, and each
+receipt only looks at its own extrinsic's events.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Iterable
+
+from scalecodec.base import ScaleBytes
+from torustrateinterface import ExtrinsicReceipt, SubstrateInterface
+from torustrateinterface.storage import StorageKey
+
+from torusdk.errors import NetworkQueryError
+from torusdk.tracker import extrinsic_hash
+
+if TYPE_CHECKING:
+    from torusdk.client import TorusClient
+
+# blocks whose events are kept decoded
+DEFAULT_MAX_BLOCKS = 64
+
+
+class _Block:
+    """What is known of one block, filled in as receipts need it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fetched = False
+        self.raw_events: str | None = None
+        self.events: dict[int | None, list[Any]] | None = None
+        self.indices: dict[str, int] | None = None
+
+
+class LazyReceipt(ExtrinsicReceipt):
+    """
+    An `ExtrinsicReceipt` whose events and index come from the cache of its
+    `ReceiptManager`.
+    """
+
+    def __init__(
+        self,
+        manager: "ReceiptManager",
+        substrate: SubstrateInterface,
+        extrinsic_hash: str | None = None,
+        block_hash: str | None = None,
+        block_number: int | None = None,
+        extrinsic_idx: int | None = None,
+        finalized: bool | None = None,
+    ):
+        super().__init__(  # type: ignore
+            substrate=substrate,
+            extrinsic_hash=extrinsic_hash,  # type: ignore
+            block_hash=block_hash,  # type: ignore
+            block_number=block_number,  # type: ignore
+            extrinsic_idx=extrinsic_idx,  # type: ignore
+            finalized=finalized,
+        )
+        self._manager = manager
+        self._index = extrinsic_idx
+        self._events: list[Any] | None = None
+
+    @property
+    def extrinsic_idx(self) -> int:
+        if self._index is None:
+            assert self.block_hash is not None and self.extrinsic_hash
+            self._index = self._manager.extrinsic_index(
+                self.block_hash, self.extrinsic_hash
+            )
+        return self._index
+
+    @property
+    def triggered_events(self) -> list[Any]:
+        if self._events is None:
+            if not self.block_hash:
+                raise ValueError(
+                    "The receipt has no block hash, its events are unknown"
+                )
+            self._events = self._manager.events(
+                self.substrate, self.block_hash, self.extrinsic_idx
+            )
+        return self._events
+
+
+class ReceiptManager:
+    """
+    Creates receipts sharing a bounded cache of block events and extrinsic
+    indices, keyed by block hash.
+    """
+
+    def __init__(
+        self, client: "TorusClient", max_blocks: int = DEFAULT_MAX_BLOCKS
+    ):
+        self._client = client
+        self.max_blocks = max_blocks
+        self._lock = threading.Lock()
+        self._blocks: OrderedDict[str, _Block] = OrderedDict()
+        # the `System.Events` storage key and value type, by spec version
+        self._events_key: tuple[Any, str, str] | None = None
+
+    def _block(self, block_hash: str) -> _Block:
+        with self._lock:
+            block = self._blocks.get(block_hash)
+            if block is None:
+                block = self._blocks[block_hash] = _Block()
+                while len(self._blocks) > self.max_blocks:
+                    self._blocks.popitem(last=False)
+            else:
+                self._blocks.move_to_end(block_hash)
+            return block
+
+    def _storage_key(self, substrate: SubstrateInterface) -> tuple[str, str]:
+        version: Any = substrate.runtime_version  # type: ignore
+        cached = self._events_key
+        if cached is not None and cached[0] == version:
+            return cached[1], cached[2]
+        key = StorageKey.create_from_storage_function(  # type: ignore
+            "System",
+            "Events",
+            [],
+            runtime_config=substrate.runtime_config,  # type: ignore
+            metadata=substrate.metadata,  # type: ignore
+        )
+        key_hex: str = key.to_hex()  # type: ignore
+        value_type = str(key.value_scale_type)  # type: ignore
+        self._events_key = (version, key_hex, value_type)
+        return key_hex, value_type
+
+    def prefetch(self, block_hashes: Iterable[str]):
+        """
+        Fetches the events of the blocks not fetched yet, in one batch.
+        They are decoded when a receipt of the block first needs them.
+        """
+        missing = [
+            block_hash
+            for block_hash in dict.fromkeys(block_hashes)
+            if not self._block(block_hash).fetched
+        ]
+        if not missing:
+            return
+        with self._client.get_conn(init=True) as substrate:
+            key_hex, _ = self._storage_key(substrate)
+        messages = self._client.rpc_batch_messages(
+            [("state_getStorage", [key_hex, h]) for h in missing]
+        )
+        for block_hash, message in zip(missing, messages):
+            if "error" in message:
+                raise NetworkQueryError(message["error"])
+            block = self._block(block_hash)
+            with block.lock:
+                if not block.fetched:
+                    block.raw_events = message["result"]
+                    block.fetched = True
+
+    def events(
+        self,
+        substrate: SubstrateInterface,
+        block_hash: str,
+        extrinsic_idx: int | None,
+    ) -> list[Any]:
+        """
+        The events of an extrinsic, decoding the events of its block the
+        first time any of its extrinsics asks.
+        """
+        block = self._block(block_hash)
+        if not block.fetched:
+            self.prefetch([block_hash])
+        with block.lock:
+            if block.events is None:
+                _, value_type = self._storage_key(substrate)
+                grouped: dict[int | None, list[Any]] = {}
+                if block.raw_events is not None:
+                    decoded = substrate.runtime_config.create_scale_object(  # type: ignore
+                        type_string=value_type,
+                        data=ScaleBytes(block.raw_events),
+                        metadata=substrate.metadata,  # type: ignore
+                    )
+                    decoded.decode()  # type: ignore
+                    for event in decoded.elements:  # type: ignore
+                        grouped.setdefault(event.extrinsic_idx, []).append(  # type: ignore
+                            event
+                        )
+                block.events = grouped
+                block.raw_events = None
+            return list(block.events.get(extrinsic_idx, []))
+
+    def extrinsic_index(self, block_hash: str, hash: str) -> int:
+        """
+        The index of an extrinsic in its block, hashing the block body
+        once for all of its receipts.
+        """
+        block = self._block(block_hash)
+        with block.lock:
+            if block.indices is None:
+                [[message]] = self._client._rpc_request_batch(  # type: ignore
+                    [("chain_getBlock", [block_hash])], extract_result=False
+                )
+                if "error" in message or message["result"] is None:  # type: ignore
+                    raise NetworkQueryError(f"Block {block_hash} not found")
+                extrinsics: list[str] = message["result"]["block"]["extrinsics"]  # type: ignore
+                block.indices = {
+                    extrinsic_hash(data): idx
+                    for idx, data in enumerate(extrinsics)
+                }
+            indices = block.indices
+        index = indices.get(hash)
+        if index is None:
+            raise NetworkQueryError(
+                f"Extrinsic {hash} not found in block {block_hash}"
+            )
+        return index
+
+    def receipt(
+        self,
+        substrate: SubstrateInterface,
+        extrinsic_hash: str,
+        block_hash: str,
+        block_number: int | None = None,
+        extrinsic_idx: int | None = None,
+        finalized: bool | None = None,
+    ) -> LazyReceipt:
+        return LazyReceipt(
+            self,
+            substrate,
+            extrinsic_hash=extrinsic_hash,
+            block_hash=block_hash,
+            block_number=block_number,
+            extrinsic_idx=extrinsic_idx,
+            finalized=finalized,
+        )
+
+    def wrap(self, receipt: ExtrinsicReceipt) -> ExtrinsicReceipt:
+        """
+        Makes a receipt returned by `submit_extrinsic` use the cache. A
+        receipt without a block, not waited for, is returned as is.
+        """
+        if not receipt.block_hash or not receipt.extrinsic_hash:
+            return receipt
+        return self.receipt(
+            receipt.substrate,
+            receipt.extrinsic_hash,
+            receipt.block_hash,
+            getattr(receipt, "block_number", None),
+            finalized=receipt.finalized,  # type: ignore
+        )
@@ -0,0 +1,287 @@
+"""
+Compact in-memory snapshots of the accounts and stakes of the chain.
+
+The decoded `StakingTo`, `StakedBy`, `Agents` and `Account` maps repeat the
+same SS58 address in every entry of an account, each a separate string.
+Here every account is interned once in an `AccountTable`, as its 32-byte
+public key with a dense integer id, and the stake maps are stored as arrays
+of ids and amounts: an entry costs 32 bytes instead of two address strings,
+a tuple and a Python integer.
+
+Example:
+```py
+snapshot = load_snapshot(client)
+stake = snapshot.staked_by.total_of("5GrwvaEF5zXb26Fz9rcQpDWS57CtERHpNehXCPcNoHGKutQY")
+```
+"""
+
+from array import array
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, Mapping
+
+from torusdk.client import TorusClient
+from torusdk.ss58 import AccountId, ss58_decode
+from torusdk.types.types import Agent, Ss58Address
+
+_U64_MASK = (1 << 64) - 1
+
+
+def _append_u128(values: "array[int]", value: int):
+    # balances are u128, stored as two u64 halves
+    values.append(value & _U64_MASK)
+    values.append(value >> 64)
+
+
+def _u128_at(values: "array[int]", index: int) -> int:
+    return values[2 * index] | values[2 * index + 1] << 64
+
+
+class AccountTable:
+    """
+    Interns accounts, mapping each to a dense integer id, from 0 in the
+    order they were added.
+
+    Accounts are given either as SS58 addresses or as public keys, like
+    the `AccountId` keys of `query_batch_map(..., raw_accounts=True)`, and
+    looked up in constant time by either or by id.
+    """
+
+    def __init__(self, accounts: Iterable[str | bytes] = ()):
+        self._accounts: list[AccountId] = []
+        self._ids: dict[bytes, int] = {}
+        for account in accounts:
+            self.intern(account)
+
+    @staticmethod
+    def _public_key(account: str | bytes) -> bytes:
+        if isinstance(account, str):
+            return ss58_decode(account)
+        if len(account) != 32:
+            raise ValueError(f"Public keys have 32 bytes, not {len(account)}")
+        return account
+
+    def intern(self, account: str | bytes) -> int:
+        """
+        The id of an account, adding it to the table if new.
+
+        Raises:
+            ValueError: If the account is not a valid address or public key.
+        """
+        public_key = self._public_key(account)
+        account_id = self._ids.get(public_key)
+        if account_id is None:
+            account_id = self._ids[public_key] = len(self._accounts)
+            self._accounts.append(
+                public_key
+                if isinstance(public_key, AccountId)
+                else AccountId(public_key)
+            )
+        return account_id
+
+    def id_of(self, account: str | bytes) -> int:
+        """
+        The id of an account of the table.
+
+        Raises:
+            KeyError: If the account is not in the table.
+            ValueError: If the account is not a valid address or public key.
+        """
+        return self._ids[self._public_key(account)]
+
+    def get_id(self, account: str | bytes) -> int | None:
+        """The id of an account, None if not in the table."""
+        return self._ids.get(self._public_key(account))
+
+    def resolve(self, account: str | bytes | int) -> int | None:
+        """The id of an account or id of the table, None if not in it."""
+        if isinstance(account, int):
+            return account if 0 <= account < len(self._accounts) else None
+        return self.get_id(account)
+
+    def address(self, account_id: int) -> Ss58Address:
+        """The SS58 address of the account with an id."""
+        return self._accounts[account_id].ss58
+
+    def __getitem__(self, account_id: int) -> AccountId:
+        return self._accounts[account_id]
+
+    def __contains__(self, account: object) -> bool:
+        if not isinstance(account, (str, bytes)):
+            return False
+        try:
+            return self.get_id(account) is not None
+        except ValueError:
+            return False
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+    def __iter__(self) -> Iterator[AccountId]:
+        return iter(self._accounts)
+
+
+class StakeTable:
+    """
+    A stake double map, like `StakingTo` or `StakedBy`, as arrays of account
+    ids and amounts grouped by the first account of each entry.
+
+    Lookups of the stakes of an account take constant time.
+    """
+
+    def __init__(
+        self,
+        accounts: AccountTable,
+        stake_storage: Mapping[tuple[str | bytes, str | bytes], int],
+    ):
+        """
+        Args:
+            accounts: The table interning the accounts of the map.
+            stake_storage: The decoded map, keyed by pairs of addresses or
+              public keys.
+        """
+        self.accounts = accounts
+        entries = sorted(
+            (accounts.intern(owner), accounts.intern(target), amount)
+            for (owner, target), amount in stake_storage.items()
+        )
+        # rows of an owner: _targets[_starts[row]:_starts[row + 1]]
+        self._rows: dict[int, int] = {}
+        self._starts = array("Q", [0])
+        self._targets = array("I")
+        self._amounts = array("Q")
+        for owner, target, amount in entries:
+            if owner not in self._rows:
+                if self._rows:
+                    self._starts.append(len(self._targets))
+                self._rows[owner] = len(self._rows)
+            self._targets.append(target)
+            _append_u128(self._amounts, amount)
+        if self._rows:
+            self._starts.append(len(self._targets))
+
+    def _span(self, account: str | bytes | int) -> range:
+        account_id = self.accounts.resolve(account)
+        row = self._rows.get(account_id) if account_id is not None else None
+        if row is None:
+            return range(0)
+        return range(self._starts[row], self._starts[row + 1])
+
+    def ids_of(self, account: str | bytes | int) -> Iterator[tuple[int, int]]:
+        """
+        The stakes of an account, as ids of the other accounts and amounts.
+
+        Args:
+            account: An address, public key or id of the account table.
+        """
+        for index in self._span(account):
+            yield self._targets[index], _u128_at(self._amounts, index)
+
+    def stakes_of(
+        self, account: str | bytes | int
+    ) -> list[tuple[Ss58Address, int]]:
+        """
+        The stakes of an account, as addresses of the other accounts and
+        amounts, like an entry of `transform_stake_dmap`.
+        """
+        return [
+            (self.accounts.address(target), amount)
+            for target, amount in self.ids_of(account)
+        ]
+
+    def total_of(self, account: str | bytes | int) -> int:
+        """The sum of the stakes of an account, 0 if it has none."""
+        return sum(amount for _, amount in self.ids_of(account))
+
+    def owners(self) -> Iterator[int]:
+        """The ids of the accounts with stakes."""
+        return iter(self._rows)
+
+    def to_dict(self) -> dict[Ss58Address, list[tuple[Ss58Address, int]]]:
+        """The map in the format of `transform_stake_dmap`."""
+        return {
+            self.accounts.address(owner): self.stakes_of(owner)
+            for owner in self._rows
+        }
+
+    def __len__(self) -> int:
+        return len(self._targets)
+
+
+@dataclass
+class ChainSnapshot:
+    """
+    The agents, stakes and balances of the chain at a block, sharing an
+    `AccountTable`.
+
+    Attributes:
+        accounts: The table of every account of the snapshot.
+        agents: The agents, by account id.
+        staking_to: The `StakingTo` map, stakes by staker.
+        staked_by: The `StakedBy` map, stakes by agent.
+        balances: Free balances as u128 halves by account id, see
+          `balance_of`. Empty if balances were not loaded.
+    """
+
+    accounts: AccountTable
+    agents: dict[int, Agent]
+    staking_to: StakeTable
+    staked_by: StakeTable
+    balances: "array[int]"
+
+    def balance_of(self, account: str | bytes | int) -> int:
+        """The free balance of an account, 0 if it has none."""
+        account_id = self.accounts.resolve(account)
+        if account_id is None or 2 * account_id >= len(self.balances):
+            return 0
+        return _u128_at(self.balances, account_id)
+
+    def agent(self, account: str | bytes | int) -> Agent | None:
+        """The agent of an account, None if it is not registered."""
+        account_id = self.accounts.resolve(account)
+        return self.agents.get(account_id) if account_id is not None else None
+
+
+def load_snapshot(
+    client: TorusClient,
+    include_balances: bool = True,
+    block_hash: str | None = None,
+) -> ChainSnapshot:
+    """
+    Queries the agents, stakes and balances of the chain in one batch, and
+    interns their accounts.
+
+    The maps are decoded with raw accounts, so no address is encoded while
+    loading.
+
+    Args:
+        client: The client to query with.
+        include_balances: Also load the `System.Account` map, which has an
+          entry per account of the chain.
+        block_hash: The block to query at, the latest if omitted.
+    """
+    request: dict[str, list[tuple[str, list[Any]]]] = {
+        "Torus0": [("Agents", []), ("StakingTo", []), ("StakedBy", [])],
+    }
+    if include_balances:
+        request["System"] = [("Account", [])]
+    result = client.query_batch_map(request, block_hash, raw_accounts=True)
+
+    accounts = AccountTable()
+    agents: dict[int, Agent] = {}
+    for key, agent in result.get("Agents", {}).items():
+        account_id = accounts.intern(key)
+        agents[account_id] = Agent.model_validate(
+            {**agent, "key": accounts.address(account_id)}
+        )
+    staking_to = StakeTable(accounts, result.get("StakingTo", {}))
+    staked_by = StakeTable(accounts, result.get("StakedBy", {}))
+
+    account_map: dict[AccountId, Any] = result.get("Account", {})
+    for key in account_map:
+        accounts.intern(key)
+    balances = array("Q")
+    if include_balances:
+        for account in accounts:
+            info = account_map.get(account)
+            _append_u128(balances, info["data"]["free"] if info else 0)
+    return ChainSnapshot(accounts, agents, staking_to, staked_by, balances)
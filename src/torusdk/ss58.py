@@ -0,0 +1,189 @@
+"""
+SS58 address encoding and validation for many addresses at once.
+
+Encoding an address hashes the public key with Blake2b for the checksum
+and converts it to base 58; validating one decodes it and hashes it again.
+The same few addresses are encoded and validated over and over, so both
+are cached here, and `ss58_encode_many` encodes lists of public keys
+sharing the hashing state of the prefix and a faster base 58 conversion.
+"""
+
+from functools import lru_cache
+from hashlib import blake2b
+from typing import Iterable
+
+from scalecodec.utils.ss58 import is_valid_ss58_address as _is_valid
+from scalecodec.utils.ss58 import ss58_decode as _ss58_decode
+
+from torusdk._common import SS58_FORMAT
+from torusdk.types.types import Ss58Address
+
+# addresses kept encoded, decoded and validated
+SS58_CACHE_SIZE = 65536
+
+_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+# every pair of base 58 digits, to convert two digits per division
+_PAIRS = [a + b for a in _ALPHABET for b in _ALPHABET]
+_PAIR_BASE = len(_PAIRS)
+
+
+def _b58encode(raw: bytes) -> str:
+    value = int.from_bytes(raw, "big")
+    pairs: list[str] = []
+    while value:
+        value, digits = divmod(value, _PAIR_BASE)
+        pairs.append(_PAIRS[digits])
+    # the first pair may start with a zero digit
+    encoded = "".join(reversed(pairs)).lstrip("1")
+    zeros = len(raw) - len(raw.lstrip(b"\0"))
+    return "1" * zeros + encoded
+
+
+def _format_bytes(ss58_format: int) -> bytes:
+    if ss58_format < 0 or ss58_format > 16383 or ss58_format in (46, 47):
+        raise ValueError(f"Invalid SS58 format {ss58_format}")
+    if ss58_format < 64:
+        return bytes([ss58_format])
+    return bytes(
+        [
+            ((ss58_format & 0b0000_0000_1111_1100) >> 2) | 0b0100_0000,
+            (ss58_format >> 8) | ((ss58_format & 0b0000_0000_0000_0011) << 6),
+        ]
+    )
+
+
+def _public_key_bytes(public_key: bytes | str) -> bytes:
+    if isinstance(public_key, str):
+        public_key = bytes.fromhex(public_key.removeprefix("0x"))
+    if len(public_key) != 32:
+        raise ValueError(f"Public keys have 32 bytes, not {len(public_key)}")
+    return public_key
+
+
+def ss58_encode_many(
+    public_keys: Iterable[bytes | str], ss58_format: int = SS58_FORMAT
+) -> list[Ss58Address]:
+    """
+    Encodes many 32-byte public keys as SS58 addresses, each distinct key
+    once.
+
+    Args:
+        public_keys: The public keys, as bytes or hex.
+        ss58_format: The SS58 format of the addresses.
+
+    Returns:
+        The addresses, in order.
+
+    Raises:
+        ValueError: If a public key doesn't have 32 bytes.
+    """
+    prefix = _format_bytes(ss58_format)
+    hasher = blake2b(b"SS58PRE" + prefix)
+    encoded: dict[bytes, Ss58Address] = {}
+    addresses: list[Ss58Address] = []
+    for public_key in public_keys:
+        key = _public_key_bytes(public_key)
+        address = encoded.get(key)
+        if address is None:
+            checksum = hasher.copy()
+            checksum.update(key)
+            address = encoded[key] = Ss58Address(
+                _b58encode(prefix + key + checksum.digest()[:2])
+            )
+        addresses.append(address)
+    return addresses
+
+
+@lru_cache(maxsize=SS58_CACHE_SIZE)
+def _encode(public_key: bytes, ss58_format: int) -> Ss58Address:
+    [address] = ss58_encode_many([public_key], ss58_format)
+    return address
+
+
+def ss58_encode(
+    public_key: bytes | str, ss58_format: int = SS58_FORMAT
+) -> Ss58Address:
+    """
+    Encodes a 32-byte public key as an SS58 address, cached.
+
+    Raises:
+        ValueError: If the public key doesn't have 32 bytes.
+    """
+    return _encode(_public_key_bytes(public_key), ss58_format)
+
+
+@lru_cache(maxsize=SS58_CACHE_SIZE)
+def ss58_decode(address: str, ss58_format: int | None = None) -> bytes:
+    """
+    The public key of an SS58 address, cached.
+
+    Raises:
+        ValueError: If the address is invalid, or not of `ss58_format`.
+    """
+    return bytes.fromhex(
+        _ss58_decode(address, valid_ss58_format=ss58_format)  # type: ignore
+    )
+
+
+@lru_cache(maxsize=SS58_CACHE_SIZE)
+def is_valid_ss58(address: str, ss58_format: int = SS58_FORMAT) -> bool:
+    """Whether a string is a valid SS58 address of a format, cached."""
+    return _is_valid(address, valid_ss58_format=ss58_format)  # type: ignore
+
+
+def check_ss58_addresses(
+    addresses: Iterable[str],
+    ss58_format: int = SS58_FORMAT,
+    trusted: bool = False,
+) -> list[Ss58Address]:
+    """
+    Validates many SS58 addresses.
+
+    Args:
+        addresses: The strings to validate.
+        ss58_format: The SS58 format code to validate against.
+        trusted: Skip the validation, for addresses the client encoded
+          itself, like the keys of a decoded storage map.
+
+    Returns:
+        The validated addresses.
+
+    Raises:
+        AssertionError: If an address is invalid.
+    """
+    if trusted:
+        return [Ss58Address(address) for address in addresses]
+    checked: list[Ss58Address] = []
+    for address in addresses:
+        assert is_valid_ss58(address, ss58_format), (
+            f"Invalid SS58 address '{address}'"
+        )
+        checked.append(Ss58Address(address))
+    return checked
+
+
+class AccountId(bytes):
+    """
+    The 32-byte public key of an account, encoded as an SS58 address only
+    when printed.
+
+    Compares and hashes as bytes, so it is cheap to use as a dictionary
+    key, but never equals the address string of the same account.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_hex(cls, value: str) -> "AccountId":
+        return cls(bytes.fromhex(value.removeprefix("0x")))
+
+    @property
+    def ss58(self) -> Ss58Address:
+        """The SS58 address of the account, in the Torus format."""
+        return ss58_encode(self)
+
+    def __str__(self) -> str:
+        return self.ss58
+
+    def __repr__(self) -> str:
+        return f"AccountId('{self.ss58}')"
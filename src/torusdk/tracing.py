@@ -0,0 +1,205 @@
+"""
+Timeline tracing in the Chrome trace event format.
+
+Spans are recorded only while a `Tracer` is active, otherwise `span` is a
+no-op. The saved file can be opened in `chrome://tracing`, Perfetto or
+speedscope.
+
+Example:
+```py
+tracer = start_tracing()
+with span("load", key=name):
+    ...
+client = TorusClient(url, instrumentation=tracer.instrumentation)
+stop_tracing()
+tracer.save("trace.json")
+```
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Generator, ParamSpec, TypeVar
+
+from torusdk.instrumentation import (
+    ConnWaitEvent,
+    DecodeEvent,
+    Instrumentation,
+    RpcEvent,
+)
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class Tracer:
+    """
+    Collects complete (`"ph": "X"`) trace events from any thread.
+    """
+
+    def __init__(self):
+        self._start_ns = time.perf_counter_ns()
+        self._lock = threading.Lock()
+        self._events: list[dict[str, Any]] = []
+        self._threads: dict[int, str] = {}
+        self.instrumentation = TracingInstrumentation(self)
+
+    def now_us(self) -> float:
+        """Microseconds since the tracer started."""
+        return (time.perf_counter_ns() - self._start_ns) / 1_000
+
+    def add(
+        self,
+        name: str,
+        start_us: float,
+        duration_us: float,
+        category: str = "torus",
+        args: dict[str, Any] | None = None,
+    ):
+        thread = threading.current_thread()
+        event: dict[str, Any] = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round(start_us, 3),
+            "dur": round(duration_us, 3),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            if thread.ident is not None:
+                self._threads.setdefault(thread.ident, thread.name)
+
+    @property
+    def events(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return list(self._events)
+
+    def to_json(self) -> dict[str, Any]:
+        pid = os.getpid()
+        with self._lock:
+            metadata = [
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+                for tid, name in self._threads.items()
+            ]
+            events = sorted(self._events, key=lambda event: event["ts"])
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def save(self, path: str | Path):
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f)
+
+
+class TracingInstrumentation(Instrumentation):
+    """
+    Turns the events of a `TorusClient` into spans. The events are reported
+    when they end, so their spans are placed back by their duration.
+    """
+
+    def __init__(self, tracer: Tracer):
+        self._tracer = tracer
+
+    def _add_ended(
+        self, name: str, duration_s: float, category: str, **args: Any
+    ):
+        duration_us = duration_s * 1e6
+        end_us = self._tracer.now_us()
+        self._tracer.add(
+            name, end_us - duration_us, duration_us, category, args
+        )
+
+    def on_rpc(self, event: RpcEvent) -> None:
+        self._add_ended(
+            event.method,
+            event.wire_time,
+            "rpc",
+            id=event.request_id,
+            request_bytes=event.request_bytes,
+            response_bytes=event.response_bytes,
+            batch_size=event.batch_size,
+        )
+
+    def on_conn_wait(self, event: ConnWaitEvent) -> None:
+        self._add_ended("get_conn", event.wait_time, "pool")
+
+    def on_decode(self, event: DecodeEvent) -> None:
+        self._add_ended(
+            f"decode {event.storage_function}",
+            event.decode_time,
+            "decode",
+            items=event.items,
+        )
+
+
+_tracer: Tracer | None = None
+
+
+def start_tracing() -> Tracer:
+    """Starts recording spans into a new global tracer."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Tracer | None:
+    """Stops recording spans and returns the tracer that recorded them."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def active_tracer() -> Tracer | None:
+    return _tracer
+
+
+@contextmanager
+def span(
+    name: str, category: str = "torus", **args: Any
+) -> Generator[None, None, None]:
+    """
+    Records the enclosed block as a span of the active tracer, if any.
+    """
+    tracer = _tracer
+    if tracer is None:
+        yield
+        return
+    start = tracer.now_us()
+    try:
+        yield
+    finally:
+        tracer.add(name, start, tracer.now_us() - start, category, args)
+
+
+def traced(
+    name: str | None = None, category: str = "torus"
+) -> Callable[[Callable[P, R]], Callable[P, R]]:
+    """
+    Decorator recording every call of the function as a span.
+    """
+
+    def decorator(fn: Callable[P, R]) -> Callable[P, R]:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            if _tracer is None:
+                return fn(*args, **kwargs)
+            with span(span_name, category):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,361 @@
+"""
+Tracks the inclusion of many submitted extrinsics over one subscription.
+
+Watching every extrinsic with `author_submitAndWatchExtrinsic` keeps a
+pooled connection busy per transaction until its block lands. An
+`ExtrinsicTracker` instead follows the chain heads on a single dedicated
+connection, and resolves the futures of all pending extrinsics by looking
+their hashes up in the bodies of the new blocks.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any
+
+import websocket
+from torustrateinterface import ExtrinsicReceipt
+
+from torusdk.errors import NetworkError, NetworkTimeoutError
+from torusdk.transport import WebSocketLike, frame_items
+
+if TYPE_CHECKING:
+    from torusdk.client import TorusClient
+
+# seconds after which an extrinsic that wasn't included is given up on
+DEFAULT_TIMEOUT = 600
+# most blocks fetched to catch up after skipped notifications
+MAX_CATCH_UP_BLOCKS = 256
+MAX_RECONNECTS = 5
+# consecutive failed block fetches after which pending futures are failed
+MAX_BLOCK_FAILURES = 5
+
+
+def extrinsic_hash(data: str | bytes) -> str:
+    """The hash of an encoded extrinsic, as used by the node."""
+    if isinstance(data, str):
+        data = bytes.fromhex(data.removeprefix("0x"))
+    return "0x" + hashlib.blake2b(data, digest_size=32).hexdigest()
+
+
+class _Pending:
+    def __init__(self, future: Future[ExtrinsicReceipt]):
+        self.future = future
+        self.since = time.monotonic()
+
+
+class ExtrinsicTracker:
+    """
+    Resolves futures for submitted extrinsics as they are included in new,
+    or finalized, blocks.
+
+    The tracker runs a daemon thread holding its own websocket, subscribed to
+    `chain_subscribeNewHeads` or `chain_subscribeFinalizedHeads`. On every
+    new head, the bodies of the blocks since the previous one are fetched in
+    a single batch through the client pool, and the pending hashes are
+    matched against them. Receipts are created with the block and index
+    already known, so checking `is_success` only fetches the block events.
+
+    Blocks that fail to be fetched are retried with backoff on a new
+    subscription; pending futures fail only after `MAX_BLOCK_FAILURES`
+    consecutive failures, and the next `track` starts the tracker again.
+    """
+
+    def __init__(
+        self,
+        client: "TorusClient",
+        finalized: bool = False,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        """
+        Args:
+            client: The client whose pool is used to fetch blocks.
+            finalized: Resolve extrinsics once their block is finalized,
+              instead of once it is imported.
+            timeout: Seconds to wait for an extrinsic before failing its
+              future with `NetworkTimeoutError`. Checked on every new head.
+        """
+        self._client = client
+        self.finalized = finalized
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._pending: dict[str, _Pending] = {}
+        self._last_number: int | None = None
+        self._ws: WebSocketLike | None = None
+        self._thread: threading.Thread | None = None
+        self._subscribed = threading.Event()
+        self._stop = threading.Event()
+        self._error: BaseException | None = None
+        self._failed = False
+        # consecutive heads whose blocks couldn't be processed
+        self._failures = 0
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def start(self, timeout: float | None = 30):
+        """
+        Starts following the chain heads, returning once subscribed.
+        Extrinsics submitted after this returns are never missed.
+
+        Raises:
+            NetworkError: If the subscription couldn't be made in time.
+        """
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._subscribed.clear()
+                self._error = None
+                self._failed = False
+                # a dead thread may have stopped far behind the chain
+                self._last_number = None
+                self._thread = threading.Thread(
+                    target=self._run, name="extrinsic-tracker", daemon=True
+                )
+                self._thread.start()
+        if not self._subscribed.wait(timeout) or self._failed:
+            raise NetworkError(
+                f"Could not subscribe to chain heads: {self._error}"
+            )
+
+    def stop(self):
+        """Stops the tracker. Futures still pending stay unresolved."""
+        self._stop.set()
+        ws = self._ws
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def track(self, hash: str) -> Future[ExtrinsicReceipt]:
+        """
+        Returns a future resolved with the receipt of the extrinsic with
+        the given hash, once it is included.
+
+        Call it before submitting the extrinsic, so its block can't be
+        processed before the hash is known.
+        """
+        self.start()
+        future: Future[ExtrinsicReceipt] = Future()
+        with self._lock:
+            existing = self._pending.get(hash)
+            if existing is not None:
+                return existing.future
+            self._pending[hash] = _Pending(future)
+        return future
+
+    def untrack(self, hash: str, error: BaseException | None = None):
+        """
+        Stops tracking a hash, failing its future with `error` if given.
+        """
+        with self._lock:
+            pending = self._pending.pop(hash, None)
+        if pending is not None and error is not None:
+            pending.future.set_exception(error)
+
+    # ==== Background thread ====
+
+    def _subscribe(self) -> WebSocketLike:
+        method = (
+            "chain_subscribeFinalizedHeads"
+            if self.finalized
+            else "chain_subscribeNewHeads"
+        )
+        ws = self._client.open_websocket()
+        ws.send(
+            json.dumps(
+                {"jsonrpc": "2.0", "id": 1, "method": method, "params": []}
+            )
+        )
+        self._ws = ws
+        return ws
+
+    def _run(self):
+        reconnects = 0
+        self._failures = 0
+        while not self._stop.is_set():
+            try:
+                ws = self._subscribe()
+                while not self._stop.is_set():
+                    message = ws.recv()
+                    for item in frame_items(json.loads(message)):
+                        self._on_message(item)
+                    reconnects = 0
+            except (websocket.WebSocketException, OSError) as e:
+                if self._stop.is_set():
+                    return
+                reconnects += 1
+                self._error = e
+                if reconnects > MAX_RECONNECTS:
+                    self._fail(NetworkError(f"Tracker disconnected: {e}"))
+                    return
+                self._stop.wait(min(2**reconnects, 30) / 10)
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                # blocks that failed to be processed are fetched again on
+                # the first head after subscribing again
+                self._failures += 1
+                self._error = e
+                if self._failures > MAX_BLOCK_FAILURES:
+                    self._fail(e)
+                    return
+                self._close()
+                self._stop.wait(min(2**self._failures, 30) / 10)
+
+    def _close(self):
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            try:
+                ws.close()
+            except Exception:
+                pass
+
+    def _fail(self, error: BaseException):
+        """
+        Fails every pending future and ends the thread, which the next
+        `track` starts again.
+        """
+        self._failed = True
+        self._close()
+        self._fail_all(error)
+        # wakes up `start`
+        self._subscribed.set()
+
+    def _on_message(self, message: dict[str, Any]):
+        if message.get("id") == 1:
+            if "error" in message:
+                raise NetworkError(message["error"])
+            self._subscribed.set()
+            return
+        params = message.get("params")
+        if not isinstance(params, dict):
+            return
+        header: dict[str, Any] = params.get("result")  # type: ignore
+        self._on_head(int(header["number"], 16))
+
+    def _on_head(self, number: int):
+        with self._lock:
+            last = self._last_number
+            if last is not None and number <= last:
+                # a re-announced or reorged head, its height was processed
+                return
+            self._last_number = number
+            if last is None:
+                last = number - 1
+            has_pending = bool(self._pending)
+        if not has_pending:
+            return
+        # notifications may skip blocks, specially finalized ones
+        first = max(last + 1, number - MAX_CATCH_UP_BLOCKS + 1)
+        try:
+            self._process_blocks(list(range(first, number + 1)))
+        except Exception:
+            with self._lock:
+                if self._last_number == number:
+                    self._last_number = last
+            raise
+        self._failures = 0
+        self._expire()
+
+    def _process_blocks(self, numbers: list[int]):
+        client = self._client
+        block_hashes: list[str] = _results(
+            client.rpc_batch_messages(
+                [("chain_getBlockHash", [n]) for n in numbers]
+            )
+        )
+        blocks = _results(
+            client.rpc_batch_messages(
+                [("chain_getBlock", [h]) for h in block_hashes]
+            )
+        )
+
+        found: list[tuple[_Pending, str, str, int, int]] = []
+        with self._lock:
+            for number, block_hash, block in zip(numbers, block_hashes, blocks):
+                if block is None:
+                    continue
+                extrinsics = block["block"]["extrinsics"]
+                for idx, data in enumerate(extrinsics):
+                    hash = extrinsic_hash(data)
+                    pending = self._pending.pop(hash, None)
+                    if pending is not None:
+                        found.append((pending, hash, block_hash, number, idx))
+        if not found:
+            return
+        try:
+            receipts = self._receipts(found)
+        except Exception:
+            # tracked again, so the blocks are looked up again on a retry
+            with self._lock:
+                for pending, hash, _, _, _ in found:
+                    self._pending.setdefault(hash, pending)
+            raise
+        for pending, receipt in receipts:
+            pending.future.set_result(receipt)
+
+    def _receipts(
+        self, found: list[tuple[_Pending, str, str, int, int]]
+    ) -> list[tuple[_Pending, ExtrinsicReceipt]]:
+        client = self._client
+        # one batch fetches the events of all the blocks, decoded once each
+        client.receipts.prefetch(block_hash for _, _, block_hash, _, _ in found)
+        with client.get_conn() as substrate:
+            return [
+                (
+                    pending,
+                    client.receipts.receipt(
+                        substrate,
+                        hash,
+                        block_hash,
+                        block_number=number,
+                        extrinsic_idx=idx,
+                        finalized=self.finalized,
+                    ),
+                )
+                for pending, hash, block_hash, number, idx in found
+            ]
+
+    def _expire(self):
+        deadline = time.monotonic() - self.timeout
+        with self._lock:
+            expired = [
+                hash
+                for hash, pending in self._pending.items()
+                if pending.since < deadline
+            ]
+        for hash in expired:
+            self.untrack(
+                hash,
+                NetworkTimeoutError(
+                    f"Extrinsic {hash} was not included in {self.timeout}s"
+                ),
+            )
+
+    def _fail_all(self, error: BaseException):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for entry in pending.values():
+            entry.future.set_exception(error)
+
+
+def _results(messages: list[dict[str, Any]]) -> list[Any]:
+    """
+    The results of the messages of a batch.
+
+    Raises:
+        NetworkError: If a request failed.
+    """
+    for message in messages:
+        if "error" in message:
+            raise NetworkError(message["error"])
+    return [message["result"] for message in messages]
@@ -0,0 +1,412 @@
+"""
+Pluggable websocket transports for `TorusClient`.
+
+`TorusClient` creates its websockets through a factory (by default
+`websocket.WebSocket`). This module provides factories that record the
+traffic of a session into a compact file and replay it later without a
+node, which makes production-shaped workloads repeatable offline.
+
+Example:
+```py
+with TrafficRecorder("session.jsonl.gz") as recorder:
+    client = TorusClient(url, ws_factory=recorder.factory)
+    get_map_modules(client)
+
+replayer = TrafficReplayer("session.jsonl.gz", speed=None)
+client = TorusClient(url, ws_factory=replayer.factory)
+get_map_modules(client)  # same responses, no network
+```
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable, Protocol, cast
+
+import websocket
+
+from torusdk.errors import ReplayMismatchError
+
+TRAFFIC_FORMAT = "torusdk-traffic"
+TRAFFIC_VERSION = 1
+
+SEND = ">"
+RECV = "<"
+
+# methods whose payload is signed, and thus differs on every run
+SUBMIT_METHODS = ("author_submitExtrinsic", "author_submitAndWatchExtrinsic")
+# seconds an ordered replay waits for the frames of other connections
+ORDERED_REPLAY_TIMEOUT = 10.0
+
+
+class WebSocketLike(Protocol):
+    """
+    The subset of `websocket.WebSocket` used by `TorusClient` and
+    `SubstrateInterface`.
+    """
+
+    @property
+    def connected(self) -> bool: ...
+
+    def connect(self, url: str, **options: Any) -> Any: ...
+
+    def send(self, payload: str, opcode: int = ...) -> int: ...
+
+    def recv(self) -> str | bytes: ...
+
+    def pong(self, payload: str | bytes = ...) -> Any: ...
+
+    def close(self, *args: Any, **kwargs: Any) -> Any: ...
+
+
+WebSocketFactory = Callable[[], WebSocketLike]
+
+
+def default_ws_factory() -> WebSocketLike:
+    return websocket.WebSocket()  # type: ignore
+
+
+def frame_items(frame: Any) -> list[dict[str, Any]]:
+    """The messages of a single or batched JSON-RPC frame."""
+    items = cast(list[Any], frame if isinstance(frame, list) else [frame])
+    return [item for item in items if isinstance(item, dict)]
+
+
+def _frame_ids(frame: Any) -> list[Any]:
+    return [item.get("id") for item in frame_items(frame)]
+
+
+def _frame_methods(frame: Any) -> list[str | None]:
+    return [item.get("method") for item in frame_items(frame)]
+
+
+class TrafficRecorder:
+    """
+    Records every websocket frame of the connections it creates.
+
+    The output is a gzip compressed JSON lines file. The first line is a
+    header, every other line is `[connection, microseconds, direction,
+    frame]`, where the time is relative to the creation of the recorder and
+    the direction is `>` for sent and `<` for received frames.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        inner_factory: WebSocketFactory = default_ws_factory,
+    ):
+        """
+        Args:
+            path: File to write the recording to.
+            inner_factory: Creates the websockets that actually talk to the
+              node.
+        """
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self._inner_factory = inner_factory
+        self._lock = threading.Lock()
+        self._start = time.monotonic_ns()
+        self._connections = 0
+        self._write(
+            {
+                "format": TRAFFIC_FORMAT,
+                "version": TRAFFIC_VERSION,
+                "created_at": time.time(),
+            }
+        )
+
+    def _write(self, line: Any):
+        self._file.write(json.dumps(line, separators=(",", ":")))
+        self._file.write("\n")
+
+    def record(self, connection: int, direction: str, frame: str):
+        elapsed_us = (time.monotonic_ns() - self._start) // 1_000
+        with self._lock:
+            self._write([connection, elapsed_us, direction, frame])
+
+    def factory(self) -> WebSocketLike:
+        """Creates a recording websocket. Pass as `ws_factory`."""
+        with self._lock:
+            connection = self._connections
+            self._connections += 1
+        return RecordingWebSocket(self._inner_factory(), self, connection)
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ):
+        self.close()
+
+
+class RecordingWebSocket:
+    """Forwards to a real websocket while recording the frames."""
+
+    def __init__(
+        self, inner: WebSocketLike, recorder: TrafficRecorder, connection: int
+    ):
+        self._inner = inner
+        self._recorder = recorder
+        self._connection = connection
+
+    @property
+    def connected(self) -> bool:
+        return self._inner.connected
+
+    def connect(self, url: str, **options: Any) -> Any:
+        return self._inner.connect(url, **options)
+
+    def send(self, payload: str, opcode: int = 1) -> int:
+        self._recorder.record(self._connection, SEND, payload)
+        return self._inner.send(payload, opcode)
+
+    def recv(self) -> str | bytes:
+        message = self._inner.recv()
+        frame = message.decode() if isinstance(message, bytes) else message
+        self._recorder.record(self._connection, RECV, frame)
+        return message
+
+    def pong(self, payload: str | bytes = b"") -> Any:
+        return self._inner.pong(payload)
+
+    def close(self, *args: Any, **kwargs: Any) -> Any:
+        return self._inner.close(*args, **kwargs)
+
+
+# (index in the recording, elapsed microseconds, direction, frame)
+_Frame = tuple[int, int, str, str]
+
+
+class TrafficReplayer:
+    """
+    Serves a recording made by `TrafficRecorder`.
+
+    Each websocket created by `factory` replays the next recorded
+    connection, in the order the connections were opened. Sent frames are
+    checked against the recording by JSON-RPC method, and request ids are
+    remapped, so parameters that change between runs (like signatures) don't
+    break the replay. Submitted extrinsics are swapped into the recorded
+    blocks, so their receipts resolve as they did live.
+
+    Connections are replayed independently, unless `ordered`: every frame
+    then waits for the frames recorded before it on the other connections,
+    so threads using connections of their own, like the extrinsic
+    tracker's subscription next to the pool, replay in the order they ran.
+    A frame still waiting after `ORDERED_REPLAY_TIMEOUT` seconds fails the
+    replay.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        speed: float | None = None,
+        ordered: bool = False,
+    ):
+        """
+        Args:
+            path: Recording to replay.
+            speed: Time scale of the replay. `1.0` reproduces the recorded
+              response times, `2.0` halves them, and `None` answers as fast
+              as possible.
+            ordered: Replay the frames of all connections in their recorded
+              order.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("Replay speed must be positive")
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._streams: deque[list[_Frame]] = deque()
+        self._sequencer = (
+            _Sequencer(ORDERED_REPLAY_TIMEOUT) if ordered else None
+        )
+        # shared, as blocks may be fetched on another connection than the
+        # one their extrinsic was submitted on
+        self._substitutions: dict[str, str] = {}
+
+        streams: dict[int, list[_Frame]] = {}
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != TRAFFIC_FORMAT:
+                raise ValueError(f"{path} is not a torusdk traffic recording")
+            if header.get("version") != TRAFFIC_VERSION:
+                raise ValueError(
+                    f"Unsupported recording version {header.get('version')}"
+                )
+            # frames are written in the order they happened
+            for index, line in enumerate(f):
+                connection, elapsed_us, direction, frame = json.loads(line)
+                streams.setdefault(connection, []).append(
+                    (index, elapsed_us, direction, frame)
+                )
+        for connection in sorted(streams):
+            self._streams.append(streams[connection])
+
+    @property
+    def remaining_connections(self) -> int:
+        return len(self._streams)
+
+    def factory(self) -> WebSocketLike:
+        """Creates a replaying websocket. Pass as `ws_factory`."""
+        with self._lock:
+            if not self._streams:
+                raise ReplayMismatchError(
+                    "The recording has no more connections to replay"
+                )
+            stream = self._streams.popleft()
+        return ReplayWebSocket(
+            stream, self.speed, self._substitutions, self._sequencer
+        )
+
+
+class _Sequencer:
+    """Lets the frames of many connections through in recorded order."""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._next = 0
+        self._condition = threading.Condition()
+
+    def turn(self, index: int):
+        """
+        Waits until every frame recorded before `index` was replayed.
+
+        Raises:
+            ReplayMismatchError: If they weren't within the timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(
+                lambda: self._next == index, self.timeout
+            ):
+                raise ReplayMismatchError(
+                    f"Frame {self._next} of the recording was not replayed, "
+                    "another connection diverged"
+                )
+            self._next = index + 1
+            self._condition.notify_all()
+
+
+class ReplayWebSocket:
+    """Answers with the frames of one recorded connection."""
+
+    def __init__(
+        self,
+        frames: list[_Frame],
+        speed: float | None,
+        substitutions: dict[str, str] | None = None,
+        sequencer: _Sequencer | None = None,
+    ):
+        self.connected = False
+        self._frames = deque(frames)
+        self._speed = speed
+        self._ids: dict[Any, Any] = {}
+        self._substitutions = {} if substitutions is None else substitutions
+        self._sequencer = sequencer
+        self._closed = threading.Event()
+        self._last_recorded_us = frames[0][1] if frames else 0
+        self._last_live = time.monotonic()
+
+    def connect(self, url: str, **options: Any):
+        self.connected = True
+
+    def close(self, *args: Any, **kwargs: Any):
+        self.connected = False
+        # wakes up a `recv` past the end of the recording
+        self._closed.set()
+
+    def pong(self, payload: str | bytes = b""):
+        pass
+
+    def _next(self, direction: str) -> tuple[int, str]:
+        if not self._frames:
+            if self._sequencer is not None and direction == RECV:
+                # the client kept listening until it closed the connection,
+                # like a subscription idle at the end of the recording
+                self._closed.wait()
+                raise websocket.WebSocketConnectionClosedException(
+                    "socket is already closed."
+                )
+            raise ReplayMismatchError(
+                "The client sent or expected more frames than were recorded"
+            )
+        index, elapsed_us, recorded_direction, frame = self._frames.popleft()
+        if self._sequencer is not None:
+            self._sequencer.turn(index)
+        if recorded_direction != direction:
+            raise ReplayMismatchError(
+                f"Expected a {'send' if direction == SEND else 'recv'} "
+                "but the recording diverges here"
+            )
+        return elapsed_us, frame
+
+    def _advance(self, elapsed_us: int, wait: bool):
+        # only responses wait: the time before a send is client-side work,
+        # which the live client spends on its own
+        if wait and self._speed is not None:
+            target = (elapsed_us - self._last_recorded_us) / 1e6 / self._speed
+            remaining = target - (time.monotonic() - self._last_live)
+            if remaining > 0:
+                time.sleep(remaining)
+        self._last_recorded_us = elapsed_us
+        self._last_live = time.monotonic()
+
+    def _substitute_extrinsic(self, recorded: str, live: str):
+        """
+        Makes the recorded blocks and hashes refer to the extrinsic the live
+        client just signed, so receipts can find it.
+        """
+
+        def extrinsic_hash(data: str) -> str:
+            raw = bytes.fromhex(data.removeprefix("0x"))
+            return hashlib.blake2b(raw, digest_size=32).hexdigest()
+
+        self._substitutions[recorded.removeprefix("0x")] = live.removeprefix(
+            "0x"
+        )
+        self._substitutions[extrinsic_hash(recorded)] = extrinsic_hash(live)
+
+    def send(self, payload: str, opcode: int = 1) -> int:
+        if not self.connected:
+            raise websocket.WebSocketConnectionClosedException(
+                "socket is already closed."
+            )
+        elapsed_us, frame = self._next(SEND)
+        live, recorded = json.loads(payload), json.loads(frame)
+        if _frame_methods(live) != _frame_methods(recorded):
+            raise ReplayMismatchError(
+                f"Sent {_frame_methods(live)} but the recording has "
+                f"{_frame_methods(recorded)}"
+            )
+        for recorded_id, live_id in zip(_frame_ids(recorded), _frame_ids(live)):
+            self._ids[recorded_id] = live_id
+        for recorded_item, live_item in zip(
+            frame_items(recorded), frame_items(live)
+        ):
+            if recorded_item.get("method") in SUBMIT_METHODS:
+                self._substitute_extrinsic(
+                    recorded_item["params"][0], live_item["params"][0]
+                )
+        self._advance(elapsed_us, wait=False)
+        return len(payload)
+
+    def recv(self) -> str:
+        elapsed_us, frame = self._next(RECV)
+        self._advance(elapsed_us, wait=True)
+        for recorded, live in list(self._substitutions.items()):
+            frame = frame.replace(recorded, live)
+        message = json.loads(frame)
+        for item in frame_items(message):
+            if "id" in item:
+                item["id"] = self._ids.get(item["id"], item["id"])
+        return json.dumps(message)
@@ -0,0 +1,402 @@
+"""
+A rate-limited, prioritized queue of extrinsics, retrying transient
+rejections.
+
+Bursts of transactions can fill the node's pool, collide on a nonce or
+outpace what a key is allowed to send. A `TxQueue` takes calls with a
+priority, dispatches the most important first within a global and a
+per-key rate limit, submits them in JSON-RPC batches, and retries the
+rejections that can go away, like a full pool, with jittered exponential
+backoff. Before resending anything that may already have reached the node,
+it looks the extrinsic up in `author_pendingExtrinsics`, so a call is never
+submitted twice.
+
+Example:
+```py
+from keylimiter import TokenBucketLimiter
+
+limiter = TokenBucketLimiter(bucket_size=100, refill_rate=50)
+with TxQueue(client, limiter=limiter) as txs:
+    futures = [
+        txs.submit(BatchedCall("Torus0", "add_stake", params), key)
+        for params in stakes
+    ]
+    txs.submit(urgent_transfer, key, priority=10)
+receipts = [future.result() for future in futures]
+```
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import TYPE_CHECKING, Any, cast
+
+from keylimiter import KeyLimiter
+from torustrateinterface import ExtrinsicReceipt, Keypair
+from torustrateinterface.exceptions import SubstrateRequestException
+
+from torusdk.batch import BatchedCall
+from torusdk.nonce import NonceManager
+from torusdk.tracker import extrinsic_hash
+
+if TYPE_CHECKING:
+    from torusdk.client import TorusClient
+
+DEFAULT_MAX_RETRIES = 5
+# seconds of the first retry delay, doubled on every later attempt
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+# jobs queued or awaiting inclusion before `submit` blocks
+DEFAULT_MAX_IN_FLIGHT = 2000
+# most extrinsics sent in one JSON-RPC batch
+DISPATCH_BATCH_SIZE = 500
+# seconds before looking again at a throttled key or queue
+POLL_INTERVAL = 0.05
+# the key of the global limit in its `KeyLimiter`
+GLOBAL_LIMIT_KEY = "global"
+
+# transaction pool errors, see `sc_rpc_api::author::error`
+TEMPORARILY_BANNED = 1012
+ALREADY_IMPORTED = 1013
+PRIORITY_TOO_LOW = 1014
+POOL_FULL = 1016
+INVALID_TRANSACTION = 1010
+# the same extrinsic can succeed later
+RETRY_SAME = {TEMPORARILY_BANNED, POOL_FULL}
+
+
+def _is_stale(error: dict[str, Any]) -> bool:
+    return error.get("code") == INVALID_TRANSACTION and "outdated" in str(
+        error.get("data", "")
+    )
+
+
+class _Job:
+    def __init__(
+        self, call: BatchedCall, key: Keypair, priority: int, seq: int
+    ):
+        self.call = call
+        self.key = key
+        self.address: str = key.ss58_address  # type: ignore
+        self.priority = priority
+        self.seq = seq
+        self.future: Future[ExtrinsicReceipt] = Future()
+        self.attempts = 0
+        # the signed extrinsic, kept while its nonce may still be used
+        self.data: str | None = None
+        self.hash: str | None = None
+        # whether a send of `data` may have reached the node
+        self.ambiguous = False
+        self.not_before = 0.0
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (-self.priority, self.seq) < (-other.priority, other.seq)
+
+
+class TxQueue:
+    """
+    Submits calls in priority order, within rate limits, retrying the
+    rejections that are transient.
+
+    A single dispatcher thread takes the ready jobs with the highest
+    priority, signs them with nonces from the client's `nonce_manager`, or
+    its own, and sends them in one batch. Jobs of the same priority go out
+    in the order they were submitted.
+
+    Rejections are handled by their JSON-RPC error code:
+
+    - A full pool or a temporary ban resends the same extrinsic later.
+    - A nonce already taken by another extrinsic, "priority too low" or a
+      stale nonce, resyncs the signer's nonce and signs the call again.
+    - "Already imported" means an earlier send got through.
+    - Anything else fails the job's future with
+      `SubstrateRequestException`.
+
+    A network error while sending may or may not have reached the node, so
+    those extrinsics are looked up in the node's pool before being sent
+    again, and never signed again with another nonce.
+    """
+
+    def __init__(
+        self,
+        client: "TorusClient",
+        limiter: KeyLimiter | None = None,
+        key_limiter: KeyLimiter | None = None,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        wait_for_finalization: bool | None = None,
+    ):
+        """
+        Args:
+            client: The client to submit through.
+            limiter: Limits the extrinsics sent overall, counted under
+              `GLOBAL_LIMIT_KEY`.
+            key_limiter: Limits the extrinsics sent by each signer, counted
+              under its SS58 address.
+            max_in_flight: Jobs queued or awaiting inclusion before
+              `submit` blocks, keeping memory and the node's pool bounded
+              under sustained load.
+            max_retries: Retries of a job before failing it with the last
+              error.
+            backoff: Seconds of the first retry delay, doubled on every
+              attempt up to `MAX_BACKOFF`. The delay is drawn at random
+              below that bound, so retries don't come in waves.
+            wait_for_finalization: Resolve once the block is finalized,
+              instead of once it is imported.
+        """
+        if wait_for_finalization is None:
+            wait_for_finalization = client.wait_for_finalization
+        self._client = client
+        self._tracker = client.tracker(wait_for_finalization)
+        self._nonces = client.nonce_manager or NonceManager(client)
+        self.limiter = limiter
+        self.key_limiter = key_limiter
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._cond = threading.Condition()
+        self._ready: list[_Job] = []
+        self._delayed: list[tuple[float, int, _Job]] = []
+        self._seq = itertools.count()
+        self._unresolved = 0
+        self._closed = False
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_: Any):
+        self.close()
+
+    def submit(
+        self, call: BatchedCall, key: Keypair, priority: int = 0
+    ) -> Future[ExtrinsicReceipt]:
+        """
+        Queues a call, blocking while `max_in_flight` jobs are unresolved.
+
+        Args:
+            call: The call to submit.
+            key: The keypair signing it.
+            priority: Jobs with a higher priority are sent first.
+
+        Returns:
+            A future resolved with the receipt once the extrinsic is
+              included. Its `is_success` tells whether the call succeeded.
+        """
+        self._slots.acquire()
+        with self._cond:
+            if self._closed:
+                self._slots.release()
+                raise RuntimeError("The queue is closed")
+            job = _Job(call, key, priority, next(self._seq))
+            job.future.add_done_callback(self._resolved)
+            self._unresolved += 1
+            heapq.heappush(self._ready, job)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="tx-queue", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return job.future
+
+    @property
+    def unresolved(self) -> int:
+        """Jobs queued, waiting to be retried, or awaiting inclusion."""
+        with self._cond:
+            return self._unresolved
+
+    def join(self, timeout: float | None = None) -> bool:
+        """
+        Waits until every job submitted so far is resolved.
+
+        Returns:
+            Whether all were resolved before the timeout.
+        """
+        with self._cond:
+            return self._cond.wait_for(lambda: self._unresolved == 0, timeout)
+
+    def close(self, wait: bool = True):
+        """
+        Stops accepting jobs, and waits for the submitted ones if `wait`.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            self.join()
+
+    def _resolved(self, _: "Future[ExtrinsicReceipt]"):
+        self._slots.release()
+        with self._cond:
+            self._unresolved -= 1
+            self._cond.notify_all()
+
+    # ==== Dispatcher thread ====
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: (
+                        self._ready
+                        or self._delayed
+                        or (self._closed and not self._unresolved)
+                    )
+                )
+                if self._closed and not self._unresolved:
+                    return
+                batch = self._take()
+                if not batch:
+                    self._cond.wait(self._idle_time())
+                    continue
+            try:
+                self._dispatch(batch)
+            except Exception as e:
+                # signing or nonce fetching failed, not the submission
+                for job in batch:
+                    self._retry(job, e)
+
+    def _idle_time(self) -> float:
+        if self._ready or not self._delayed:
+            return POLL_INTERVAL
+        return max(self._delayed[0][0] - time.monotonic(), 0)
+
+    def _take(self) -> list[_Job]:
+        """Pops the jobs that can be sent now, within the limits."""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, _, job = heapq.heappop(self._delayed)
+            heapq.heappush(self._ready, job)
+        batch: list[_Job] = []
+        throttled: list[_Job] = []
+        while self._ready and len(batch) < DISPATCH_BATCH_SIZE:
+            limiter = self.limiter
+            if limiter and limiter.remaining(GLOBAL_LIMIT_KEY) <= 0:
+                break
+            job = heapq.heappop(self._ready)
+            key_limiter = self.key_limiter
+            if key_limiter and not key_limiter.allow(job.address):
+                throttled.append(job)
+                continue
+            if limiter:
+                limiter.allow(GLOBAL_LIMIT_KEY)
+            batch.append(job)
+        for job in throttled:
+            self._delay(job, now + POLL_INTERVAL)
+        return batch
+
+    def _delay(self, job: _Job, until: float):
+        job.not_before = until
+        heapq.heappush(self._delayed, (until, job.seq, job))
+
+    def _dispatch(self, batch: list[_Job]):
+        # an earlier send may have been included while waiting to retry
+        batch = [job for job in batch if not job.future.done()]
+        ambiguous = [job for job in batch if job.ambiguous]
+        if ambiguous:
+            in_pool = self._pending_hashes()
+            # those already reached the node, the tracker resolves them
+            batch = [job for job in batch if job.hash not in in_pool]
+        self._sign(batch)
+        if not batch:
+            return
+        try:
+            messages = self._client.rpc_batch_messages(
+                [("author_submitExtrinsic", [job.data]) for job in batch]  # type: ignore
+            )
+        except Exception as e:
+            for job in batch:
+                job.ambiguous = True
+                self._retry(job, e)
+            return
+        for job, message in zip(batch, messages):
+            if "error" in message:
+                self._rejected(job, message["error"])
+
+    def _sign(self, batch: list[_Job]):
+        unsigned = [job for job in batch if job.data is None]
+        if not unsigned:
+            return
+        self._nonces.prefetch(job.address for job in unsigned)  # type: ignore
+        with self._client.get_conn(init=True) as substrate:
+            for job in unsigned:
+                nonce = self._nonces.next(job.address)  # type: ignore
+                [data] = self._client._encode_calls(  # type: ignore
+                    substrate, [job.call], job.key, nonce
+                )
+                job.data = data
+                job.hash = extrinsic_hash(data)
+                job.ambiguous = False
+                # tracked first, so the block can't be missed
+                receipt = self._tracker.track(job.hash)
+                receipt.add_done_callback(partial(_forward, target=job.future))
+
+    def _rejected(self, job: _Job, error: dict[str, Any]):
+        code = error.get("code")
+        if code == ALREADY_IMPORTED:
+            return
+        if code in RETRY_SAME:
+            self._retry(job, SubstrateRequestException(error))
+        elif code == PRIORITY_TOO_LOW or _is_stale(error):
+            if job.ambiguous and code != PRIORITY_TOO_LOW:
+                # the earlier send was included, the tracker resolves it
+                return
+            # the nonce is taken, sign again with a fresh one
+            self._drop_signature(job)
+            self._nonces.resync(job.address)  # type: ignore
+            self._retry(job, SubstrateRequestException(error))
+        else:
+            # no copy of the extrinsic can be included either
+            job.ambiguous = False
+            self._fail(job, SubstrateRequestException(error))
+
+    def _drop_signature(self, job: _Job):
+        if job.hash is not None:
+            self._tracker.untrack(job.hash)
+        job.data = job.hash = None
+        job.ambiguous = False
+
+    def _retry(self, job: _Job, error: BaseException):
+        job.attempts += 1
+        if job.attempts > self.max_retries:
+            self._fail(job, error)
+            return
+        bound = min(self.backoff * 2 ** (job.attempts - 1), MAX_BACKOFF)
+        with self._cond:
+            self._delay(job, time.monotonic() + random.uniform(0, bound))
+            self._cond.notify()
+
+    def _fail(self, job: _Job, error: BaseException):
+        if job.ambiguous:
+            # an earlier send may still be included, keep waiting for it
+            return
+        self._drop_signature(job)
+        if not job.future.done():
+            job.future.set_exception(error)
+        # the nonce of the failed extrinsic was not used
+        self._nonces.resync(job.address)  # type: ignore
+
+    def _pending_hashes(self) -> set[str]:
+        [[message]] = self._client._rpc_request_batch(  # type: ignore
+            [("author_pendingExtrinsics", [])], extract_result=False
+        )
+        pending = cast(list[str], message.get("result") or [])  # type: ignore
+        return {extrinsic_hash(data) for data in pending}
+
+
+def _forward(
+    source: "Future[ExtrinsicReceipt]", target: "Future[ExtrinsicReceipt]"
+):
+    if target.done():
+        return
+    error = source.exception()
+    if error is not None:
+        target.set_exception(error)
+    else:
+        target.set_result(source.result())
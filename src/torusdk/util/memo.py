@@ -2,7 +2,7 @@ import time
 from collections import OrderedDict
 from collections.abc import MutableMapping
 from threading import Lock
-from typing import Callable, Generic, Iterator, TypeVar
+from typing import Any, Callable, Generic, Iterator, NoReturn, TypeVar
 
 K = TypeVar("K")
 V = TypeVar("V")
@@ -107,6 +107,108 @@ class TTLDict(Generic[K, V], MutableMapping[K, V]):
             return self[key]
 
 
+class LRUMemo(Generic[K, V]):
+    """
+    A memo of at most `maxsize` values, evicting the least recently used
+    one, that counts its hits and misses.
+    """
+
+    maxsize: int
+    hits: int
+    misses: int
+    _values: OrderedDict[K, V]
+    _lock: Lock
+
+    def __init__(self, maxsize: int):
+        """
+        Args:
+            maxsize: The number of values kept.
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"<LRUMemo@{id(self):#08x} size={len(self)}/{self.maxsize} "
+            f"hit_rate={self.hit_rate:.2%}>"
+        )
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    @property
+    def hit_rate(self) -> float:
+        """The share of lookups found in the memo, 0 before any lookup."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_or_insert_lazy(self, key: K, fn: Callable[[], V]) -> V:
+        """
+        Gets the value for the given key, or inserts the value returned by the
+        given function if the key is not present, returning it. `fn` runs
+        outside of the lock, so concurrent misses may both call it.
+        """
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                self._values.move_to_end(key)
+                return self._values[key]
+            self.misses += 1
+        value = fn()
+        with self._lock:
+            self._values[key] = value
+            if len(self._values) > self.maxsize:
+                self._values.popitem(last=False)
+        return value
+
+
+class FrozenDict(dict[K, V]):
+    """
+    A dictionary that can't be modified, so that it can be shared.
+
+    It is still a `dict` for `isinstance` checks, serialization and
+    validation; `copy()` returns a regular, mutable one.
+    """
+
+    __slots__ = ()
+
+    def _immutable(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError("FrozenDict can't be modified")
+
+    __setitem__ = _immutable  # type: ignore
+    __delitem__ = _immutable  # type: ignore
+    __ior__ = _immutable  # type: ignore
+    clear = _immutable  # type: ignore
+    pop = _immutable  # type: ignore
+    popitem = _immutable  # type: ignore
+    setdefault = _immutable  # type: ignore
+    update = _immutable  # type: ignore
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """
+    An immutable copy of a decoded value: dictionaries become
+    `FrozenDict`s and lists tuples, recursively.
+    """
+    if isinstance(value, dict):
+        return FrozenDict({k: freeze(v) for k, v in value.items()})  # type: ignore
+    if isinstance(value, list):
+        return tuple(freeze(v) for v in value)  # type: ignore
+    return value
+
+
 def __test():
     m: TTLDict[str, int] = TTLDict(1)
 
@@ -0,0 +1,241 @@
+"""
+Search for keys whose SS58 address has a given prefix or suffix.
+
+Each worker process draws random 32-byte seeds and derives the sr25519
+public key and address of each, skipping mnemonics: a mnemonic would cost a
+PBKDF2 derivation per attempt. The winning key is created from its seed,
+so it has no mnemonic, and must be backed up from its stored record.
+"""
+
+import math
+import multiprocessing
+import multiprocessing.synchronize
+import os
+import time
+from dataclasses import dataclass
+from queue import Empty
+from typing import Any, Callable
+
+import sr25519  # type: ignore
+from scalecodec.utils.ss58 import ss58_encode
+from torustrateinterface import Keypair
+
+from torusdk._common import SS58_FORMAT
+from torusdk.faucet.powv2 import GenericQueue, get_cpu_count
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+# attempts of a worker between updates of the shared counter
+ATTEMPTS_PER_UPDATE = 2000
+# seconds between progress reports
+REPORT_INTERVAL = 0.5
+
+
+def _base58_value(text: str) -> int:
+    value = 0
+    for char in text:
+        value = value * len(BASE58_ALPHABET) + BASE58_ALPHABET.index(char)
+    return value
+
+
+def _case_variants(text: str) -> set[str]:
+    variants = {""}
+    for char in text:
+        cases = {
+            c for c in (char.lower(), char.upper()) if c in BASE58_ALPHABET
+        }
+        variants = {v + c for v in variants for c in cases or {char}}
+    return variants
+
+
+@dataclass(frozen=True)
+class VanityPattern:
+    """
+    What a vanity address must look like.
+
+    Addresses of a network don't start with any characters: their first
+    one or two are fixed by the network's SS58 format, and `5C` to `5H` for
+    Torus. A prefix no address can have is refused.
+
+    Attributes:
+        prefix: Characters starting the address.
+        suffix: Characters ending the address.
+        ignore_case: Match letters in either case.
+        ss58_format: The SS58 format of the addresses.
+
+    Raises:
+        ValueError: If the pattern has characters not in SS58 addresses,
+          or no address can start with the prefix.
+    """
+
+    prefix: str = ""
+    suffix: str = ""
+    ignore_case: bool = False
+    ss58_format: int = SS58_FORMAT
+
+    def __post_init__(self):
+        invalid = set(self.prefix + self.suffix) - set(BASE58_ALPHABET)
+        if invalid:
+            raise ValueError(
+                f"Characters not in SS58 addresses: {''.join(sorted(invalid))}"
+            )
+        if self._prefix_odds() == 0:
+            lowest = ss58_encode(bytes(32), self.ss58_format)
+            highest = ss58_encode(b"\xff" * 32, self.ss58_format)
+            raise ValueError(
+                f"No address starts with {self.prefix}, addresses range from "
+                f"{lowest[:3]}... to {highest[:3]}..."
+            )
+
+    def matches(self, address: str) -> bool:
+        if self.ignore_case:
+            address = address.lower()
+            prefix, suffix = self.prefix.lower(), self.suffix.lower()
+        else:
+            prefix, suffix = self.prefix, self.suffix
+        return address.startswith(prefix) and address.endswith(suffix)
+
+    def _prefix_odds(self) -> float:
+        """The share of the addresses of sr25519 keys with the prefix."""
+        prefixes = (
+            _case_variants(self.prefix) if self.ignore_case else {self.prefix}
+        )
+        lowest = ss58_encode(bytes(32), self.ss58_format)
+        highest = ss58_encode(b"\xff" * 32, self.ss58_format)
+        if len(lowest) != len(highest):
+            # leading zeros vary the length, assume uniform characters
+            return len(prefixes) / len(BASE58_ALPHABET) ** len(self.prefix)
+        # an address is the base 58 number of its format, public key and
+        # 2-byte checksum; public keys are uniform but for their first
+        # byte, always even for sr25519
+        unit = 256**33
+        base = _base58_value(lowest) // (256 * unit) * (256 * unit)
+        scale = len(BASE58_ALPHABET) ** (len(lowest) - len(self.prefix))
+        covered = 0
+        for prefix in prefixes:
+            start = _base58_value(prefix) * scale
+            for first in range(0, 256, 2):
+                low = base + first * unit
+                covered += max(
+                    0, min(start + scale, low + unit) - max(start, low)
+                )
+        return covered / (128 * unit)
+
+    def expected_attempts(self) -> float:
+        """
+        The expected number of attempts to find a match. Suffixes are
+        assumed to have uniformly distributed characters.
+        """
+        odds = self._prefix_odds()
+        for char in self.suffix:
+            choices = len(_case_variants(char)) if self.ignore_case else 1
+            odds *= choices / len(BASE58_ALPHABET)
+        return 1 / odds
+
+
+@dataclass
+class VanityProgress:
+    """
+    A progress report of a search.
+
+    Attributes:
+        attempts: The addresses tried so far.
+        rate: The attempts per second since the search started.
+        expected: The expected total attempts.
+    """
+
+    attempts: int
+    rate: float
+    expected: float
+
+    @property
+    def eta(self) -> float:
+        """
+        The expected seconds left. Searches are memoryless: this stays the
+        same however long the search has run, at a constant rate.
+        """
+        return self.expected / self.rate if self.rate else math.inf
+
+
+def _search(
+    pattern: VanityPattern,
+    attempts: Any,
+    stop: multiprocessing.synchronize.Event,
+    results: GenericQueue[str],
+):
+    while not stop.is_set():
+        for _ in range(ATTEMPTS_PER_UPDATE):
+            seed = os.urandom(32)
+            public_key, _ = sr25519.pair_from_seed(seed)  # type: ignore
+            if pattern.matches(ss58_encode(public_key, pattern.ss58_format)):  # type: ignore
+                results.put(seed.hex())
+                stop.set()
+                return
+        with attempts.get_lock():
+            attempts.value += ATTEMPTS_PER_UPDATE
+
+
+def find_vanity_keypair(
+    pattern: VanityPattern,
+    num_processes: int | None = None,
+    on_progress: Callable[[VanityProgress], None] | None = None,
+) -> Keypair:
+    """
+    Searches for a keypair whose address matches a pattern, across
+    processes.
+
+    Args:
+        pattern: What the address must look like.
+        num_processes: The number of worker processes (default: number of
+          CPU cores).
+        on_progress: Called every `REPORT_INTERVAL` seconds with the
+          progress of the search.
+
+    Returns:
+        The sr25519 keypair found, created from its seed.
+    """
+    if num_processes is None:
+        num_processes = max(1, get_cpu_count())
+
+    mp_context = multiprocessing.get_context("fork")
+    stop = mp_context.Event()
+    attempts = mp_context.Value("Q", 0)
+    results: GenericQueue[str] = GenericQueue[str](mp_context)
+    workers = [
+        mp_context.Process(
+            target=_search,
+            args=(pattern, attempts, stop, results),
+            daemon=True,
+        )
+        for _ in range(num_processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    expected = pattern.expected_attempts()
+    start = time.monotonic()
+    seed_hex = None
+    try:
+        while seed_hex is None:
+            try:
+                seed_hex = results.get(block=True, timeout=REPORT_INTERVAL)
+            except Empty:
+                pass
+            if on_progress is not None:
+                elapsed = time.monotonic() - start
+                done: int = attempts.value  # type: ignore
+                on_progress(
+                    VanityProgress(
+                        done, done / elapsed if elapsed else 0.0, expected
+                    )
+                )
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+
+    keypair = Keypair.create_from_seed(
+        seed_hex, ss58_format=pattern.ss58_format
+    )
+    assert pattern.matches(keypair.ss58_address)
+    return keypair
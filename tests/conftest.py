@@ -0,0 +1,58 @@
+"""
+Fixtures running the client against the benchmarks' fake node, live and
+from a recording of the same session.
+"""
+
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+from benchmarks.fake_node import FakeChain, FakeWebSocket
+from torusdk.client import TorusClient
+from torusdk.transport import TrafficRecorder, TrafficReplayer
+
+Scenario = Callable[[TorusClient], Any]
+
+
+@pytest.fixture
+def chain() -> FakeChain:
+    return FakeChain()
+
+
+def _run(client: TorusClient, scenario: Scenario) -> Any:
+    try:
+        return scenario(client)
+    finally:
+        client.tracker().stop()
+
+
+@pytest.fixture
+def replay(
+    tmp_path: Path, chain: FakeChain
+) -> Callable[[Scenario], tuple[Any, Any]]:
+    """
+    Runs a scenario against the fake node while recording its traffic, and
+    then again against the recording alone, in order.
+
+    Returns:
+        A function taking the scenario and returning its live and replayed
+          outcomes.
+    """
+
+    def run(scenario: Scenario) -> tuple[Any, Any]:
+        path = tmp_path / "traffic.jsonl.gz"
+        with TrafficRecorder(path, lambda: FakeWebSocket(chain)) as recorder:
+            live = _run(
+                TorusClient("ws://fake-node", 1, ws_factory=recorder.factory),
+                scenario,
+            )
+        replayer = TrafficReplayer(path, ordered=True)
+        replayed = _run(
+            TorusClient("ws://replay", 1, ws_factory=replayer.factory),
+            scenario,
+        )
+        assert replayer.remaining_connections == 0
+        return live, replayed
+
+    return run
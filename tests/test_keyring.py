@@ -0,0 +1,99 @@
+import threading
+from pathlib import Path
+
+import pytest
+from torustrateinterface import Keypair
+
+from torusdk.errors import KeyringAgentError
+from torusdk.keyring import (
+    _LENGTH,
+    _SHORT,
+    OP_LIST,
+    OP_SIGN,
+    OP_SIGN_MANY,
+    AgentClient,
+    AgentKeypair,
+    KeyAgent,
+    _pack_blob,
+    _pack_str,
+    _Reader,
+    agent_is_running,
+)
+
+KEY = Keypair.create_from_uri("//Alice")
+
+
+def test_pack_and_read():
+    body = bytes([OP_SIGN]) + _pack_str("ключ") + _pack_blob(b"\x00\x01")
+    assert body[1:3] == _SHORT.pack(len("ключ".encode()))
+    reader = _Reader(body + b"rest")
+    assert reader.byte() == OP_SIGN
+    assert reader.str() == "ключ"
+    assert reader.blob() == b"\x00\x01"
+    assert reader.rest() == b"rest"
+
+
+def test_list_wire_format():
+    agent = KeyAgent({"alice": KEY}, path="unused.sock")
+    reader = _Reader(agent.handle(bytes([OP_LIST])))
+    assert reader.length() == 1
+    assert reader.str() == "alice"
+    assert reader.blob() == KEY.public_key
+    assert reader.short() == KEY.ss58_format
+    assert reader.byte() == KEY.crypto_type
+    assert reader.rest() == b""
+
+
+def test_sign_wire_format():
+    agent = KeyAgent({"alice": KEY}, path="unused.sock")
+    signature = agent.handle(bytes([OP_SIGN]) + _pack_str("alice") + b"data")
+    assert KEY.verify(b"data", signature)
+
+    blobs = [b"first", b"", b"third"]
+    request = (
+        bytes([OP_SIGN_MANY])
+        + _pack_str("alice")
+        + _LENGTH.pack(len(blobs))
+        + b"".join(_pack_blob(blob) for blob in blobs)
+    )
+    reader = _Reader(agent.handle(request))
+    for blob in blobs:
+        assert KEY.verify(blob, reader.blob())
+    assert reader.rest() == b""
+
+    with pytest.raises(KeyringAgentError):
+        agent.handle(bytes([OP_SIGN]) + _pack_str("bob") + b"data")
+    with pytest.raises(ValueError):
+        agent.handle(bytes([0xFF]))
+
+
+def test_agent_serves_over_socket(tmp_path: Path):
+    path = tmp_path / "agent.sock"
+    agent = KeyAgent({"alice": KEY}, path=path)
+    server = threading.Thread(target=agent.serve_forever, daemon=True)
+    server.start()
+    client = AgentClient(path)
+    try:
+        for _ in range(100):
+            if agent_is_running(path):
+                break
+            threading.Event().wait(0.05)
+        keys = client.list_keys()
+        assert list(keys) == ["alice"]
+        keypair = AgentKeypair(client, keys["alice"])
+        assert keypair.ss58_address == KEY.ss58_address
+        assert KEY.verify(b"data", keypair.sign(b"data"))
+        blobs = [b"first", b"second"]
+        signatures = client.sign_many("alice", blobs)
+        assert all(map(KEY.verify, blobs, signatures))
+        with pytest.raises(KeyringAgentError):
+            client.sign("bob", b"data")
+
+        client.lock()
+        server.join(10)
+        assert not server.is_alive()
+        assert not path.exists()
+        assert agent.names == []
+    finally:
+        client.close()
+        agent.stop()
@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+from torusdk.keystore import SqliteKeystore, record_of
+
+
+def _body(name: str) -> str:
+    return json.dumps(
+        {
+            "ss58_address": f"address-{name}",
+            "public_key": f"public-{name}",
+            "private_key": f"encrypted-{name}",
+        }
+    )
+
+
+def test_put_many_and_lookups(tmp_path: Path):
+    keystore = SqliteKeystore(tmp_path / "keystore.db")
+    records = [record_of(name, _body(name)) for name in ("a", "b")]
+    assert keystore.put_many(records) == 2
+    assert keystore.get("a") == _body("a")
+    assert keystore.get("missing") is None
+    assert keystore.address("b") == "address-b"
+    assert keystore.addresses() == {"a": "address-a", "b": "address-b"}
+    assert sorted(keystore.names()) == ["a", "b"]
+    assert "a" in keystore and "missing" not in keystore
+    keystore.close()
+
+
+def test_import_and_export_dir(tmp_path: Path):
+    key_dir = tmp_path / "key"
+    key_dir.mkdir()
+    for name in ("a", "b"):
+        (key_dir / f"{name}.json").write_text(_body(name))
+    (key_dir / "key2address.json").write_text("{}")
+    (key_dir / "notes.txt").write_text("not a key")
+
+    keystore = SqliteKeystore(tmp_path / "keystore.db")
+    keystore.put(record_of("a", _body("kept")))
+    assert keystore.import_dir(key_dir) == 1
+    assert keystore.get("a") == _body("kept")
+    assert keystore.import_dir(key_dir, overwrite=True) == 2
+    assert keystore.get("a") == _body("a")
+
+    exported = tmp_path / "exported"
+    assert keystore.export_dir(exported) == 2
+    assert (exported / "b.json").read_text() == _body("b")
+    keystore.close()
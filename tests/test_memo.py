@@ -0,0 +1,60 @@
+import pickle
+
+import pytest
+
+from torusdk.util.memo import FrozenDict, LRUMemo, freeze
+
+
+def test_lru_memo_evicts_least_recently_used():
+    memo: LRUMemo[str, int] = LRUMemo(2)
+    assert memo.get_or_insert_lazy("a", lambda: 1) == 1
+    assert memo.get_or_insert_lazy("b", lambda: 2) == 2
+    # "a" is used again, so "b" is the one evicted
+    assert memo.get_or_insert_lazy("a", lambda: 0) == 1
+    assert memo.get_or_insert_lazy("c", lambda: 3) == 3
+    assert memo.get_or_insert_lazy("b", lambda: 4) == 4
+    assert memo.get_or_insert_lazy("a", lambda: 5) == 5
+    assert len(memo) == 2
+    assert (memo.hits, memo.misses) == (1, 5)
+    assert memo.hit_rate == pytest.approx(1 / 6)
+
+    memo.clear()
+    assert len(memo) == 0
+    assert memo.hit_rate == 0.0
+
+
+def test_frozen_dict_is_immutable():
+    frozen = FrozenDict({"a": 1})
+    for modify in (
+        lambda: frozen.__setitem__("a", 2),
+        lambda: frozen.__delitem__("a"),
+        lambda: frozen.update(a=2),
+        lambda: frozen.setdefault("b", 2),
+        lambda: frozen.pop("a"),
+        lambda: frozen.popitem(),
+        frozen.clear,
+    ):
+        with pytest.raises(TypeError):
+            modify()
+    with pytest.raises(TypeError):
+        frozen |= {"b": 2}
+    assert frozen == {"a": 1}
+
+    copy = frozen.copy()
+    copy["a"] = 2
+    assert type(copy) is dict and frozen["a"] == 1
+
+
+def test_frozen_dict_pickles():
+    frozen = FrozenDict({"a": (1, 2)})
+    loaded = pickle.loads(pickle.dumps(frozen))
+    assert type(loaded) is FrozenDict
+    assert loaded == frozen
+
+
+def test_freeze_is_recursive():
+    value = freeze({"a": [1, {"b": [2]}], "c": "text"})
+    assert value == {"a": (1, {"b": (2,)}), "c": "text"}
+    assert isinstance(value, FrozenDict)
+    assert isinstance(value["a"][1], FrozenDict)
+    assert freeze(3) == 3
@@ -0,0 +1,76 @@
+import time
+from typing import Callable
+
+import pytest
+from torustrateinterface import Keypair
+
+from benchmarks.fake_node import FakeChain
+from torusdk.client import TorusClient
+from torusdk.errors import ChainTransactionError, NetworkTimeoutError
+from torusdk.nonce import NonceManager
+from torusdk.types.types import Ss58Address
+
+KEY = Keypair.create_from_uri("//Alice")
+OTHER = Keypair.create_from_uri("//Bob")
+ADDRESS = Ss58Address(KEY.ss58_address)
+
+
+def _eventually(condition: Callable[[], bool], timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _transfer(client: TorusClient, key: Keypair):
+    return client.submit_async(
+        "transfer_allow_death",
+        {"dest": OTHER.ss58_address, "value": 1},
+        key,
+        module="Balances",
+    )
+
+
+def test_reserve_resyncs_after_failed_submission(replay, chain: FakeChain):
+    chain.set_nonce(KEY.public_key, 5)
+
+    def scenario(client: TorusClient):
+        nonces = NonceManager(client)
+        taken = [nonces.next(ADDRESS)]
+        with pytest.raises(RuntimeError):
+            with nonces.reserve(ADDRESS) as nonce:
+                taken.append(nonce)
+                raise RuntimeError("the node went away")
+        resynced = nonces.peek(ADDRESS)
+        # an included but failed extrinsic used its nonce
+        with pytest.raises(ChainTransactionError):
+            with nonces.reserve(ADDRESS) as nonce:
+                taken.append(nonce)
+                raise ChainTransactionError("the call failed")
+        return taken, resynced, nonces.peek(ADDRESS)
+
+    live, replayed = replay(scenario)
+    assert live == replayed == ([5, 6, 5], 5, 6)
+
+
+def test_watch_forgets_nonce_of_timed_out_extrinsic(replay):
+    def scenario(client: TorusClient):
+        nonces = client.nonce_manager = NonceManager(client)
+        _transfer(client, KEY).result(10)
+        # expires every extrinsic not in the next block
+        client.tracker().timeout = 0
+        # a gap, as if an accepted extrinsic was dropped
+        nonces.next(ADDRESS)
+        stuck = _transfer(client, KEY)
+        _transfer(client, OTHER).result(10)
+        error = stuck.exception(10)
+        # done callbacks run after the waiters wake up
+        forgotten = _eventually(lambda: nonces.peek(ADDRESS) is None)
+        # fetched again from the node, filling the gap
+        receipt = _transfer(client, KEY).result(10)
+        return type(error), forgotten, receipt.block_number
+
+    live, replayed = replay(scenario)
+    assert live == replayed == (NetworkTimeoutError, True, 3)
@@ -0,0 +1,68 @@
+from concurrent.futures import Future
+from typing import Any
+
+import pytest
+from torustrateinterface import ExtrinsicReceipt, Keypair
+
+from benchmarks.cases import account
+from benchmarks.fake_node import FakeChain
+from torusdk.batch import BatchLimits
+from torusdk.client import TorusClient
+from torusdk.payout import PayoutEngine, PayoutJournal, payouts_digest
+from torusdk.ss58 import ss58_encode
+
+KEY = Keypair.create_from_uri("//Alice")
+PAYOUTS = [(ss58_encode(account(i)), 10**18) for i in range(20)]
+LIMITS = BatchLimits(max_calls=10, max_length=10**6)
+
+
+def test_resume_does_not_pay_twice(
+    replay, chain: FakeChain, tmp_path_factory: pytest.TempPathFactory
+):
+    def scenario(client: TorusClient):
+        journal = tmp_path_factory.mktemp("payout") / "journal.jsonl"
+        submit = client.submit_async
+        sent: list[Future[ExtrinsicReceipt]] = []
+
+        def times_out(*args: Any, **kwargs: Any):
+            # the extrinsic reached the node, but the answer was lost
+            sent.append(submit(*args, **kwargs))
+            raise TimeoutError("read timed out")
+
+        client.submit_async = times_out
+        interrupted = PayoutEngine(
+            client, KEY, journal=journal, limits=LIMITS
+        ).run(PAYOUTS)
+        sent[0].result(10)
+        client.submit_async = submit
+
+        resumed = PayoutEngine(client, KEY, journal=journal, limits=LIMITS).run(
+            PAYOUTS
+        )
+        return (
+            (
+                interrupted.paid,
+                interrupted.unconfirmed,
+                interrupted.unsubmitted,
+            ),
+            (resumed.paid, resumed.unconfirmed, len(resumed.receipts)),
+            PayoutJournal(journal).state(),
+        )
+
+    live, replayed = replay(scenario)
+    assert live == replayed
+    interrupted, resumed, (paid, unresolved) = live
+    assert interrupted == (0, [(0, 10)], [(10, 20)])
+    assert resumed == (10, [(0, 10)], 1)
+    assert paid == [(10, 20)]
+    # the first range stays open in the journal, settled by its nonce
+    assert unresolved == [(0, 10, 0)]
+    assert chain.submitted == 2
+
+
+def test_journal_rejects_another_payout_list(tmp_path):
+    journal = PayoutJournal(tmp_path / "journal.jsonl")
+    journal.start(payouts_digest(PAYOUTS), len(PAYOUTS))
+    journal.start(payouts_digest(PAYOUTS), len(PAYOUTS))
+    with pytest.raises(ValueError):
+        journal.start(payouts_digest(PAYOUTS[1:]), len(PAYOUTS) - 1)
@@ -0,0 +1,51 @@
+import hashlib
+
+import pytest
+from scalecodec.utils.ss58 import ss58_encode as scale_ss58_encode
+
+from torusdk.ss58 import (
+    AccountId,
+    check_ss58_addresses,
+    is_valid_ss58,
+    ss58_decode,
+    ss58_encode,
+    ss58_encode_many,
+)
+
+PUBLIC_KEYS = [
+    hashlib.blake2b(bytes([i]), digest_size=32).digest() for i in range(64)
+]
+
+
+@pytest.mark.parametrize("ss58_format", [0, 2, 42, 63, 64, 1000, 16383])
+def test_encode_many_matches_scalecodec(ss58_format: int):
+    expected = [scale_ss58_encode(key, ss58_format) for key in PUBLIC_KEYS]
+    assert ss58_encode_many(PUBLIC_KEYS, ss58_format) == expected
+    assert (
+        ss58_encode_many([key.hex() for key in PUBLIC_KEYS], ss58_format)
+        == expected
+    )
+    assert [ss58_encode(key, ss58_format) for key in PUBLIC_KEYS] == expected
+
+
+def test_encode_many_repeated_keys():
+    keys = PUBLIC_KEYS[:2] * 3
+    assert ss58_encode_many(keys) == [
+        scale_ss58_encode(key, 42) for key in keys
+    ]
+
+
+def test_encode_rejects_wrong_length():
+    with pytest.raises(ValueError):
+        ss58_encode_many([b"\x00" * 31])
+
+
+def test_decode_roundtrip():
+    for key in PUBLIC_KEYS:
+        address = ss58_encode(key)
+        assert is_valid_ss58(address)
+        assert ss58_decode(address) == key
+        assert AccountId(key).ss58 == address
+    assert not is_valid_ss58("not an address")
+    with pytest.raises(AssertionError):
+        check_ss58_addresses(["not an address"])
@@ -0,0 +1,67 @@
+import pytest
+from torustrateinterface import Keypair
+
+from torusdk import tracker as tracker_module
+from torusdk.client import TorusClient
+from torusdk.errors import NetworkError, NetworkTimeoutError
+
+KEY = Keypair.create_from_uri("//Alice")
+OTHER = Keypair.create_from_uri("//Bob")
+
+
+def _transfer(client: TorusClient, key: Keypair, nonce: int | None = None):
+    return client.submit_async(
+        "transfer_allow_death",
+        {"dest": OTHER.ss58_address, "value": 1},
+        key,
+        module="Balances",
+        nonce=nonce,
+    )
+
+
+def test_times_out_extrinsics_never_included(replay):
+    def scenario(client: TorusClient):
+        tracker = client.tracker()
+        _transfer(client, KEY).result(10)
+        tracker.timeout = 0
+        # waits in the pool for the nonces before it
+        stuck = _transfer(client, KEY, nonce=5)
+        included = _transfer(client, OTHER).result(10)
+        return type(stuck.exception(10)), included.block_number, tracker.pending
+
+    live, replayed = replay(scenario)
+    assert live == replayed == (NetworkTimeoutError, 2, 0)
+
+
+def _fail_block_fetches(client: TorusClient) -> list[int]:
+    """Fails the tracker's block fetches while the returned count is set."""
+    failures = [0]
+    fetch = client.rpc_batch_messages
+
+    def flaky(batch: list[tuple[str, list[object]]]):
+        if batch and batch[0][0] == "chain_getBlockHash" and failures[0]:
+            failures[0] -= 1
+            raise NetworkError("connection reset")
+        return fetch(batch)
+
+    client.rpc_batch_messages = flaky
+    return failures
+
+
+def test_retries_failed_block_fetches(replay, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(tracker_module, "MAX_BLOCK_FAILURES", 2)
+
+    def scenario(client: TorusClient):
+        failures = _fail_block_fetches(client)
+        _transfer(client, KEY).result(10)
+        failures[0] = 2
+        retried = _transfer(client, KEY).result(10)
+        # every pending extrinsic fails after too many failures
+        failures[0] = 3
+        error = _transfer(client, KEY).exception(10)
+        # and the next one starts the tracker again
+        restarted = _transfer(client, KEY).result(10)
+        return retried.block_number, type(error), restarted.block_number
+
+    live, replayed = replay(scenario)
+    assert live == replayed == (2, NetworkError, 4)
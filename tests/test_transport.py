@@ -0,0 +1,53 @@
+import pytest
+
+from benchmarks.fake_node import FakeChain, FakeWebSocket
+from torusdk import transport
+from torusdk.client import TorusClient
+from torusdk.errors import ReplayMismatchError
+from torusdk.transport import TrafficRecorder, TrafficReplayer
+
+
+def test_replay_answers_as_recorded(replay):
+    def scenario(client: TorusClient):
+        return client.rpc_batch_messages(
+            [("chain_getBlockHash", [0]), ("system_chain", [])]
+        )
+
+    live, replayed = replay(scenario)
+    assert replayed == live
+    assert live[1]["result"] == "Torus Fake"
+
+
+def test_replay_rejects_diverging_requests(tmp_path, chain: FakeChain):
+    path = tmp_path / "traffic.jsonl.gz"
+    with TrafficRecorder(path, lambda: FakeWebSocket(chain)) as recorder:
+        client = TorusClient("ws://fake-node", 1, ws_factory=recorder.factory)
+        client.rpc_batch_messages([("chain_getBlockHash", [0])])
+
+    replayer = TrafficReplayer(path)
+    client = TorusClient("ws://replay", 1, ws_factory=replayer.factory)
+    with pytest.raises(ReplayMismatchError):
+        client.rpc_batch_messages([("system_chain", [])])
+
+
+def test_ordered_replay_follows_recorded_order(
+    tmp_path, chain: FakeChain, monkeypatch: pytest.MonkeyPatch
+):
+    path = tmp_path / "traffic.jsonl.gz"
+    with TrafficRecorder(path, lambda: FakeWebSocket(chain)) as recorder:
+        first, second = recorder.factory(), recorder.factory()
+        for ws in (first, second):
+            ws.connect("ws://fake-node")
+        second.send('{"jsonrpc": "2.0", "id": 1, "method": "system_name"}')
+        first.send('{"jsonrpc": "2.0", "id": 1, "method": "system_chain"}')
+        second.recv()
+        first.recv()
+
+    monkeypatch.setattr(transport, "ORDERED_REPLAY_TIMEOUT", 0.1)
+    replayer = TrafficReplayer(path, ordered=True)
+    first, second = replayer.factory(), replayer.factory()
+    for ws in (first, second):
+        ws.connect("ws://replay")
+    with pytest.raises(ReplayMismatchError):
+        # the other connection sent first
+        first.send('{"jsonrpc": "2.0", "id": 1, "method": "system_chain"}')